@@ -36,7 +36,7 @@ class AdAdmin(admin.ModelAdmin):
         if obj.image:
             return format_html(
                 '<img src="{}" style="max-height: 100px; max-width: 150px;" />',
-                obj.image.url,
+                obj.thumbnail_url,
             )
         return "-"
 
@@ -1,22 +1,43 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from ads.models import Ad
+from ads.api.conditional import ConditionalGetMixin
+from ads.api.fast_read import FastReadMixin
+from ads.fast_serializers import AdValuesSerializer
 from ads.serializers import AdSerializer
 from ads.services import ads as ads_services
-from typing import Any
+from ads.services import facets as facet_services
+from ads.services import generations
+from ads.services import exporter, importer
+from ads.services.indicators import compute_exchange_indicators
+from django.conf import settings
+from typing import Any, Tuple
 
 # ViewSet для работы с объявлениями через API
-class AdViewSet(viewsets.ModelViewSet):
+class AdViewSet(ConditionalGetMixin, FastReadMixin, viewsets.ModelViewSet):
     serializer_class = AdSerializer
+    # list и retrieve — по строкам values() (ads.api.fast_read)
+    read_serializer_class = AdValuesSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    # Ключ кэша количества для пагинации (ads.pagination.AdsPagination)
+    count_generations = (generations.ADS,)
+    # ETag: в ответе есть счётчики предложений, поэтому и поколение предложений
+    etag_generations = (generations.ADS, generations.PROPOSALS)
+
+    def get_filters(self) -> Tuple[str, str, str]:
+        # Фильтры поиска из параметров запроса: q, category, condition
+        params = self.request.query_params
+        return (
+            str(params.get("q", "") or ""),
+            str(params.get("category", "") or ""),
+            str(params.get("condition", "") or ""),
+        )
 
     def get_queryset(self) -> Any:
         # Получает список объявлений с фильтрацией по запросу, категории и состоянию
-        query = str(self.request.query_params.get("q", "") or "")
-        category = str(self.request.query_params.get("category", "") or "")
-        condition = str(self.request.query_params.get("condition", "") or "")
-        return ads_services.search_ads(query, category, condition)
+        query, category, condition = self.get_filters()
+        ranked = self.request.query_params.get("sort") == "relevance"
+        return ads_services.search_ads(query, category, condition, ranked=ranked)
 
     def perform_create(self, serializer):
         # Сохраняет объявление с текущим пользователем как владельцем
@@ -33,9 +54,9 @@ class AdViewSet(viewsets.ModelViewSet):
                 {"error": "Передайте список id объявлений (ad_ids)"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        ads = Ad.objects.filter(pk__in=ad_ids)
-        incoming, outgoing = ads_services.get_ads_indicators(ads, request.user)
-        exchange_map = ads_services.get_user_exchange_map(ads, request.user)
+        incoming, outgoing, exchange_map = compute_exchange_indicators(
+            ad_ids, request.user
+        )
         return Response(
             {
                 "incoming": incoming,
@@ -43,3 +64,81 @@ class AdViewSet(viewsets.ModelViewSet):
                 "exchange_map": exchange_map,
             }
         )
+
+    @action(detail=False, methods=["get"])
+    def facets(self, request):
+        # Количество объявлений по категориям и состояниям для текущего фильтра
+        query, category, condition = self.get_filters()
+        return Response(facet_services.get_facet_counts(query, category, condition))
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def import_ads(self, request):
+        # Потоковый импорт объявлений из файла file (CSV или JSONL, multipart)
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response(
+                {"error": "Передайте файл в поле file"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        fmt = request.data.get("file_format") or importer.detect_format(upload.name)
+        if fmt not in importer.IMPORT_FORMATS:
+            return Response(
+                {"error": "Поддерживаются файлы .csv и .jsonl (или укажите file_format)"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            offset = int(request.data.get("offset") or 0)
+            batch_size = int(request.data.get("batch_size") or 0) or None
+        except ValueError:
+            return Response(
+                {"error": "offset и batch_size должны быть числами"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        rejected_rows = []
+
+        def on_reject(row_number, errors):
+            if len(rejected_rows) < settings.ADS_IMPORT_REJECTED_LIMIT:
+                rejected_rows.append({"row": row_number, "errors": errors})
+
+        upload.seek(0)
+        try:
+            result = importer.import_ads(
+                upload.file,
+                fmt,
+                request.user,
+                batch_size=batch_size,
+                offset=max(offset, 0),
+                on_reject=on_reject,
+            )
+        except importer.ImportFileError as error:
+            return Response(
+                {
+                    "error": error.message,
+                    "created": error.created,
+                    "next_offset": error.next_offset,
+                    "rejected_rows": rejected_rows,
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        result["rejected_rows"] = rejected_rows
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated]
+    )
+    def export(self, request):
+        # Потоковая выгрузка всех объявлений по фильтрам q/category/condition
+        fmt = request.query_params.get("export_format", "ndjson")
+        if fmt not in exporter.EXPORT_FORMATS:
+            return Response(
+                {"error": "export_format: ndjson или csv"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return exporter.streaming_response(
+            self.get_queryset(), exporter.AD_EXPORT_COLUMNS, fmt, "ads"
+        )
@@ -0,0 +1,56 @@
+import hashlib
+import json
+from typing import Tuple
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from ads.services import generations
+
+
+class ConditionalGetMixin:
+    """
+    Условный GET для list и retrieve: ETag и Last-Modified строятся из поколений
+    данных etag_generations (и пользователя, если etag_per_user), поэтому ответ
+    304 отдаётся до основного запроса, подсчёта количества и сериализации.
+    """
+
+    etag_generations: Tuple[str, ...] = ()
+    etag_per_user = False
+
+    def get_etag(self, request, gens: Tuple[int, ...]) -> str:
+        # Всё, от чего зависит тело ответа: маршрут, параметры, формат, пользователь, данные
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        raw = json.dumps(
+            [
+                self.basename,
+                self.action,
+                lookup,
+                request.user.pk if self.etag_per_user else None,
+                request.get_host(),
+                request.accepted_renderer.format,
+                sorted(request.query_params.lists()),
+                gens,
+            ],
+            default=str,
+        )
+        return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        gens = generations.get_generations(*self.etag_generations)
+        etag = self.get_etag(request, gens)
+        last_modified = int(generations.get_last_modified(*self.etag_generations))
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
@@ -0,0 +1,50 @@
+from typing import List, Optional, Type
+from rest_framework.generics import get_object_or_404
+from rest_framework.response import Response
+from ads.fast_serializers import ValuesSerializer
+
+
+class FastReadMixin:
+    """
+    list и retrieve через ValuesSerializer: строки читаются queryset.values()
+    только нужных колонок, без создания моделей и select_related, а ответ
+    совпадает с ответом serializer_class. Параметры ?fields= и ?expand=
+    сужают и расширяют ответ (см. ValuesSerializer). Запись (create/update)
+    идёт обычным путём.
+    Объектные права (has_object_permission) на чтении не проверяются —
+    у permission_classes этих ViewSet их нет.
+    """
+
+    read_serializer_class: Type[ValuesSerializer]
+
+    def get_read_serializer(self) -> ValuesSerializer:
+        # ?fields=id,title — только эти поля (и колонки в SELECT);
+        # ?expand=user — связи вложенными объектами через JOIN того же запроса
+        params = self.request.query_params
+        fields = self._param_names(params.get("fields"))
+        return self.read_serializer_class(
+            context=self.get_serializer_context(),
+            fields=fields or None,
+            expand=self._param_names(params.get("expand")),
+        )
+
+    @staticmethod
+    def _param_names(value: Optional[str]) -> List[str]:
+        return [name.strip() for name in (value or "").split(",") if name.strip()]
+
+    def list(self, request, *args, **kwargs):
+        reader = self.get_read_serializer()
+        queryset = self.filter_queryset(self.get_queryset()).values(*reader.columns)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(reader.many(page))
+        return Response(reader.many(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        reader = self.get_read_serializer()
+        queryset = self.filter_queryset(self.get_queryset()).values(*reader.columns)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        row = get_object_or_404(
+            queryset, **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return Response(reader.to_representation(row))
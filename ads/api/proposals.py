@@ -1,16 +1,28 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from ads.api.conditional import ConditionalGetMixin
+from ads.api.fast_read import FastReadMixin
+from ads.fast_serializers import ExchangeProposalValuesSerializer
 from ads.models import ExchangeProposal
 from ads.serializers import ExchangeProposalSerializer
 from ads.services import proposals as proposal_services
+from ads.services import exporter, generations
 from typing import Any
 
 
 # ViewSet для работы с предложениями обмена через API
-class ExchangeProposalViewSet(viewsets.ModelViewSet):
+class ExchangeProposalViewSet(ConditionalGetMixin, FastReadMixin, viewsets.ModelViewSet):
     serializer_class = ExchangeProposalSerializer
+    # list и retrieve — по строкам values() (ads.api.fast_read)
+    read_serializer_class = ExchangeProposalValuesSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    # Ключ кэша количества для пагинации (ads.pagination.AdsPagination)
+    count_generations = (generations.ADS, generations.PROPOSALS)
+    count_per_user = True
+    # ETag списка и деталей — по тем же поколениям и пользователю
+    etag_generations = count_generations
+    etag_per_user = True
 
     def get_queryset(self) -> Any:
         # Получает список предложений обмена для текущего пользователя с фильтрацией
@@ -21,6 +33,26 @@ class ExchangeProposalViewSet(viewsets.ModelViewSet):
             return proposal_services.search_proposals(user, status_param, query)
         return ExchangeProposal.objects.none()
 
+    # HTTP-статус и сообщение для каждого исхода смены статуса
+    STATUS_RESPONSES = {
+        proposal_services.STATUS_NOT_FOUND: (
+            status.HTTP_404_NOT_FOUND,
+            "Предложение не найдено",
+        ),
+        proposal_services.STATUS_FORBIDDEN: (
+            status.HTTP_403_FORBIDDEN,
+            "Менять статус может только получатель предложения",
+        ),
+        proposal_services.STATUS_INVALID: (
+            status.HTTP_400_BAD_REQUEST,
+            "Недопустимый статус: предложение можно только принять или отклонить",
+        ),
+        proposal_services.STATUS_CONFLICT: (
+            status.HTTP_409_CONFLICT,
+            "Статус предложения уже изменён",
+        ),
+    }
+
     @action(
         detail=True, methods=["post"], permission_classes=[permissions.IsAuthenticated]
     )
@@ -33,12 +65,120 @@ class ExchangeProposalViewSet(viewsets.ModelViewSet):
                 {"error": "Не передан id или статус"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        ok = proposal_services.atomic_update_proposal_status(
-            int(pk), user, str(new_status)
+        try:
+            proposal_id = int(pk)
+        except ValueError:
+            outcome = proposal_services.STATUS_NOT_FOUND
+        else:
+            outcome = proposal_services.transition_proposal_status(
+                proposal_id, user, str(new_status)
+            )
+        if outcome == proposal_services.STATUS_UPDATED:
+            return Response({"status": outcome}, status=status.HTTP_200_OK)
+        http_status, message = self.STATUS_RESPONSES[outcome]
+        return Response({"error": message, "code": outcome}, status=http_status)
+
+    @action(
+        detail=False, methods=["post"], permission_classes=[permissions.IsAuthenticated]
+    )
+    def bulk_set_status(self, request):
+        # Массово принимает/отклоняет предложения: {"items": [{"id": 1, "status": "accepted"}, ...]}
+        items = request.data.get("items")
+        if not isinstance(items, list) or not items:
+            return Response(
+                {"error": "Передайте непустой список items"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > proposal_services.MAX_BULK_STATUS_ITEMS:
+            return Response(
+                {
+                    "error": "Слишком много предложений в одном запросе "
+                    f"(максимум {proposal_services.MAX_BULK_STATUS_ITEMS})"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        pairs = []
+        for item in items:
+            try:
+                pairs.append((int(item["id"]), str(item["status"])))
+            except (KeyError, TypeError, ValueError):
+                return Response(
+                    {"error": "Каждый элемент items должен содержать id и status"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+        outcomes = proposal_services.bulk_transition_proposal_status(request.user, pairs)
+        results = [
+            {"id": proposal_id, "result": outcome}
+            for proposal_id, outcome in outcomes.items()
+        ]
+        updated = sum(
+            outcome == proposal_services.STATUS_UPDATED for outcome in outcomes.values()
         )
-        if ok:
-            return Response({"status": "updated"}, status=status.HTTP_200_OK)
         return Response(
-            {"error": "Недостаточно прав или неверный статус"},
-            status=status.HTTP_400_BAD_REQUEST,
+            {"updated": updated, "failed": len(results) - updated, "results": results},
+            status=status.HTTP_200_OK,
+        )
+
+    @action(
+        detail=False, methods=["post"], permission_classes=[permissions.IsAuthenticated]
+    )
+    def bulk_create(self, request):
+        # Предлагает одно своё объявление нескольким: {"ad_sender": 1, "ad_receivers": [2, 3], "comment": ""}
+        # Форма (multipart/urlencoded) передаёт список повторением ключа ad_receivers
+        if hasattr(request.data, "getlist"):
+            receivers = request.data.getlist("ad_receivers")
+        else:
+            receivers = request.data.get("ad_receivers")
+        if not isinstance(receivers, list):
+            return Response(
+                {"error": "Передайте ad_sender и список ad_receivers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            ad_sender_id = int(request.data.get("ad_sender"))
+            receiver_ids = [int(ad_id) for ad_id in receivers]
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Передайте ad_sender и список ad_receivers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not receiver_ids:
+            return Response(
+                {"error": "Список ad_receivers пуст"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(receiver_ids) > proposal_services.MAX_BULK_CREATE_RECEIVERS:
+            return Response(
+                {
+                    "error": "Слишком много получателей в одном запросе "
+                    f"(максимум {proposal_services.MAX_BULK_CREATE_RECEIVERS})"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        result = proposal_services.bulk_create_proposals(
+            request.user,
+            ad_sender_id,
+            receiver_ids,
+            str(request.data.get("comment", "") or ""),
+        )
+        if result is None:
+            return Response(
+                {"error": "Объявление-отправитель не найдено или принадлежит другому пользователю"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        return Response(result, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=False, methods=["get"], permission_classes=[permissions.IsAuthenticated]
+    )
+    def export(self, request):
+        # Потоковая выгрузка предложений пользователя по фильтрам status/q
+        fmt = request.query_params.get("export_format", "ndjson")
+        if fmt not in exporter.EXPORT_FORMATS:
+            return Response(
+                {"error": "export_format: ndjson или csv"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return exporter.streaming_response(
+            self.get_queryset(), exporter.PROPOSAL_EXPORT_COLUMNS, fmt, "proposals"
         )
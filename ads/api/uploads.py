@@ -0,0 +1,101 @@
+from rest_framework import mixins, viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from ads.models import Ad, ImageUpload
+from ads.serializers import AdSerializer, ImageUploadSerializer
+from ads.services import uploads as upload_services
+from typing import Any
+
+
+# ViewSet загрузки изображений объявлений по частям:
+# POST /uploads/ -> PUT /uploads/{id}/chunk/?offset=N (тело — байты части) -> POST /uploads/{id}/complete/
+class ImageUploadViewSet(
+    mixins.RetrieveModelMixin, mixins.DestroyModelMixin, viewsets.GenericViewSet
+):
+    serializer_class = ImageUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self) -> Any:
+        # Пользователь видит только свои загрузки
+        return ImageUpload.objects.filter(user=self.request.user)
+
+    @staticmethod
+    def error_response(error: upload_services.UploadError) -> Response:
+        return Response(
+            {"error": error.message, "code": error.code},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    def create(self, request):
+        # Начинает загрузку: {"filename": "photo.jpg", "size": 123456, "content_type": "image/jpeg"}
+        try:
+            size = int(request.data.get("size"))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Передайте размер файла size"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            upload = upload_services.start_upload(
+                request.user,
+                str(request.data.get("filename", "") or ""),
+                size,
+                str(request.data.get("content_type", "") or ""),
+            )
+        except upload_services.UploadError as error:
+            return self.error_response(error)
+        return Response(self.get_serializer(upload).data, status=status.HTTP_201_CREATED)
+
+    def perform_destroy(self, instance):
+        upload_services.discard_upload(instance)
+
+    @action(detail=True, methods=["put"], parser_classes=[])
+    def chunk(self, request, pk=None):
+        # Дописывает часть файла; тело запроса — байты части, offset — её смещение.
+        # После обрыва клиент запрашивает GET /uploads/{id}/ и продолжает с received.
+        upload = self.get_object()
+        try:
+            offset = int(request.query_params.get("offset", ""))
+            length = int(request.META.get("CONTENT_LENGTH") or 0)
+        except ValueError:
+            return Response(
+                {"error": "offset и Content-Length должны быть числами"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            upload_services.append_chunk(upload, offset, request.stream, length)
+        except upload_services.UploadError as error:
+            if error.code == "offset_mismatch":
+                upload.refresh_from_db(fields=["received"])
+                return Response(
+                    {"error": error.message, "code": error.code, "received": upload.received},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            return self.error_response(error)
+        return Response(self.get_serializer(upload).data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=["post"])
+    def complete(self, request, pk=None):
+        # Завершает загрузку и прикрепляет изображение к объявлению: {"ad": 1}
+        upload = self.get_object()
+        try:
+            ad_id = int(request.data.get("ad"))
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "Передайте id объявления ad"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        ad = Ad.objects.filter(pk=ad_id, user=request.user).first()
+        if ad is None:
+            return Response(
+                {"error": "Объявление не найдено или принадлежит другому пользователю"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        try:
+            upload_services.complete_upload(upload, ad)
+        except upload_services.UploadError as error:
+            return self.error_response(error)
+        return Response(
+            AdSerializer(ad, context=self.get_serializer_context()).data,
+            status=status.HTTP_200_OK,
+        )
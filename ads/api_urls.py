@@ -1,12 +1,14 @@
 from rest_framework.routers import DefaultRouter
 from ads.api.ads import AdViewSet
 from ads.api.proposals import ExchangeProposalViewSet
+from ads.api.uploads import ImageUploadViewSet
 from ads.api.auth import RegisterView, LogoutView
 from django.urls import path
 
 router = DefaultRouter()
 router.register(r"ads", AdViewSet, basename="ad")
 router.register(r"proposals", ExchangeProposalViewSet, basename="exchangeproposal")
+router.register(r"uploads", ImageUploadViewSet, basename="imageupload")
 
 urlpatterns = router.urls
 urlpatterns += [
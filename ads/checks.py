@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Кэши, содержимое которых не видно другим процессам
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Инвалидация кэшей (поколения данных, кэш партнёров обмена) и блокировки
+    файлов изображений работают только с кэшем, общим для всех процессов:
+    с LocMemCache другой воркер продолжает отдавать устаревшие данные и 304.
+    :return: список ошибок проверки
+    """
+    backend = settings.CACHES.get("default", {}).get("BACKEND")
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Error(
+            f"Кэш по умолчанию ({backend}) не общий для процессов",
+            hint="Задайте REDIS_URL или настройте в CACHES Redis/Memcached",
+            id="ads.E001",
+        )
+    ]
@@ -0,0 +1,223 @@
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Type
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from .models import Ad
+from .serializers import AdSerializer, ExchangeProposalSerializer, UserSerializer
+
+# Поля, значение которых из values() уже совпадает с выводом DRF
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+# (имя в ответе, вид поля, колонки values(), поле DRF)
+FieldSpec = Tuple[str, str, Tuple[str, ...], Any]
+Accessor = Callable[[Dict[str, Any]], Any]
+
+
+@lru_cache(maxsize=None)
+def _field_specs(serializer_class: Type[serializers.ModelSerializer]) -> Tuple[FieldSpec, ...]:
+    # Разбор полей ModelSerializer выполняется один раз на класс
+    model = serializer_class.Meta.model
+    specs = []
+    for field in serializer_class()._readable_fields:
+        name = field.field_name
+        if isinstance(field, serializers.SerializerMethodField):
+            specs.append((name, "method", (), field))
+            continue
+        if "." in field.source or field.source == "*":
+            raise ImproperlyConfigured(
+                f"{serializer_class.__name__}.{name}: вложенный source не поддерживается"
+            )
+        column = model._meta.get_field(field.source).attname
+        if isinstance(field, serializers.FileField):
+            kind = "file"
+        elif isinstance(field, serializers.DateTimeField):
+            kind = "datetime"
+        elif isinstance(field, PASSTHROUGH_FIELDS) or (
+            isinstance(field, serializers.ChoiceField)
+            and all(isinstance(key, str) for key in field.choices)
+        ):
+            kind = "value"
+        elif isinstance(field, serializers.RelatedField):
+            raise ImproperlyConfigured(
+                f"{serializer_class.__name__}.{name}: поддерживается только PrimaryKeyRelatedField"
+            )
+        else:
+            kind = "field"
+        specs.append((name, kind, (column,), field))
+    return tuple(specs)
+
+
+class ValuesSerializer:
+    """
+    Read-only сериализация строк values() с тем же результатом, что и
+    serializer_class(instance).data: поля ModelSerializer разбираются один раз,
+    для каждого поля заранее собирается функция чтения значения из строки,
+    без создания моделей и вызова to_representation каждого поля DRF.
+    Поля-методы (SerializerMethodField) описываются в method_fields:
+    имя -> колонки values(), которые получает метод get_<имя> этого класса.
+    Поля-связи из expandable можно развернуть во вложенный объект: его колонки
+    читаются тем же values() через JOIN (префикс "<связь>__").
+    """
+
+    serializer_class: Type[serializers.ModelSerializer]
+    method_fields: Dict[str, Tuple[str, ...]] = {}
+    expandable: Dict[str, Type["ValuesSerializer"]] = {}
+
+    def __init__(
+        self,
+        context: Optional[Dict[str, Any]] = None,
+        fields: Optional[Iterable[str]] = None,
+        expand: Iterable[str] = (),
+        prefix: str = "",
+    ):
+        """
+        :param context: контекст сериализатора (request — для абсолютных URL)
+        :param fields: имена полей ответа (None — все поля serializer_class)
+        :param expand: поля-связи из expandable, выводимые вложенными объектами
+        :param prefix: префикс колонок для вложенного сериализатора
+        :raise serializers.ValidationError: неизвестные поля в fields или expand
+        """
+        self.context = context or {}
+        self.request = self.context.get("request")
+        specs = _field_specs(self.serializer_class)
+        if fields is not None:
+            fields = set(fields)
+            self._check_names("fields", fields, [spec[0] for spec in specs])
+            specs = tuple(spec for spec in specs if spec[0] in fields)
+        expand = set(expand)
+        self._check_names("expand", expand, self.expandable)
+        self.plan: List[Tuple[str, Accessor]] = []
+        columns: Dict[str, None] = {}
+        for name, kind, field_columns, field in specs:
+            if kind == "method":
+                field_columns = self.method_fields[name]
+            field_columns = tuple(prefix + column for column in field_columns)
+            if name in expand:
+                nested = self.expandable[name](
+                    self.context, prefix=f"{prefix}{field.source}__"
+                )
+                accessor = self._expanded_accessor(field_columns[0], nested)
+                field_columns += nested.columns
+            else:
+                accessor = self._accessor(name, kind, field_columns, field)
+            columns.update(dict.fromkeys(field_columns))
+            self.plan.append((name, accessor))
+        self.columns = tuple(columns)
+
+    @staticmethod
+    def _check_names(param: str, names: Iterable[str], allowed: Iterable[str]) -> None:
+        unknown = set(names) - set(allowed)
+        if unknown:
+            raise serializers.ValidationError(
+                {param: f"Неизвестные поля: {', '.join(sorted(unknown))}"}
+            )
+
+    @staticmethod
+    def _expanded_accessor(column: str, nested: "ValuesSerializer") -> Accessor:
+        # Пустая связь (NULL) — None, как у PrimaryKeyRelatedField
+        to_representation = nested.to_representation
+        return lambda row: None if row[column] is None else to_representation(row)
+
+    def _accessor(self, name: str, kind: str, columns: Tuple[str, ...], field: Any) -> Accessor:
+        if kind == "method":
+            method = getattr(self, f"get_{name}")
+            getter = itemgetter(*columns)
+            if len(columns) == 1:
+                return lambda row: method(getter(row))
+            return lambda row: method(*getter(row))
+        column = columns[0]
+        if kind == "value":
+            return itemgetter(column)
+        convert = {
+            "file": self._file_converter,
+            "datetime": self._datetime_converter,
+        }.get(kind, lambda field: field.to_representation)(field)
+
+        def access(row):
+            value = row[column]
+            # Как Serializer.to_representation: None отдаётся без вызова поля
+            return None if value is None else convert(value)
+
+        return access
+
+    def _file_converter(self, field: Any) -> Callable[[str], Any]:
+        # FileField/ImageField DRF: URL файла (абсолютный при наличии request)
+        storage = field.parent.Meta.model._meta.get_field(field.source).storage
+        use_url = getattr(field, "use_url", serializers.api_settings.UPLOADED_FILES_USE_URL)
+
+        def convert(name):
+            if not name:
+                return None
+            if not use_url:
+                return name
+            return self.absolute_url(storage.url(name))
+
+        return convert
+
+    def _datetime_converter(self, field: Any) -> Callable[[Any], Any]:
+        output_format = getattr(field, "format", serializers.api_settings.DATETIME_FORMAT)
+        tz = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+        if output_format is None or output_format.lower() != ISO_8601 or tz is None:
+            return field.to_representation
+
+        def convert(value):
+            if value.tzinfo is None:
+                return field.to_representation(value)
+            value = value.astimezone(tz).isoformat()
+            if value.endswith("+00:00"):
+                value = value[:-6] + "Z"
+            return value
+
+        return convert
+
+    def absolute_url(self, url: str) -> str:
+        return self.request.build_absolute_uri(url) if self.request else url
+
+    def to_representation(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Словарь ответа для одной строки.
+        :param row: строка queryset.values(*self.columns)
+        :return: dict с теми же ключами, порядком и значениями, что у serializer_class
+        """
+        return {name: access(row) for name, access in self.plan}
+
+    def many(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Список ответов для строк values() (аналог many=True).
+        :param rows: строки queryset.values(*self.columns)
+        :return: список dict
+        """
+        plan = self.plan
+        return [{name: access(row) for name, access in plan} for row in rows]
+
+
+class UserValuesSerializer(ValuesSerializer):
+    serializer_class = UserSerializer
+
+
+class AdValuesSerializer(ValuesSerializer):
+    serializer_class = AdSerializer
+    method_fields = {"renditions": ("image", "image_renditions")}
+    expandable = {"user": UserValuesSerializer}
+
+    def get_renditions(self, image: str, image_renditions: Optional[Dict[str, str]]) -> Dict[str, str]:
+        # То же, что AdSerializer.get_renditions / Ad.rendition_url, по колонкам строки
+        if not image:
+            return {}
+        storage = Ad._meta.get_field("image").storage
+        image_renditions = image_renditions or {}
+        return {
+            rendition: self.absolute_url(storage.url(image_renditions.get(rendition) or image))
+            for rendition in settings.ADS_IMAGE_RENDITIONS
+        }
+
+
+class ExchangeProposalValuesSerializer(ValuesSerializer):
+    serializer_class = ExchangeProposalSerializer
+    expandable = {"ad_sender": AdValuesSerializer, "ad_receiver": AdValuesSerializer}
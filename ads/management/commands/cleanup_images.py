@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from ads.services import images
+
+
+class Command(BaseCommand):
+    help = "Удаляет изображения и копии без ссылок из объявлений старше ADS_IMAGE_RELEASE_GRACE"
+
+    def handle(self, *args, **options):
+        removed_images, removed_renditions = images.cleanup_unreferenced_images()
+        self.stdout.write(
+            self.style.SUCCESS(f"Удалено изображений: {removed_images}, копий: {removed_renditions}")
+        )
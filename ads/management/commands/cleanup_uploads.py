@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from ads.services import uploads
+
+
+class Command(BaseCommand):
+    help = "Удаляет незавершённые загрузки изображений старше ADS_UPLOAD_EXPIRE_HOURS"
+
+    def handle(self, *args, **options):
+        removed = uploads.cleanup_expired_uploads()
+        self.stdout.write(self.style.SUCCESS(f"Удалено незавершённых загрузок: {removed}"))
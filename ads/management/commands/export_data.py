@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from ads.services import exporter
+from ads.services.ads import search_ads
+from ads.services.proposals import search_proposals
+
+
+class Command(BaseCommand):
+    help = "Потоково выгружает объявления или предложения пользователя в NDJSON/CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=("ads", "proposals"))
+        parser.add_argument("--file-format", choices=exporter.EXPORT_FORMATS, default="ndjson")
+        parser.add_argument("--output", help="Файл для выгрузки (по умолчанию stdout)")
+        parser.add_argument("--q", default="", help="Поисковый запрос")
+        parser.add_argument("--category", default="")
+        parser.add_argument("--condition", default="")
+        parser.add_argument("--status", default="", help="Статус предложений")
+        parser.add_argument("--user", help="username (обязателен для proposals)")
+
+    def handle(self, *args, **options):
+        if options["kind"] == "ads":
+            queryset = search_ads(options["q"], options["category"], options["condition"])
+            columns = exporter.AD_EXPORT_COLUMNS
+        else:
+            if not options["user"]:
+                raise CommandError("Для выгрузки предложений укажите --user")
+            user_model = get_user_model()
+            try:
+                user = user_model.objects.get(**{user_model.USERNAME_FIELD: options["user"]})
+            except user_model.DoesNotExist:
+                raise CommandError(f"Пользователь {options['user']} не найден")
+            queryset = search_proposals(user, options["status"], options["q"])
+            columns = exporter.PROPOSAL_EXPORT_COLUMNS
+        lines = exporter.export_queryset(queryset, columns, options["file_format"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as output:
+                output.writelines(lines)
+        else:
+            self.stdout.ending = ""
+            for line in lines:
+                self.stdout.write(line)
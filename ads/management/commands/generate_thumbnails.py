@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from ads.models import Ad
+from ads.services import thumbnails
+
+
+class Command(BaseCommand):
+    help = "Создаёт уменьшенные копии изображений объявлений (по умолчанию — только недостающие)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Пересоздать копии для всех изображений")
+
+    def handle(self, *args, **options):
+        ads = Ad.objects.exclude(image="").exclude(image__isnull=True)
+        if not options["force"]:
+            ads = ads.filter(image_renditions={})
+        done = failed = 0
+        for ad_id in ads.values_list("pk", flat=True).iterator(chunk_size=500):
+            if thumbnails.generate_ad_renditions(ad_id):
+                done += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(f"Обработано изображений: {done}, ошибок: {failed}"))
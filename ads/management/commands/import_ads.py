@@ -0,0 +1,60 @@
+import json
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from ads.services import importer
+
+
+class Command(BaseCommand):
+    help = "Потоково импортирует объявления из CSV или JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу .csv или .jsonl")
+        parser.add_argument("--user", required=True, help="username владельца объявлений")
+        parser.add_argument("--file-format", choices=importer.IMPORT_FORMATS, help="Формат (по умолчанию — по расширению)")
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--offset", type=int, default=0, help="Пропустить первые N строк данных (продолжение импорта)")
+        parser.add_argument("--report", help="Файл JSONL для отклонённых строк")
+
+    def handle(self, *args, **options):
+        user_model = get_user_model()
+        try:
+            user = user_model.objects.get(**{user_model.USERNAME_FIELD: options["user"]})
+        except user_model.DoesNotExist:
+            raise CommandError(f"Пользователь {options['user']} не найден")
+        fmt = options["file_format"] or importer.detect_format(options["path"])
+        if fmt is None:
+            raise CommandError("Не удалось определить формат файла, укажите --file-format")
+        report = open(options["report"], "w", encoding="utf-8") if options["report"] else None
+
+        def on_reject(row_number, errors):
+            if report:
+                report.write(json.dumps({"row": row_number, "errors": errors}, ensure_ascii=False) + "\n")
+
+        def on_batch(next_offset):
+            self.stdout.write(f"Записано, продолжить с --offset {next_offset}")
+
+        try:
+            with open(options["path"], "rb") as stream:
+                result = importer.import_ads(
+                    stream,
+                    fmt,
+                    user,
+                    batch_size=options["batch_size"],
+                    offset=options["offset"],
+                    on_reject=on_reject,
+                    on_batch=on_batch,
+                )
+        except importer.ImportFileError as error:
+            raise CommandError(
+                f"{error.message}. Создано: {error.created}, "
+                f"продолжить после исправления с --offset {error.next_offset}"
+            )
+        finally:
+            if report:
+                report.close()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Создано: {result['created']}, отклонено: {result['rejected']}, "
+                f"следующий offset: {result['next_offset']}"
+            )
+        )
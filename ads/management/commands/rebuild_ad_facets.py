@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from ads.services import facets
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает таблицу фасетов (категория, состояние) с нуля"
+
+    def handle(self, *args, **options):
+        rows = facets.rebuild_facets()
+        self.stdout.write(self.style.SUCCESS(f"Строк фасетов: {rows}"))
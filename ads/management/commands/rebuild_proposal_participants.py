@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from ads.services.participants import rebuild_participants
+
+
+class Command(BaseCommand):
+    help = "Перестраивает таблицу участников предложений по таблице предложений"
+
+    def handle(self, *args, **options):
+        count = rebuild_participants()
+        self.stdout.write(self.style.SUCCESS(f"Строк участников: {count}"))
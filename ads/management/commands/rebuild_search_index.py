@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from ads.models import Ad, ExchangeProposal
+from ads.services import search_index
+
+
+class Command(BaseCommand):
+    help = "Перестраивает полнотекстовые индексы объявлений и предложений (FTS5)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not search_index.search_index_available():
+            raise CommandError("Полнотекстовый индекс поддерживается только на SQLite")
+        batch_size = options["batch_size"]
+        ids = list(Ad.objects.order_by("pk").values_list("pk", flat=True))
+        for start in range(0, len(ids), batch_size):
+            search_index.index_ads(ids[start : start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано объявлений: {len(ids)}"))
+        ids = list(ExchangeProposal.objects.order_by("pk").values_list("pk", flat=True))
+        for start in range(0, len(ids), batch_size):
+            search_index.index_proposals(ids[start : start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано предложений: {len(ids)}"))
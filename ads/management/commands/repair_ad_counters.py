@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from ads.services import counters
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики предложений объявлений по таблице предложений"
+
+    def add_arguments(self, parser):
+        parser.add_argument("ad_ids", nargs="*", type=int, help="id объявлений (по умолчанию все)")
+
+    def handle(self, *args, **options):
+        updated = counters.recompute_counters(options["ad_ids"] or None)
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано объявлений: {updated}"))
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import migrations
+
+
+FTS_TABLE = "ads_ad_fts"
+
+
+def create_ad_fts(apps, schema_editor):
+    # Полнотекстовый индекс доступен только на SQLite (FTS5)
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    user_model = apps.get_model(settings.AUTH_USER_MODEL)
+    user_table = user_model._meta.db_table
+    username = user_model._meta.get_field("username").column
+    schema_editor.execute(
+        f"""
+        CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+            title, description, category, condition, username,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    schema_editor.execute(
+        f"""
+        INSERT INTO {FTS_TABLE}(rowid, title, description, category, condition, username)
+        SELECT a.id, a.title, a.description, a.category, a.condition, u.{username}
+        FROM ads_ad a LEFT JOIN {user_table} u ON u.id = a.user_id
+        """
+    )
+
+
+def drop_ad_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0002_remove_ad_image_url_ad_image"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_ad_fts, drop_ad_fts),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.0 on 2026-10-18 12:23
+
+from django.db import migrations, models
+
+
+def fill_facet_counts(apps, schema_editor):
+    Ad = apps.get_model("ads", "Ad")
+    AdFacetCount = apps.get_model("ads", "AdFacetCount")
+    facets = {}
+    for category, condition in Ad.objects.values_list("category", "condition").iterator():
+        keys = (
+            " ".join(str(category or "").split()).casefold(),
+            " ".join(str(condition or "").split()).casefold(),
+        )
+        if keys not in facets:
+            facets[keys] = AdFacetCount(
+                category_key=keys[0],
+                condition_key=keys[1],
+                category=" ".join(str(category or "").split()),
+                condition=" ".join(str(condition or "").split()),
+            )
+        facets[keys].count += 1
+    AdFacetCount.objects.bulk_create(facets.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0003_ad_fts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AdFacetCount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "category_key",
+                    models.CharField(max_length=100, verbose_name="Ключ категории"),
+                ),
+                (
+                    "condition_key",
+                    models.CharField(max_length=50, verbose_name="Ключ состояния"),
+                ),
+                (
+                    "category",
+                    models.CharField(max_length=100, verbose_name="Категория"),
+                ),
+                (
+                    "condition",
+                    models.CharField(max_length=50, verbose_name="Состояние"),
+                ),
+                (
+                    "count",
+                    models.PositiveIntegerField(default=0, verbose_name="Количество"),
+                ),
+            ],
+            options={
+                "verbose_name": "Счётчик фасета",
+                "verbose_name_plural": "Счётчики фасетов",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="adfacetcount",
+            constraint=models.UniqueConstraint(
+                fields=("category_key", "condition_key"), name="ads_facet_unique_keys"
+            ),
+        ),
+        migrations.RunPython(fill_facet_counts, migrations.RunPython.noop),
+    ]
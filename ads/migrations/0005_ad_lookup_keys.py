@@ -0,0 +1,50 @@
+# Generated by Django 5.0 on 2026-10-18 12:24
+
+from django.db import migrations, models
+
+
+def fill_lookup_keys(apps, schema_editor):
+    Ad = apps.get_model("ads", "Ad")
+    batch = []
+    for ad in Ad.objects.only("pk", "category", "condition").iterator(chunk_size=1000):
+        ad.category_key = " ".join(str(ad.category or "").split()).casefold()
+        ad.condition_key = " ".join(str(ad.condition or "").split()).casefold()
+        batch.append(ad)
+        if len(batch) >= 1000:
+            Ad.objects.bulk_update(batch, ["category_key", "condition_key"])
+            batch = []
+    if batch:
+        Ad.objects.bulk_update(batch, ["category_key", "condition_key"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0004_adfacetcount"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="category_key",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                max_length=100,
+                verbose_name="Ключ категории",
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="condition_key",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                max_length=50,
+                verbose_name="Ключ состояния",
+            ),
+        ),
+        migrations.RunPython(fill_lookup_keys, migrations.RunPython.noop),
+    ]
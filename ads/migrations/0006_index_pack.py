@@ -0,0 +1,92 @@
+# Generated by Django 5.0 on 2026-10-18 12:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0005_ad_lookup_keys"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="ad",
+            name="category_key",
+            field=models.CharField(
+                default="",
+                editable=False,
+                max_length=100,
+                verbose_name="Ключ категории",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="ad",
+            name="condition_key",
+            field=models.CharField(
+                default="", editable=False, max_length=50, verbose_name="Ключ состояния"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="ads_ad_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["category_key", "-created_at", "-id"],
+                name="ads_ad_cat_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["condition_key", "-created_at", "-id"],
+                name="ads_ad_cond_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(
+                fields=["user", "-created_at"], name="ads_ad_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="exchangeproposal",
+            index=models.Index(
+                fields=["ad_receiver", "status"], name="ads_prop_recv_status_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="exchangeproposal",
+            index=models.Index(
+                fields=["ad_sender", "ad_receiver"], name="ads_prop_send_recv_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="exchangeproposal",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="ads_prop_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="exchangeproposal",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["ad_receiver", "-created_at"],
+                name="ads_prop_pending_recv_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="exchangeproposal",
+            index=models.Index(
+                condition=models.Q(("status", "pending")),
+                fields=["ad_sender", "-created_at"],
+                name="ads_prop_pending_send_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.0 on 2026-10-18 12:27
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Ad = apps.get_model("ads", "Ad")
+    ExchangeProposal = apps.get_model("ads", "ExchangeProposal")
+
+    def count_of(field, **filters):
+        related = (
+            ExchangeProposal.objects.filter(**{field: OuterRef("pk")}, **filters)
+            .order_by()
+            .values(field)
+            .annotate(cnt=Count("id"))
+            .values("cnt")
+        )
+        return Coalesce(Subquery(related, output_field=IntegerField()), Value(0))
+
+    Ad.objects.update(
+        incoming_total=count_of("ad_receiver"),
+        incoming_pending=count_of("ad_receiver", status="pending"),
+        outgoing_total=count_of("ad_sender"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0006_index_pack"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="incoming_pending",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Входящих ожидающих"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="incoming_total",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Входящих предложений"
+            ),
+        ),
+        migrations.AddField(
+            model_name="ad",
+            name="outgoing_total",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Исходящих предложений"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
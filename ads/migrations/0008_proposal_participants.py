@@ -0,0 +1,126 @@
+# Generated by Django 5.0 on 2026-10-18 12:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_participants(apps, schema_editor):
+    Ad = apps.get_model("ads", "Ad")
+    ExchangeProposal = apps.get_model("ads", "ExchangeProposal")
+    ProposalParticipant = apps.get_model("ads", "ProposalParticipant")
+    owners = dict(Ad.objects.values_list("pk", "user_id"))
+    rows = []
+    proposals = ExchangeProposal.objects.values_list(
+        "pk", "ad_sender_id", "ad_receiver_id", "status", "created_at"
+    )
+    for pk, sender_id, receiver_id, status, created_at in proposals.iterator():
+        sender_user, receiver_user = owners[sender_id], owners[receiver_id]
+        if sender_user == receiver_user:
+            roles = [(sender_user, "both")]
+        else:
+            roles = [(sender_user, "sender"), (receiver_user, "receiver")]
+        rows.extend(
+            ProposalParticipant(
+                user_id=user_id,
+                proposal_id=pk,
+                role=role,
+                status=status,
+                created_at=created_at,
+            )
+            for user_id, role in roles
+        )
+    ProposalParticipant.objects.bulk_create(rows, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0007_ad_proposal_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProposalParticipant",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "role",
+                    models.CharField(
+                        choices=[
+                            ("sender", "Отправитель"),
+                            ("receiver", "Получатель"),
+                            ("both", "Отправитель и получатель"),
+                        ],
+                        max_length=10,
+                        verbose_name="Роль",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Ожидает"),
+                            ("accepted", "Принята"),
+                            ("rejected", "Отклонена"),
+                        ],
+                        max_length=10,
+                        verbose_name="Статус",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(verbose_name="Дата создания предложения"),
+                ),
+                (
+                    "proposal",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="participants",
+                        to="ads.exchangeproposal",
+                        verbose_name="Предложение",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="proposal_participations",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Участник предложения",
+                "verbose_name_plural": "Участники предложений",
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-created_at", "-proposal"],
+                        name="ads_part_user_created_idx",
+                    ),
+                    models.Index(
+                        fields=["user", "status", "-created_at", "-proposal"],
+                        name="ads_part_user_status_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="proposalparticipant",
+            constraint=models.UniqueConstraint(
+                fields=("user", "proposal"), name="ads_participant_unique"
+            ),
+        ),
+        migrations.RunPython(fill_participants, migrations.RunPython.noop),
+    ]
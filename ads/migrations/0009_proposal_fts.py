@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db import migrations
+
+
+FTS_TABLE = "ads_proposal_fts"
+
+
+def create_proposal_fts(apps, schema_editor):
+    # Поисковые документы предложений: только SQLite (FTS5), как и ads_ad_fts
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    user_model = apps.get_model(settings.AUTH_USER_MODEL)
+    user_table = user_model._meta.db_table
+    username = user_model._meta.get_field("username").column
+    schema_editor.execute(
+        f"""
+        CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+            comment,
+            sender_title, sender_description, sender_category, sender_condition, sender_username,
+            receiver_title, receiver_description, receiver_category, receiver_condition, receiver_username,
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+        """
+    )
+    schema_editor.execute(
+        f"""
+        INSERT INTO {FTS_TABLE}(
+            rowid, comment,
+            sender_title, sender_description, sender_category, sender_condition, sender_username,
+            receiver_title, receiver_description, receiver_category, receiver_condition, receiver_username
+        )
+        SELECT p.id, p.comment,
+            s.title, s.description, s.category, s.condition, su.{username},
+            r.title, r.description, r.category, r.condition, ru.{username}
+        FROM ads_exchangeproposal p
+        JOIN ads_ad s ON s.id = p.ad_sender_id
+        JOIN ads_ad r ON r.id = p.ad_receiver_id
+        LEFT JOIN {user_table} su ON su.id = s.user_id
+        LEFT JOIN {user_table} ru ON ru.id = r.user_id
+        """
+    )
+
+
+def drop_proposal_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0008_proposal_participants"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_proposal_fts, drop_proposal_fts),
+    ]
@@ -0,0 +1,91 @@
+# Generated by Django 5.0 on 2026-10-18 12:38
+
+import logging
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+logger = logging.getLogger(__name__)
+
+# Какое из дублирующихся предложений пары оставить: самое «решённое»
+STATUS_PRIORITY = {"accepted": 0, "rejected": 1, "pending": 2}
+
+
+def drop_duplicate_proposals(apps, schema_editor):
+    # Для каждой пары объявлений оставляет одно предложение: принятое, затем
+    # отклонённое, затем ожидающее; при равенстве — самое раннее (меньший id)
+    Ad = apps.get_model("ads", "Ad")
+    ExchangeProposal = apps.get_model("ads", "ExchangeProposal")
+    pairs = (
+        ExchangeProposal.objects.values("ad_sender_id", "ad_receiver_id")
+        .annotate(total=Count("id"))
+        .filter(total__gt=1)
+    )
+    duplicate_ids = []
+    ad_ids = set()
+    for pair in pairs:
+        rows = sorted(
+            ExchangeProposal.objects.filter(
+                ad_sender_id=pair["ad_sender_id"], ad_receiver_id=pair["ad_receiver_id"]
+            ).values_list("pk", "status"),
+            key=lambda row: (STATUS_PRIORITY.get(row[1], len(STATUS_PRIORITY)), row[0]),
+        )
+        duplicate_ids += [pk for pk, _ in rows[1:]]
+        ad_ids.update((pair["ad_sender_id"], pair["ad_receiver_id"]))
+    if not duplicate_ids:
+        return
+    # Удаление необратимо — фиксируем его в логе
+    logger.warning(
+        "Удалено дублирующихся предложений обмена: %s (пар объявлений: %s)",
+        len(duplicate_ids),
+        len(pairs),
+    )
+    for start in range(0, len(duplicate_ids), 500):
+        batch = duplicate_ids[start : start + 500]
+        # Строки участников удаляются каскадом
+        ExchangeProposal.objects.filter(pk__in=batch).delete()
+        if schema_editor.connection.vendor == "sqlite":
+            placeholders = ", ".join(["%s"] * len(batch))
+            schema_editor.execute(
+                f"DELETE FROM ads_proposal_fts WHERE rowid IN ({placeholders})", batch
+            )
+
+    def count_of(field, **filters):
+        related = (
+            ExchangeProposal.objects.filter(**{field: OuterRef("pk")}, **filters)
+            .order_by()
+            .values(field)
+            .annotate(cnt=Count("id"))
+            .values("cnt")
+        )
+        return Coalesce(Subquery(related, output_field=IntegerField()), Value(0))
+
+    Ad.objects.filter(pk__in=ad_ids).update(
+        incoming_total=count_of("ad_receiver"),
+        incoming_pending=count_of("ad_receiver", status="pending"),
+        outgoing_total=count_of("ad_sender"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0009_proposal_fts"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_proposals, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="exchangeproposal",
+            name="ads_prop_send_recv_idx",
+        ),
+        migrations.AddConstraint(
+            model_name="exchangeproposal",
+            constraint=models.UniqueConstraint(
+                fields=("ad_sender", "ad_receiver"),
+                name="ads_prop_unique_pair",
+                violation_error_message="Вы уже предлагали обмен этому объявлению",
+            ),
+        ),
+    ]
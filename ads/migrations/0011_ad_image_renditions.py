@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0010_proposal_unique_pair"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="image_renditions",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="Копии изображения",
+            ),
+        ),
+    ]
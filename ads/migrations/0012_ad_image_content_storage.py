@@ -0,0 +1,31 @@
+# Generated by Django 5.0 on 2026-10-18 12:45
+
+import ads.storage
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0011_ad_image_renditions"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="ad",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=ads.storage.ad_image_storage,
+                upload_to="ads/",
+                verbose_name="Изображение",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="ad",
+            index=models.Index(fields=["image"], name="ads_ad_image_idx"),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.0 on 2026-10-18 12:46
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0012_ad_image_content_storage"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageUpload",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "filename",
+                    models.CharField(max_length=255, verbose_name="Имя файла"),
+                ),
+                (
+                    "content_type",
+                    models.CharField(max_length=50, verbose_name="Тип содержимого"),
+                ),
+                ("size", models.PositiveBigIntegerField(verbose_name="Размер, байт")),
+                (
+                    "received",
+                    models.PositiveBigIntegerField(
+                        default=0, verbose_name="Получено, байт"
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="Дата начала"),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="image_uploads",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Загрузка изображения",
+                "verbose_name_plural": "Загрузки изображений",
+            },
+        ),
+    ]
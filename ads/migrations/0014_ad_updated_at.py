@@ -0,0 +1,25 @@
+# Generated by Django 5.0 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+def fill_updated_at(apps, schema_editor):
+    # Существующие объявления не менялись с момента публикации (насколько известно)
+    Ad = apps.get_model("ads", "Ad")
+    Ad.objects.update(updated_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ads", "0013_image_upload"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ad",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Дата изменения"),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
@@ -1,18 +1,115 @@
-from django.db import models
+import uuid
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from ads.storage import ad_image_storage
 
 
+def normalize_lookup(value) -> str:
+    """Ключ для сравнения без учёта регистра и лишних пробелов ("  Б/У " -> "б/у")."""
+    return " ".join(str(value or "").split()).casefold()
+
 
 class Ad(models.Model):
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, verbose_name='Пользователь')
     title = models.CharField(max_length=255, verbose_name='Заголовок')
     description = models.TextField(verbose_name='Описание')
-    image = models.ImageField(upload_to='ads/', blank=True, null=True, verbose_name='Изображение')
+    # Файлы хранятся по хешу содержимого: повторная загрузка того же фото не создаёт копию
+    image = models.ImageField(upload_to='ads/', storage=ad_image_storage, blank=True, null=True, verbose_name='Изображение')
     category = models.CharField(max_length=100, verbose_name='Категория')
     condition = models.CharField(max_length=50, verbose_name='Состояние')
+    # Нормализованные ключи для индексированного сравнения без учёта регистра
+    category_key = models.CharField(max_length=100, default='', editable=False, verbose_name='Ключ категории')
+    condition_key = models.CharField(max_length=50, default='', editable=False, verbose_name='Ключ состояния')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата публикации')
+    # Версия строки: меняется при любой записи, включая точечные UPDATE счётчиков
+    # и копий изображения (ключ кэша строк списка объявлений)
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Дата изменения')
+    # Денормализованные счётчики предложений (ads.services.counters)
+    incoming_total = models.PositiveIntegerField(default=0, editable=False, verbose_name='Входящих предложений')
+    incoming_pending = models.PositiveIntegerField(default=0, editable=False, verbose_name='Входящих ожидающих')
+    outgoing_total = models.PositiveIntegerField(default=0, editable=False, verbose_name='Исходящих предложений')
+    # Имена уменьшенных копий изображения: {"thumb": ..., "medium": ...} (ads.services.thumbnails)
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False, verbose_name='Копии изображения')
     objects = models.Manager()
 
+    LOOKUP_KEYS = {'category': 'category_key', 'condition': 'condition_key'}
+    COUNTER_FIELDS = ('incoming_total', 'incoming_pending', 'outgoing_total')
+    # Поля, которые пишутся только точечными UPDATE, а не полной записью строки
+    DERIVED_FIELDS = COUNTER_FIELDS + ('image_renditions',)
+
+    class Meta:
+        indexes = [
+            # Лента объявлений: ORDER BY created_at DESC, id DESC (+ keyset-пагинация)
+            models.Index(fields=['-created_at', '-id'], name='ads_ad_created_idx'),
+            # Фильтр по категории/состоянию с той же сортировкой
+            models.Index(fields=['category_key', '-created_at', '-id'], name='ads_ad_cat_created_idx'),
+            models.Index(fields=['condition_key', '-created_at', '-id'], name='ads_ad_cond_created_idx'),
+            # Объявления пользователя (ad_sender__user / ad_receiver__user в поиске предложений)
+            models.Index(fields=['user', '-created_at'], name='ads_ad_user_created_idx'),
+            # Подсчёт ссылок на файл изображения перед его удалением
+            models.Index(fields=['image'], name='ads_ad_image_idx'),
+        ]
+
+    def refresh_lookup_keys(self):
+        # Вызывается из save(); при bulk_create ключи нужно заполнить явно
+        self.category_key = normalize_lookup(self.category)
+        self.condition_key = normalize_lookup(self.condition)
+
+    def save(self, *args, **kwargs):
+        self.refresh_lookup_keys()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # Счётчики меняются только через UPDATE ... SET x = x + d, копии
+            # изображения — фоновой генерацией; полная запись строки не должна
+            # затирать их устаревшими значениями из памяти
+            update_fields = kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.DERIVED_FIELDS
+            ]
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {
+                key for field, key in self.LOOKUP_KEYS.items() if field in update_fields
+            }
+            if update_fields:
+                # Версия строки (updated_at, auto_now) меняется при любой записи,
+                # в том числе частичной: по ней инвалидируется кэш строк списка
+                kwargs['update_fields'].add('updated_at')
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значения из БД нужны сигналам, чтобы вычесть старые фасеты при изменении
+        instance._loaded_facets = (
+            instance.__dict__.get("category"),
+            instance.__dict__.get("condition"),
+        )
+        # Имя изображения из БД: по нему сигнал узнаёт о новой загрузке
+        instance._loaded_image = str(instance.__dict__.get("image") or "")
+        return instance
+
+    def rendition_url(self, rendition):
+        """
+        URL уменьшенной копии изображения; пока копия не готова — URL оригинала.
+        :param rendition: имя копии из ADS_IMAGE_RENDITIONS ("thumb", "medium")
+        :return: URL или пустая строка без изображения
+        """
+        if not self.image:
+            return ""
+        name = (self.image_renditions or {}).get(rendition)
+        if name:
+            return self.image.storage.url(name)
+        return self.image.url
+
+    @property
+    def thumbnail_url(self):
+        return self.rendition_url('thumb')
+
+    @property
+    def medium_url(self):
+        return self.rendition_url('medium')
+
     def __str__(self):
         return str(self.title)
 
@@ -29,6 +126,129 @@ class ExchangeProposal(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')
     objects = models.Manager()
 
+    class Meta:
+        constraints = [
+            # Одно предложение на пару объявлений; индекс ограничения заменяет
+            # обычный индекс (ad_sender, ad_receiver) для проверки «уже предложено»
+            models.UniqueConstraint(
+                fields=['ad_sender', 'ad_receiver'],
+                name='ads_prop_unique_pair',
+                violation_error_message='Вы уже предлагали обмен этому объявлению',
+            ),
+        ]
+        indexes = [
+            # Входящие предложения объявления с фильтром по статусу
+            models.Index(fields=['ad_receiver', 'status'], name='ads_prop_recv_status_idx'),
+            # Списки предложений: ORDER BY created_at DESC, id DESC
+            models.Index(fields=['-created_at', '-id'], name='ads_prop_created_idx'),
+            # Ожидающие ответа — частичные индексы только по строкам status='pending'
+            models.Index(
+                fields=['ad_receiver', '-created_at'],
+                condition=models.Q(status='pending'),
+                name='ads_prop_pending_recv_idx',
+            ),
+            models.Index(
+                fields=['ad_sender', '-created_at'],
+                condition=models.Q(status='pending'),
+                name='ads_prop_pending_send_idx',
+            ),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Состояние из БД: по нему сигналы пересчитывают счётчики при изменении
+        instance._loaded_state = instance.counter_state()
+        return instance
+
+    def counter_state(self):
+        return (
+            self.__dict__.get('ad_sender_id'),
+            self.__dict__.get('ad_receiver_id'),
+            self.__dict__.get('status'),
+        )
+
+    def save(self, *args, **kwargs):
+        # Запись предложения и обновление счётчиков объявлений — одна транзакция
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
     def __str__(self):
         status_display = dict(self.STATUS_CHOICES).get(str(self.status), self.status)
         return f"{str(self.ad_sender)} → {str(self.ad_receiver)} ({status_display})"
+
+
+class ProposalParticipant(models.Model):
+    # Строка на каждого участника предложения (fan-out on write): списки
+    # предложений пользователя читаются диапазоном по индексу (user, ...)
+    ROLE_CHOICES = [
+        ('sender', 'Отправитель'),
+        ('receiver', 'Получатель'),
+        ('both', 'Отправитель и получатель'),
+    ]
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, db_index=False, related_name='proposal_participations', verbose_name='Пользователь')
+    proposal = models.ForeignKey(ExchangeProposal, on_delete=models.CASCADE, related_name='participants', verbose_name='Предложение')
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES, verbose_name='Роль')
+    # Копии полей предложения для фильтрации и сортировки без JOIN
+    status = models.CharField(max_length=10, choices=ExchangeProposal.STATUS_CHOICES, verbose_name='Статус')
+    created_at = models.DateTimeField(verbose_name='Дата создания предложения')
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'Участник предложения'
+        verbose_name_plural = 'Участники предложений'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'proposal'], name='ads_participant_unique'
+            ),
+        ]
+        indexes = [
+            # Все предложения пользователя: ORDER BY created_at DESC, proposal DESC
+            models.Index(fields=['user', '-created_at', '-proposal'], name='ads_part_user_created_idx'),
+            # То же с фильтром по статусу
+            models.Index(fields=['user', 'status', '-created_at', '-proposal'], name='ads_part_user_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} — {self.proposal_id} ({self.role})"
+
+
+class AdFacetCount(models.Model):
+    # Количество объявлений по паре (категория, состояние); поддерживается сигналами
+    category_key = models.CharField(max_length=100, verbose_name='Ключ категории')
+    condition_key = models.CharField(max_length=50, verbose_name='Ключ состояния')
+    category = models.CharField(max_length=100, verbose_name='Категория')
+    condition = models.CharField(max_length=50, verbose_name='Состояние')
+    count = models.PositiveIntegerField(default=0, verbose_name='Количество')
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'Счётчик фасета'
+        verbose_name_plural = 'Счётчики фасетов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['category_key', 'condition_key'], name='ads_facet_unique_keys'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.category} / {self.condition}: {self.count}"
+
+
+class ImageUpload(models.Model):
+    # Сессия загрузки изображения по частям (ads.services.uploads)
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='image_uploads', verbose_name='Пользователь')
+    filename = models.CharField(max_length=255, verbose_name='Имя файла')
+    content_type = models.CharField(max_length=50, verbose_name='Тип содержимого')
+    size = models.PositiveBigIntegerField(verbose_name='Размер, байт')
+    received = models.PositiveBigIntegerField(default=0, verbose_name='Получено, байт')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Дата начала')
+    objects = models.Manager()
+
+    class Meta:
+        verbose_name = 'Загрузка изображения'
+        verbose_name_plural = 'Загрузки изображений'
+
+    def __str__(self):
+        return f"{self.filename}: {self.received}/{self.size}"
@@ -0,0 +1,508 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import json
+from typing import Any, Iterable, List, Optional, Sequence, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+from django.db.models import F, Q, QuerySet
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+from ads.services import generations as data_generations
+
+DEFAULT_KEYSET_ORDERING = ("-created_at", "-id")
+
+
+class InvalidCursor(Exception):
+    """Курсор повреждён или не соответствует сортировке списка."""
+
+
+def encode_cursor(direction: str, values: Sequence[Any]) -> str:
+    """
+    Кодирует позицию в списке в непрозрачную строку для ссылок.
+    :param direction: "n" — следующая страница, "p" — предыдущая
+    :param values: значения ключей сортировки граничной записи
+    :return: строка курсора (base64)
+    """
+    payload = json.dumps({"d": direction, "k": list(values)}, default=_cursor_value)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def _cursor_value(value: Any) -> str:
+    # Даты кодируются с микросекундами: DjangoJSONEncoder обрезает их до миллисекунд
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+
+def decode_cursor(cursor: str) -> Tuple[str, List[Any]]:
+    """
+    Декодирует курсор, полученный из encode_cursor.
+    :param cursor: строка курсора
+    :return: (направление, значения ключей)
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction, values = payload["d"], payload["k"]
+    except (binascii.Error, ValueError, TypeError, KeyError) as exc:
+        raise InvalidCursor(cursor) from exc
+    if direction not in ("n", "p") or not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return direction, values
+
+
+class KeysetPage:
+    """Страница keyset-пагинации: без COUNT(*) и без OFFSET."""
+
+    def __init__(
+        self,
+        object_list: List[Any],
+        next_cursor: Optional[str],
+        previous_cursor: Optional[str],
+    ):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+
+class KeysetPaginator:
+    """
+    Пагинация по ключам сортировки (по умолчанию -created_at, -id).
+    Каждая страница — один запрос вида WHERE created_at <= %s AND (created_at < %s
+    OR (created_at = %s AND id < %s)) LIMIT n + 1: граница по первому ключу даёт
+    поиск по индексу от позиции курсора, поэтому глубокие страницы стоят столько
+    же, сколько первая.
+    """
+
+    def __init__(self, queryset: QuerySet, per_page: int):
+        self.per_page = per_page
+        ordering = tuple(queryset.query.order_by) or DEFAULT_KEYSET_ORDERING
+        if not all(isinstance(field, str) for field in ordering):
+            raise ValueError("Keyset-пагинация поддерживает только сортировку по полям")
+        self.keys = [
+            (f"keyset_{i}", field.lstrip("-"), field.startswith("-"))
+            for i, field in enumerate(ordering)
+        ]
+        self.queryset = queryset.annotate(
+            **{alias: F(field) for alias, field, _ in self.keys}
+        )
+
+    def _ordered(self, reverse: bool) -> QuerySet:
+        ordering = [
+            alias if descending == reverse else f"-{alias}"
+            for alias, _, descending in self.keys
+        ]
+        return self.queryset.order_by(*ordering)
+
+    def _after(self, values: List[Any], reverse: bool) -> Q:
+        # (k0, k1, ...) строго после values в порядке сортировки (или до, если reverse):
+        # k0 < v0 OR (k0 = v0 AND (k1 < v1 OR ...))
+        if len(values) != len(self.keys):
+            raise InvalidCursor(values)
+        condition = Q()
+        for i in reversed(range(len(self.keys))):
+            alias, _, descending = self.keys[i]
+            lookup = "lt" if descending != reverse else "gt"
+            step = Q(**{f"{alias}__{lookup}": values[i]})
+            if i < len(self.keys) - 1:
+                step |= Q(**{alias: values[i]}) & condition
+            condition = step
+        if len(self.keys) > 1:
+            # Из OR-развёртки SQLite не выводит границу диапазона индекса и сканирует
+            # его с начала; явное k0 <= v0 даёт SEARCH по индексу от позиции курсора
+            alias, _, descending = self.keys[0]
+            lookup = "lte" if descending != reverse else "gte"
+            condition &= Q(**{f"{alias}__{lookup}": values[0]})
+        return condition
+
+    def _values(self, obj: Any) -> List[Any]:
+        # Строки — модели или словари queryset.values() (ads.api.fast_read)
+        if isinstance(obj, dict):
+            return [obj[alias] for alias, _, _ in self.keys]
+        return [getattr(obj, alias) for alias, _, _ in self.keys]
+
+    def _page_queryset(
+        self, cursor: Optional[str]
+    ) -> Tuple[QuerySet, Optional[List[Any]], bool]:
+        direction, values = decode_cursor(cursor) if cursor else ("n", None)
+        reverse = direction == "p"
+        queryset = self._ordered(reverse)
+        if values is not None:
+            try:
+                queryset = queryset.filter(self._after(values, reverse))
+            except (ValidationError, ValueError, TypeError) as exc:
+                raise InvalidCursor(cursor) from exc
+        return queryset[: self.per_page + 1], values, reverse
+
+    def get_page(self, cursor: Optional[str]) -> KeysetPage:
+        """
+        Возвращает страницу по курсору (пустой курсор — первая страница).
+        :param cursor: строка курсора из next_cursor/previous_cursor
+        :return: KeysetPage
+        """
+        queryset, values, reverse = self._page_queryset(cursor)
+        return self._build_page(list(queryset), values, reverse)
+
+    async def aget_page(self, cursor: Optional[str]) -> KeysetPage:
+        """
+        Асинхронный вариант get_page.
+        :param cursor: строка курсора из next_cursor/previous_cursor
+        :return: KeysetPage
+        """
+        queryset, values, reverse = self._page_queryset(cursor)
+        return self._build_page([obj async for obj in queryset], values, reverse)
+
+    def _build_page(
+        self, rows: List[Any], values: Optional[List[Any]], reverse: bool
+    ) -> KeysetPage:
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if reverse:
+            rows.reverse()
+        if not rows:
+            return KeysetPage([], None, None)
+        first, last = self._values(rows[0]), self._values(rows[-1])
+        if reverse:
+            has_next, has_previous = values is not None, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        return KeysetPage(
+            rows,
+            encode_cursor("n", last) if has_next else None,
+            encode_cursor("p", first) if has_previous else None,
+        )
+
+
+class KeysetCursorPagination(BasePagination):
+    """Курсорная пагинация DRF поверх KeysetPaginator (ответ без count)."""
+
+    cursor_query_param = "cursor"
+    page_size = api_settings.PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        cursor = request.query_params.get(self.cursor_query_param) or None
+        try:
+            self.page = KeysetPaginator(queryset, self.page_size).get_page(cursor)
+        except InvalidCursor:
+            raise NotFound("Неверный курсор")
+        return list(self.page.object_list)
+
+    def _cursor_link(self, cursor: Optional[str]) -> Optional[str]:
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self) -> Optional[str]:
+        return self._cursor_link(self.page.next_cursor)
+
+    def get_previous_link(self) -> Optional[str]:
+        return self._cursor_link(self.page.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+
+def normalize_filter_key(prefix: str, **filters: Any) -> str:
+    """
+    Нормализованный ключ набора фильтров: регистр, пробелы и пустые значения
+    не влияют на ключ, поэтому "Книги" и " книги " делят один кэш.
+    :param prefix: пространство ключей (например, "ads")
+    :param filters: значения фильтров
+    :return: строка ключа
+    """
+    parts = [
+        f"{name}={' '.join(str(value).split()).casefold()}"
+        for name, value in sorted(filters.items())
+        if value not in (None, "")
+    ]
+    return f"{prefix}?{'&'.join(parts)}"
+
+
+class CountingPaginator(Paginator):
+    """Paginator с точным COUNT(*) и общим интерфейсом отображения количества."""
+
+    count_is_estimate = False
+
+    def __init__(
+        self,
+        object_list,
+        per_page,
+        count_key: Optional[str] = None,
+        generations: Iterable[str] = (),
+        **kwargs,
+    ):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.generations = tuple(generations)
+
+    @property
+    def count_display(self) -> str:
+        display = f"{self.count:,}".replace(",", " ")
+        return f"{display}+" if self.count_is_estimate else display
+
+    async def _acompute_count(self) -> int:
+        acount = getattr(self.object_list, "acount", None)
+        if acount is None:
+            return len(self.object_list)
+        return await acount()
+
+    async def _aresolve_count(self) -> int:
+        return await self._acompute_count()
+
+    async def acount(self) -> int:
+        """
+        Асинхронный count: значение запоминается, поэтому get_page после него
+        не выполняет COUNT(*) повторно.
+        :return: количество объектов
+        """
+        if "count" not in self.__dict__:
+            self.__dict__["count"] = await self._aresolve_count()
+        return self.count
+
+    async def _afetch(self, number: int) -> List[Any]:
+        bottom = (number - 1) * self.per_page
+        rows = self.object_list[bottom : bottom + self.per_page + self.orphans]
+        if isinstance(rows, QuerySet):
+            return [obj async for obj in rows]
+        return list(rows)
+
+    async def aget_page(self, number: Any) -> Page:
+        """
+        Асинхронный get_page: количество и строки запрошенной страницы
+        запрашиваются одновременно; если номер оказался за последней
+        страницей, строки перечитываются для последней.
+        :param number: номер страницы из запроса
+        :return: Page с загруженным списком объектов
+        """
+        try:
+            requested = max(int(number), 1)
+        except (TypeError, ValueError):
+            requested = 1
+        _, rows = await asyncio.gather(self.acount(), self._afetch(requested))
+        page = self.get_page(requested)
+        if page.number != requested:
+            rows = await self._afetch(page.number)
+        page.object_list = rows[: max(page.end_index() - page.start_index() + 1, 0)]
+        return page
+
+
+class CachedCountPaginator(CountingPaginator):
+    """
+    Кэширует точное количество по нормализованному ключу фильтра.
+    Ключ включает поколения данных, поэтому запись в Ad/ExchangeProposal
+    делает старые значения недостижимыми.
+    """
+
+    def _count_cache_key(self, gens: Optional[Tuple[int, ...]] = None) -> str:
+        if gens is None:
+            gens = data_generations.get_generations(*self.generations)
+        raw = f"{type(self).__name__}:{self.count_key}:{gens}"
+        return "ads:count:" + hashlib.md5(raw.encode()).hexdigest()
+
+    def _compute_count(self) -> Any:
+        return super().count
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return self._compute_count()
+        key = self._count_cache_key()
+        cached = cache.get(key)
+        if cached is not None:
+            self.__dict__.update(cached[1])
+            return cached[0]
+        value = self._compute_count()
+        state = {"count_is_estimate": self.count_is_estimate}
+        cache.set(key, (value, state), settings.ADS_COUNT_CACHE_TIMEOUT)
+        return value
+
+    async def _aresolve_count(self) -> int:
+        if self.count_key is None:
+            return await self._acompute_count()
+        gens = await data_generations.aget_generations(*self.generations)
+        key = self._count_cache_key(gens)
+        cached = await cache.aget(key)
+        if cached is not None:
+            self.__dict__.update(cached[1])
+            return cached[0]
+        value = await self._acompute_count()
+        state = {"count_is_estimate": self.count_is_estimate}
+        await cache.aset(key, (value, state), settings.ADS_COUNT_CACHE_TIMEOUT)
+        return value
+
+
+class EstimatedCountPaginator(CachedCountPaginator):
+    """
+    Считает не больше ADS_COUNT_ESTIMATE_THRESHOLD строк (COUNT по LIMIT-подзапросу);
+    если строк больше, показывает «10 000+» вместо полного COUNT(*).
+    """
+
+    def _compute_count(self) -> Any:
+        threshold = settings.ADS_COUNT_ESTIMATE_THRESHOLD
+        object_list = self.object_list
+        if not hasattr(object_list, "count"):
+            return len(object_list)
+        bounded = object_list[: threshold + 1].count()
+        if bounded > threshold:
+            self.count_is_estimate = True
+            return threshold
+        return bounded
+
+    async def _acompute_count(self) -> int:
+        threshold = settings.ADS_COUNT_ESTIMATE_THRESHOLD
+        object_list = self.object_list
+        if not hasattr(object_list, "acount"):
+            return len(object_list)
+        bounded = await object_list[: threshold + 1].acount()
+        if bounded > threshold:
+            self.count_is_estimate = True
+            return threshold
+        return bounded
+
+
+def get_paginator(
+    object_list,
+    per_page: int,
+    count_key: Optional[str] = None,
+    generations: Iterable[str] = (),
+) -> CountingPaginator:
+    """
+    Создаёт paginator стратегии из настройки ADS_PAGINATOR_CLASS.
+    :param object_list: QuerySet или список
+    :param per_page: размер страницы
+    :param count_key: нормализованный ключ фильтра для кэширования количества
+    :param generations: поколения данных, от которых зависит количество
+    :return: экземпляр CountingPaginator
+    """
+    paginator_class = import_string(settings.ADS_PAGINATOR_CLASS)
+    return paginator_class(
+        object_list, per_page, count_key=count_key, generations=generations
+    )
+
+
+class AdsPagination(PageNumberPagination):
+    """
+    Постраничная пагинация по умолчанию; при наличии параметра ?cursor=
+    (в том числе пустого — первая страница) переключается на keyset-режим.
+    Количество считает стратегия ADS_PAGINATOR_CLASS; ViewSet задаёт
+    count_generations и count_per_user для ключа кэша.
+    """
+
+    cursor_pagination_class = KeysetCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        if self.cursor_pagination_class.cursor_query_param in request.query_params:
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        self.django_paginator_class = self._paginator_factory(request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def _paginator_factory(self, request, view):
+        # Формат и состав полей ответа (?fields=, ?expand=) не меняют количество
+        ignored = {self.page_query_param, self.page_size_query_param, "format", "fields", "expand"}
+        filters = {
+            name: value
+            for name, value in request.query_params.items()
+            if name not in ignored
+        }
+        if getattr(view, "count_per_user", False):
+            filters["user"] = request.user.pk
+        prefix = getattr(view, "basename", None) or type(view).__name__
+        count_key = normalize_filter_key(prefix, **filters)
+        count_generations = getattr(view, "count_generations", ())
+
+        def factory(queryset, page_size):
+            return get_paginator(
+                queryset, page_size, count_key=count_key, generations=count_generations
+            )
+
+        return factory
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        response = super().get_paginated_response(data)
+        if getattr(self.page.paginator, "count_is_estimate", False):
+            response.data["count_is_estimate"] = True
+        return response
+
+
+def paginate_keyset(request, queryset: QuerySet, per_page: int) -> KeysetPage:
+    """
+    Keyset-пагинация для HTML-представлений: курсор берётся из ?cursor=.
+    :param request: HttpRequest
+    :param queryset: отсортированный QuerySet
+    :param per_page: размер страницы
+    :return: KeysetPage (при неверном курсоре — первая страница)
+    """
+    paginator = KeysetPaginator(queryset, per_page)
+    try:
+        return paginator.get_page(request.GET.get("cursor") or None)
+    except InvalidCursor:
+        return paginator.get_page(None)
+
+
+async def apaginate_keyset(request, queryset: QuerySet, per_page: int) -> KeysetPage:
+    """
+    Асинхронный вариант paginate_keyset.
+    :param request: HttpRequest
+    :param queryset: отсортированный QuerySet
+    :param per_page: размер страницы
+    :return: KeysetPage (при неверном курсоре — первая страница)
+    """
+    paginator = KeysetPaginator(queryset, per_page)
+    try:
+        return await paginator.aget_page(request.GET.get("cursor") or None)
+    except InvalidCursor:
+        return await paginator.aget_page(None)
+
+
+def filter_querystring(request) -> str:
+    """
+    Текущие GET-параметры без page/cursor — для ссылок пагинации.
+    :param request: HttpRequest
+    :return: urlencoded строка (с завершающим & или пустая)
+    """
+    params = request.GET.copy()
+    params.pop("page", None)
+    params.pop("cursor", None)
+    encoded = params.urlencode()
+    return f"{encoded}&" if encoded else ""
@@ -1,16 +1,53 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from .models import Ad, ExchangeProposal
+from rest_framework.validators import UniqueTogetherValidator
+from .models import Ad, ExchangeProposal, ImageUpload
+
+
+class UserSerializer(serializers.ModelSerializer):
+    # Публичные данные пользователя (для ?expand=user)
+    class Meta:
+        model = get_user_model()
+        fields = ("id", "username")
 
 
 class AdSerializer(serializers.ModelSerializer):
     user = serializers.PrimaryKeyRelatedField(read_only=True)
+    renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Ad
-        fields = "__all__"
+        exclude = ("category_key", "condition_key", "image_renditions")
+
+    def get_renditions(self, obj):
+        # URL уменьшенных копий изображения (пока копии не готовы — URL оригинала)
+        if not obj.image:
+            return {}
+        request = self.context.get("request")
+        urls = {}
+        for rendition in settings.ADS_IMAGE_RENDITIONS:
+            url = obj.rendition_url(rendition)
+            urls[rendition] = request.build_absolute_uri(url) if request else url
+        return urls
 
 
 class ExchangeProposalSerializer(serializers.ModelSerializer):
     class Meta:
         model = ExchangeProposal
         fields = "__all__"
+        # DRF 3.14 не строит валидаторы по UniqueConstraint — задаём явно
+        validators = [
+            UniqueTogetherValidator(
+                queryset=ExchangeProposal.objects.all(),
+                fields=["ad_sender", "ad_receiver"],
+                message="Вы уже предлагали обмен этому объявлению",
+            )
+        ]
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ImageUpload
+        fields = ("id", "filename", "content_type", "size", "received", "created_at")
+        read_only_fields = ("received",)
@@ -0,0 +1,18 @@
+from typing import Sequence
+from ads.models import Ad
+from ads.services import facets, generations, search_index
+
+# Производные данные новых объявлений. Вызывается сигналом post_save и массовой
+# вставкой (bulk_create), которая сигналы не отправляет.
+
+
+def ads_created(ads: Sequence[Ad]) -> None:
+    """
+    Объявления созданы: полнотекстовый индекс, счётчики фасетов, поколения.
+    :param ads: сохранённые объявления с заполненными id
+    """
+    if not ads:
+        return
+    search_index.index_ads([ad.pk for ad in ads])
+    facets.apply_facet_delta([(ad.category, ad.condition) for ad in ads], 1)
+    generations.bump_generation(generations.ADS, generations.PROPOSALS)
@@ -1,21 +1,44 @@
 from functools import reduce
 import operator
 from typing import Tuple, Dict, Set, Any
-from django.db.models import Q, QuerySet, Count
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
 from django.contrib.auth.models import AbstractBaseUser
-from ads.models import Ad, ExchangeProposal
+from ads.models import Ad, normalize_lookup
+from ads.services.indicators import compute_exchange_indicators
+from ads.services.search_index import AD_FTS_TABLE, search_index_available
 
 
-def search_ads(query: str, category: str, condition: str) -> QuerySet:
+def build_fts_query(query: str) -> str:
     """
-    Поиск объявлений по всем основным полям (нечувствительно к регистру).
+    Преобразует пользовательский запрос в выражение FTS5 MATCH.
+    Каждое слово ищется по префиксу, слова объединяются через AND.
+    :param query: поисковый запрос
+    :return: выражение для MATCH или пустая строка, если слов нет
+    """
+    terms = [term for term in query.split() if any(ch.isalnum() for ch in term)]
+    return " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+
+def fts_enabled() -> bool:
+    """
+    Проверяет, можно ли использовать полнотекстовый индекс объявлений.
+    :return: True, если бэкенд поиска — FTS и база данных — SQLite
+    """
+    backend = getattr(settings, "ADS_SEARCH_BACKEND", "fts")
+    return backend == "fts" and search_index_available()
+
+
+def search_ads_like(query: str, category: str, condition: str) -> QuerySet:
+    """
+    Поиск объявлений через icontains по всем основным полям (резервный путь без индекса).
     :param query: поисковый запрос
     :param category: фильтр по категории
     :param condition: фильтр по состоянию
     :return: QuerySet объявлений
     """
-    ads = Ad.objects.all().order_by("-created_at")
-    ads = ads.select_related("user").prefetch_related("received_proposals")
+    ads = _base_ads_queryset(category, condition)
     if query:
         q_list = [
             Q(title__icontains=query),
@@ -25,10 +48,49 @@ def search_ads(query: str, category: str, condition: str) -> QuerySet:
             Q(user__username__icontains=query),
         ]
         ads = ads.filter(reduce(operator.or_, q_list))
+    return ads
+
+
+def search_ads(
+    query: str, category: str, condition: str, ranked: bool = False
+) -> QuerySet:
+    """
+    Поиск объявлений по всем основным полям (нечувствительно к регистру).
+    Использует полнотекстовый индекс FTS5, если он доступен, иначе — icontains.
+    :param query: поисковый запрос
+    :param category: фильтр по категории
+    :param condition: фильтр по состоянию
+    :param ranked: сортировать по релевантности (bm25) вместо даты
+    :return: QuerySet объявлений
+    """
+    match = build_fts_query(query) if query else ""
+    if not query or not match or not fts_enabled():
+        return search_ads_like(query, category, condition)
+    ads = _base_ads_queryset(category, condition)
+    ads = ads.filter(
+        pk__in=RawSQL(
+            f"SELECT rowid FROM {AD_FTS_TABLE} WHERE {AD_FTS_TABLE} MATCH %s",
+            [match],
+        )
+    )
+    if ranked:
+        rank = RawSQL(
+            f"SELECT bm25({AD_FTS_TABLE}) FROM {AD_FTS_TABLE} "
+            f"WHERE {AD_FTS_TABLE} MATCH %s AND rowid = ads_ad.id",
+            [match],
+        )
+        ads = ads.annotate(rank=rank).order_by("rank", "-created_at", "-id")
+    return ads
+
+
+def _base_ads_queryset(category: str, condition: str) -> QuerySet:
+    ads = Ad.objects.all().order_by("-created_at", "-id")
+    ads = ads.select_related("user")
+    # Равенство по нормализованным ключам использует индекс (iexact в SQLite — LIKE)
     if category:
-        ads = ads.filter(category__iexact=category)
+        ads = ads.filter(category_key=normalize_lookup(category))
     if condition:
-        ads = ads.filter(condition__iexact=condition)
+        ads = ads.filter(condition_key=normalize_lookup(condition))
     return ads
 
 
@@ -41,18 +103,11 @@ def get_ads_indicators(
     :param user: текущий пользователь
     :return: (incoming, outgoing) — словарь входящих и множество исходящих предложений
     """
-    ad_ids = [ad.pk for ad in page_obj]
-    incoming_counts = ExchangeProposal.objects.filter(ad_receiver_id__in=ad_ids)
-    incoming_counts = incoming_counts.values("ad_receiver_id").annotate(cnt=Count("id"))
-    incoming: Dict[int, int] = {
-        item["ad_receiver_id"]: item["cnt"] for item in incoming_counts
-    }
-    outgoing: Set[int] = set()
-    if user.is_authenticated:
-        outgoing_qs = ExchangeProposal.objects.filter(
-            ad_sender__user=user, ad_receiver_id__in=ad_ids
-        )
-        outgoing = set(outgoing_qs.values_list("ad_receiver_id", flat=True))
+    incoming, outgoing, _ = compute_exchange_indicators(
+        [ad.pk for ad in page_obj],
+        user,
+        incoming_totals={ad.pk: ad.incoming_total for ad in page_obj},
+    )
     return incoming, outgoing
 
 
@@ -63,17 +118,9 @@ def get_user_exchange_map(page_obj: Any, user: AbstractBaseUser) -> Dict[int, bo
     :param user: текущий пользователь
     :return: словарь ad_id -> bool (есть обмен между пользователями)
     """
-    ad_ids = [ad.pk for ad in page_obj]
-    exchange_map = {ad_id: False for ad_id in ad_ids}
-    if user.is_authenticated:
-        q_list = [
-            Q(ad_sender__user=user, ad_receiver_id__in=ad_ids),
-            Q(ad_receiver__user=user, ad_sender_id__in=ad_ids),
-        ]
-        qs = ExchangeProposal.objects.filter(reduce(operator.or_, q_list))
-        for p in qs:
-            if p.ad_sender_id in ad_ids:
-                exchange_map[p.ad_sender_id] = True
-            if p.ad_receiver_id in ad_ids:
-                exchange_map[p.ad_receiver_id] = True
+    _, _, exchange_map = compute_exchange_indicators(
+        [ad.pk for ad in page_obj],
+        user,
+        incoming_totals={ad.pk: ad.incoming_total for ad in page_obj},
+    )
     return exchange_map
@@ -0,0 +1,91 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from ads.models import Ad, ExchangeProposal
+from ads.services import generations
+
+# (ad_sender_id, ad_receiver_id, status) — всё, от чего зависят счётчики
+ProposalState = Tuple[int, int, str]
+COUNTER_FIELDS = ("incoming_total", "incoming_pending", "outgoing_total")
+
+
+def counter_deltas(
+    states: Iterable[ProposalState], sign: int
+) -> Dict[int, List[int]]:
+    """
+    Изменения счётчиков по объявлениям для набора предложений.
+    :param states: состояния предложений
+    :param sign: +1 — предложения появились, -1 — исчезли
+    :return: ad_id -> [incoming_total, incoming_pending, outgoing_total]
+    """
+    deltas: Dict[int, List[int]] = defaultdict(lambda: [0, 0, 0])
+    for sender_id, receiver_id, status in states:
+        deltas[receiver_id][0] += sign
+        if status == "pending":
+            deltas[receiver_id][1] += sign
+        deltas[sender_id][2] += sign
+    return deltas
+
+
+def apply_counter_deltas(deltas: Dict[int, List[int]]) -> None:
+    """
+    Атомарно применяет изменения счётчиков через UPDATE ... SET x = x + d.
+    Объявления с одинаковым вектором изменений обновляются одним запросом.
+    :param deltas: результат counter_deltas (можно суммировать несколько)
+    """
+    groups: Dict[Tuple[int, ...], List[int]] = defaultdict(list)
+    for ad_id, delta in deltas.items():
+        if ad_id is not None and any(delta):
+            groups[tuple(delta)].append(ad_id)
+    with transaction.atomic():
+        for delta, ad_ids in groups.items():
+            Ad.objects.filter(pk__in=ad_ids).update(
+                updated_at=timezone.now(),
+                **{
+                    field: F(field) + change
+                    for field, change in zip(COUNTER_FIELDS, delta)
+                    if change
+                },
+            )
+
+
+def merge_deltas(*parts: Dict[int, List[int]]) -> Dict[int, List[int]]:
+    merged: Dict[int, List[int]] = defaultdict(lambda: [0, 0, 0])
+    for part in parts:
+        for ad_id, delta in part.items():
+            merged[ad_id] = [a + b for a, b in zip(merged[ad_id], delta)]
+    return merged
+
+
+def recompute_counters(ad_ids: Optional[Iterable[int]] = None) -> int:
+    """
+    Пересчитывает счётчики по таблице предложений (ремонт рассинхронизации).
+    :param ad_ids: id объявлений или None для всех
+    :return: количество обновлённых объявлений
+    """
+
+    def count_of(field: str, **filters):
+        related = (
+            ExchangeProposal.objects.filter(**{field: OuterRef("pk")}, **filters)
+            .order_by()
+            .values(field)
+            .annotate(cnt=Count("id"))
+            .values("cnt")
+        )
+        return Coalesce(Subquery(related, output_field=IntegerField()), Value(0))
+
+    ads = Ad.objects.all()
+    if ad_ids is not None:
+        ads = ads.filter(pk__in=list(ad_ids))
+    updated = ads.update(
+        updated_at=timezone.now(),
+        incoming_total=count_of("ad_receiver"),
+        incoming_pending=count_of("ad_receiver", status="pending"),
+        outgoing_total=count_of("ad_sender"),
+    )
+    # Счётчики есть в ответах API объявлений и (через expand) предложений
+    generations.bump_generation(generations.ADS, generations.PROPOSALS)
+    return updated
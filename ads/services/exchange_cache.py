@@ -0,0 +1,195 @@
+from typing import Dict, Iterable, List, Set, Tuple
+from django.conf import settings
+from django.contrib.auth.models import AbstractBaseUser
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+from ads.models import ExchangeProposal, ProposalParticipant
+from ads.services import generations
+
+KEY_PREFIX = "ads:exchange_partners:"
+
+# (ad_sender_id, ad_receiver_id, id владельца отправителя, id владельца получателя)
+ProposalLink = Tuple[int, int, int, int]
+Partners = Dict[str, Set[int]]
+
+
+# Правка кэша одного пользователя — под коротким замком (cache.add)
+LOCK_TIMEOUT = 5
+# Пачка связей в одном запросе проверки (лимит переменных SQLite)
+LOOKUP_BATCH_SIZE = 400
+
+# Изменение кэша: (id пользователя, "out"/"in", id объявления, есть ли связь)
+Change = Tuple[int, str, int, bool]
+
+
+def _generation_name(user_id: int) -> str:
+    return f"exchange_partners:{user_id}"
+
+
+def _key(user_id: int, generation: int) -> str:
+    # Поколение пользователя в ключе: сброс — увеличение поколения, и запись
+    # устаревшей копии, начатая до сброса, уходит в ключ, который никто не читает
+    return f"{KEY_PREFIX}{user_id}:{generation}"
+
+
+def _lock_key(user_id: int) -> str:
+    return f"{KEY_PREFIX}lock:{user_id}"
+
+
+def build_exchange_partners(user_id: int) -> Partners:
+    """
+    Строит множества объявлений, с которыми у пользователя есть обмен.
+    :param user_id: id пользователя
+    :return: {"out": id объявлений, которым пользователь предложил обмен,
+              "in": id объявлений, предложивших обмен пользователю}
+    """
+    partners: Partners = {"out": set(), "in": set()}
+    for row in _partner_rows(user_id):
+        _add_partner(partners, *row)
+    return partners
+
+
+async def abuild_exchange_partners(user_id: int) -> Partners:
+    """
+    Асинхронный вариант build_exchange_partners.
+    :param user_id: id пользователя
+    :return: см. build_exchange_partners
+    """
+    partners: Partners = {"out": set(), "in": set()}
+    async for row in _partner_rows(user_id):
+        _add_partner(partners, *row)
+    return partners
+
+
+def _partner_rows(user_id: int) -> QuerySet:
+    return ProposalParticipant.objects.filter(user_id=user_id).values_list(
+        "role", "proposal__ad_sender_id", "proposal__ad_receiver_id"
+    )
+
+
+def _add_partner(partners: Partners, role: str, sender_id: int, receiver_id: int) -> None:
+    if role in ("sender", "both"):
+        partners["out"].add(receiver_id)
+    if role in ("receiver", "both"):
+        partners["in"].add(sender_id)
+
+
+def get_exchange_partners(user: AbstractBaseUser) -> Partners:
+    """
+    Партнёры обмена пользователя из кэша; при промахе строятся один раз.
+    :param user: пользователь
+    :return: см. build_exchange_partners
+    """
+    key = _key(user.pk, generations.get_generation(_generation_name(user.pk)))
+    partners = cache.get(key)
+    if partners is None:
+        partners = build_exchange_partners(user.pk)
+        cache.set(key, partners, settings.ADS_EXCHANGE_CACHE_TIMEOUT)
+    return partners
+
+
+async def aget_exchange_partners(user: AbstractBaseUser) -> Partners:
+    """
+    Асинхронный вариант get_exchange_partners.
+    :param user: пользователь
+    :return: см. build_exchange_partners
+    """
+    (generation,) = await generations.aget_generations(_generation_name(user.pk))
+    key = _key(user.pk, generation)
+    partners = await cache.aget(key)
+    if partners is None:
+        partners = await abuild_exchange_partners(user.pk)
+        await cache.aset(key, partners, settings.ADS_EXCHANGE_CACHE_TIMEOUT)
+    return partners
+
+
+def _apply(changes: Iterable[Change]) -> None:
+    by_user: Dict[int, List[Change]] = {}
+    for change in changes:
+        by_user.setdefault(change[0], []).append(change)
+    for user_id, user_changes in by_user.items():
+        lock = _lock_key(user_id)
+        if not cache.add(lock, 1, LOCK_TIMEOUT):
+            # Кэш пользователя сейчас правит другой запрос: вместо правки поверх
+            # его копии сбрасываем кэш — он перестроится из БД при чтении
+            generations.bump_generation(_generation_name(user_id))
+            continue
+        try:
+            key = _key(user_id, generations.get_generation(_generation_name(user_id)))
+            partners = cache.get(key)
+            if partners is None:
+                # Кэш не построен — построится при следующем чтении
+                continue
+            for _, side, ad_id, present in user_changes:
+                if present:
+                    partners[side].add(ad_id)
+                else:
+                    partners[side].discard(ad_id)
+            cache.set(key, partners, settings.ADS_EXCHANGE_CACHE_TIMEOUT)
+        finally:
+            cache.delete(lock)
+
+
+def _links_added(links: Iterable[ProposalLink]) -> None:
+    changes: List[Change] = []
+    for sender_id, receiver_id, sender_user_id, receiver_user_id in links:
+        changes.append((sender_user_id, "out", receiver_id, True))
+        changes.append((receiver_user_id, "in", sender_id, True))
+    _apply(changes)
+
+
+def _remaining_pairs(side: str, pairs: Set[Tuple[int, int]]) -> Set[Tuple[int, int]]:
+    # Какие пары (пользователь, объявление) всё ещё связаны предложением:
+    # один запрос на сторону, лишние пары из IN x IN отсекаются пересечением
+    user_ids = {user_id for user_id, _ in pairs}
+    ad_ids = {ad_id for _, ad_id in pairs}
+    if side == "out":
+        rows = ExchangeProposal.objects.filter(
+            ad_sender__user_id__in=user_ids, ad_receiver_id__in=ad_ids
+        ).values_list("ad_sender__user_id", "ad_receiver_id")
+    else:
+        rows = ExchangeProposal.objects.filter(
+            ad_receiver__user_id__in=user_ids, ad_sender_id__in=ad_ids
+        ).values_list("ad_receiver__user_id", "ad_sender_id")
+    return set(rows.distinct()) & pairs
+
+
+def _links_removed(links: Iterable[ProposalLink]) -> None:
+    # Между теми же сторонами могут остаться другие предложения — проверяем по БД
+    links = list(links)
+    changes: List[Change] = []
+    for start in range(0, len(links), LOOKUP_BATCH_SIZE):
+        batch = links[start : start + LOOKUP_BATCH_SIZE]
+        out_pairs = {(sender_user_id, receiver_id) for _, receiver_id, sender_user_id, _ in batch}
+        in_pairs = {(receiver_user_id, sender_id) for sender_id, _, _, receiver_user_id in batch}
+        for side, pairs in (("out", out_pairs), ("in", in_pairs)):
+            remaining = _remaining_pairs(side, pairs)
+            changes += [
+                (user_id, side, ad_id, (user_id, ad_id) in remaining)
+                for user_id, ad_id in pairs
+            ]
+    _apply(changes)
+
+
+def proposals_added(links: Iterable[ProposalLink]) -> None:
+    """
+    Добавляет связи в кэши пользователей сразу и повторно после коммита
+    транзакции (кэш мог быть построен по снимку до коммита).
+    :param links: связи созданных предложений
+    """
+    links = list(links)
+    if links:
+        _links_added(links)
+        transaction.on_commit(lambda: _links_added(links))
+
+
+def proposals_removed(links: Iterable[ProposalLink]) -> None:
+    """
+    Убирает связи из кэшей пользователей сразу и повторно после коммита.
+    :param links: связи удалённых предложений
+    """
+    links = list(links)
+    if links:
+        _links_removed(links)
+        transaction.on_commit(lambda: _links_removed(links))
@@ -0,0 +1,110 @@
+import csv
+from typing import Any, Dict, Iterable, Iterator, Tuple
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = ("ndjson", "csv")
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson; charset=utf-8",
+    "csv": "text/csv; charset=utf-8",
+}
+
+# Колонки выгрузки: имя колонки -> путь поля для values_list
+AD_EXPORT_COLUMNS: Dict[str, str] = {
+    "id": "id",
+    "user": "user_id",
+    "username": "user__username",
+    "title": "title",
+    "description": "description",
+    "category": "category",
+    "condition": "condition",
+    "image": "image",
+    "created_at": "created_at",
+    "incoming_total": "incoming_total",
+    "incoming_pending": "incoming_pending",
+    "outgoing_total": "outgoing_total",
+}
+PROPOSAL_EXPORT_COLUMNS: Dict[str, str] = {
+    "id": "id",
+    "ad_sender": "ad_sender_id",
+    "ad_receiver": "ad_receiver_id",
+    "comment": "comment",
+    "status": "status",
+    "created_at": "created_at",
+}
+
+
+def iter_export_rows(
+    queryset: QuerySet, columns: Dict[str, str]
+) -> Iterator[Tuple[Any, ...]]:
+    """
+    Строки выгрузки серверным курсором: в памяти только одна порция строк.
+    :param queryset: QuerySet с фильтрами и сортировкой
+    :param columns: колонки выгрузки (имя -> путь поля)
+    :return: итератор кортежей значений в порядке columns
+    """
+    return (
+        queryset.values_list(*columns.values())
+        .iterator(chunk_size=settings.ADS_EXPORT_CHUNK_SIZE)
+    )
+
+
+class _Echo:
+    # Буфер для csv.writer, который сразу возвращает записанную строку
+    def write(self, value: str) -> str:
+        return value
+
+
+def render_rows(
+    rows: Iterable[Tuple[Any, ...]], columns: Iterable[str], fmt: str
+) -> Iterator[str]:
+    """
+    Сериализует строки выгрузки по одной.
+    :param rows: кортежи значений
+    :param columns: имена колонок
+    :param fmt: "ndjson" (JSON-объект на строку) или "csv" (с заголовком)
+    :return: итератор строк текста
+    """
+    columns = list(columns)
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+        return
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + "\n"
+
+
+def export_queryset(
+    queryset: QuerySet, columns: Dict[str, str], fmt: str
+) -> Iterator[str]:
+    """
+    Потоковая выгрузка QuerySet в NDJSON или CSV.
+    :param queryset: QuerySet (например, search_ads или search_proposals)
+    :param columns: AD_EXPORT_COLUMNS или PROPOSAL_EXPORT_COLUMNS
+    :param fmt: "ndjson" или "csv"
+    :return: итератор строк текста
+    """
+    return render_rows(iter_export_rows(queryset, columns), columns, fmt)
+
+
+def streaming_response(
+    queryset: QuerySet, columns: Dict[str, str], fmt: str, name: str
+) -> StreamingHttpResponse:
+    """
+    HTTP-ответ с потоковой выгрузкой: тело формируется по мере отправки.
+    :param queryset: QuerySet для выгрузки
+    :param columns: колонки выгрузки
+    :param fmt: "ndjson" или "csv"
+    :param name: имя файла без расширения
+    :return: StreamingHttpResponse
+    """
+    response = StreamingHttpResponse(
+        export_queryset(queryset, columns, fmt), content_type=CONTENT_TYPES[fmt]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{name}.{fmt}"'
+    return response
@@ -0,0 +1,111 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from ads.models import Ad, AdFacetCount, normalize_lookup
+from ads.services.ads import search_ads
+
+FacetList = List[Dict[str, object]]
+
+
+def apply_facet_delta(pairs: Iterable[Tuple[str, str]], delta: int) -> None:
+    """
+    Инкрементально изменяет счётчики фасетов.
+    :param pairs: пары (категория, состояние) в исходном написании
+    :param delta: +1 при появлении объявления, -1 при удалении
+    """
+    grouped: Dict[Tuple[str, str], List] = {}
+    for category, condition in pairs:
+        keys = (normalize_lookup(category), normalize_lookup(condition))
+        entry = grouped.setdefault(keys, [category, condition, 0])
+        entry[2] += delta
+    with transaction.atomic():
+        for (category_key, condition_key), (category, condition, change) in grouped.items():
+            if change == 0:
+                continue
+            rows = AdFacetCount.objects.filter(
+                category_key=category_key, condition_key=condition_key
+            )
+            if change < 0:
+                rows.update(count=F("count") + change)
+                rows.filter(count__lte=0).delete()
+                continue
+            if rows.update(count=F("count") + change):
+                continue
+            try:
+                with transaction.atomic():
+                    AdFacetCount.objects.create(
+                        category_key=category_key,
+                        condition_key=condition_key,
+                        category=" ".join(str(category).split()),
+                        condition=" ".join(str(condition).split()),
+                        count=change,
+                    )
+            except IntegrityError:
+                # Строку успел создать параллельный запрос
+                rows.update(count=F("count") + change)
+
+
+def rebuild_facets() -> int:
+    """
+    Перестраивает таблицу фасетов с нуля по текущим объявлениям.
+    :return: количество строк фасетов
+    """
+    with transaction.atomic():
+        AdFacetCount.objects.all().delete()
+        pairs = Ad.objects.values_list("category", "condition").iterator(
+            chunk_size=2000
+        )
+        apply_facet_delta(pairs, 1)
+        return AdFacetCount.objects.count()
+
+
+def _facet_list(counts: Dict[str, List]) -> FacetList:
+    facets = [
+        {"value": label, "key": key, "count": count}
+        for key, (label, count) in counts.items()
+        if count > 0
+    ]
+    facets.sort(key=lambda item: (-item["count"], item["key"]))
+    return facets
+
+
+def _group(rows: Iterable[Tuple[str, str, int]]) -> FacetList:
+    counts: Dict[str, List] = defaultdict(lambda: ["", 0])
+    for key, label, count in rows:
+        entry = counts[key]
+        entry[0] = entry[0] or label
+        entry[1] += count
+    return _facet_list(counts)
+
+
+def get_facet_counts(query: str, category: str, condition: str) -> Dict[str, FacetList]:
+    """
+    Количество объявлений по категориям и состояниям для текущего фильтра.
+    Каждый фасет учитывает остальные фильтры, но не свой собственный.
+    Без поискового запроса ответ строится по таблице AdFacetCount,
+    с запросом — группировкой по результатам полнотекстового поиска.
+    :param query: поисковый запрос
+    :param category: фильтр по категории
+    :param condition: фильтр по состоянию
+    :return: {"category": [...], "condition": [...]}
+    """
+    category_key = normalize_lookup(category)
+    condition_key = normalize_lookup(condition)
+    if query:
+        rows = search_ads(query, "", "").order_by()
+        rows = rows.values_list(
+            "category_key", "condition_key", "category", "condition"
+        ).annotate(total=Count("id"))
+    else:
+        rows = AdFacetCount.objects.values_list(
+            "category_key", "condition_key", "category", "condition", "count"
+        )
+    categories = []
+    conditions = []
+    for cat_key, cond_key, cat, cond, total in rows:
+        if not condition_key or cond_key == condition_key:
+            categories.append((cat_key, " ".join(cat.split()), total))
+        if not category_key or cat_key == category_key:
+            conditions.append((cond_key, " ".join(cond.split()), total))
+    return {"category": _group(categories), "condition": _group(conditions)}
@@ -0,0 +1,99 @@
+import time
+from typing import Tuple
+from django.core.cache import cache
+from django.db import transaction
+
+# Поколения данных: любой запись в соответствующие таблицы увеличивает счётчик,
+# поэтому ключи кэша, включающие поколение, инвалидируются без перебора ключей.
+ADS = "ads"
+PROPOSALS = "proposals"
+
+KEY_PREFIX = "ads:generation:"
+MODIFIED_SUFFIX = ":modified"
+
+
+def _initial_generation() -> int:
+    # После очистки кэша поколение не повторяет прежние значения, поэтому
+    # ETag, выданные клиентам до очистки, случайно не совпадут с новыми
+    return time.time_ns() // 1000
+
+
+def get_generation(name: str) -> int:
+    """
+    Текущее поколение данных.
+    :param name: ADS или PROPOSALS
+    :return: номер поколения
+    """
+    key = KEY_PREFIX + name
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, _initial_generation(), None)
+        cache.add(key + MODIFIED_SUFFIX, time.time(), None)
+        value = cache.get(key, 1)
+    return value
+
+
+def get_generations(*names: str) -> Tuple[int, ...]:
+    """
+    Поколения нескольких наборов данных одним запросом к кэшу.
+    :param names: имена поколений
+    :return: кортеж номеров в том же порядке
+    """
+    keys = [KEY_PREFIX + name for name in names]
+    values = cache.get_many(keys)
+    return tuple(
+        values[key] if key in values else get_generation(name)
+        for key, name in zip(keys, names)
+    )
+
+
+async def aget_generations(*names: str) -> Tuple[int, ...]:
+    """
+    Асинхронный вариант get_generations.
+    :param names: имена поколений
+    :return: кортеж номеров в том же порядке
+    """
+    keys = [KEY_PREFIX + name for name in names]
+    values = await cache.aget_many(keys)
+    missing = [name for key, name in zip(keys, names) if key not in values]
+    for name in missing:
+        key = KEY_PREFIX + name
+        await cache.aadd(key, _initial_generation(), None)
+        await cache.aadd(key + MODIFIED_SUFFIX, time.time(), None)
+        values[key] = await cache.aget(key, 1)
+    return tuple(values[key] for key in keys)
+
+
+def get_last_modified(*names: str) -> float:
+    """
+    Время последней записи в наборы данных (для заголовка Last-Modified).
+    Если время неизвестно (кэш очищен), возвращается текущее — это безопасная
+    верхняя граница: клиент просто получит полный ответ.
+    :param names: имена поколений
+    :return: метка времени Unix
+    """
+    keys = [KEY_PREFIX + name + MODIFIED_SUFFIX for name in names]
+    values = cache.get_many(keys)
+    if len(values) < len(keys):
+        return time.time()
+    return max(values.values(), default=time.time())
+
+
+def _incr(name: str) -> None:
+    key = KEY_PREFIX + name
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_generation(), None)
+    cache.set(key + MODIFIED_SUFFIX, time.time(), None)
+
+
+def bump_generation(*names: str) -> None:
+    """
+    Увеличивает поколения сразу и повторно после коммита транзакции,
+    чтобы результат, посчитанный по старому снимку до коммита, не остался в кэше.
+    :param names: имена поколений
+    """
+    for name in names:
+        _incr(name)
+    transaction.on_commit(lambda: [_incr(name) for name in names])
@@ -0,0 +1,128 @@
+import os
+import time
+from typing import Iterable, Iterator, Set, Tuple
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from ads.models import Ad
+from ads.storage import RENDITIONS_DIR, file_lock, rendition_storage
+
+# Имён файлов в одном запросе image__in при очистке
+LOOKUP_BATCH_SIZE = 400
+
+
+def image_referenced(name: str) -> bool:
+    """
+    Проверяет, ссылается ли на файл изображения хотя бы одно объявление.
+    :param name: имя файла в хранилище
+    :return: True, если файл ещё используется
+    """
+    return Ad.objects.filter(image=name).exists()
+
+
+def delete_renditions(names: Iterable[str]) -> None:
+    """
+    Удаляет файлы уменьшенных копий, кроме тех, что используются как Ad.image
+    (копии, созданные до переноса в каталог копий, лежали среди оригиналов).
+    :param names: имена файлов копий
+    """
+    names = [name for name in names if name]
+    if not names:
+        return
+    referenced = set(Ad.objects.filter(image__in=names).values_list("image", flat=True))
+    storage = rendition_storage()
+    for name in names:
+        if name not in referenced:
+            storage.delete(name)
+
+
+def _recently_saved(storage: FileSystemStorage, name: str) -> bool:
+    # Файл записан или повторно сохранён тем же содержимым недавно: ссылка
+    # на него может быть в ещё не закоммиченной транзакции
+    try:
+        modified = os.path.getmtime(storage.path(name))
+    except FileNotFoundError:
+        return False
+    return time.time() - modified < settings.ADS_IMAGE_RELEASE_GRACE
+
+
+def _delete_unused(storage: FileSystemStorage, name: str) -> bool:
+    # Проверка и удаление под той же блокировкой, что и сохранение файла
+    with file_lock(name) as locked:
+        if not locked or image_referenced(name) or _recently_saved(storage, name):
+            return False
+        storage.delete(name)
+    return True
+
+
+def release_image(name: str, renditions: Iterable[str] = ()) -> None:
+    """
+    Освобождает ссылку на изображение после коммита транзакции: файл и его
+    уменьшенные копии удаляются, только если на оригинал больше никто не ссылается
+    (одинаковые фото у разных объявлений хранятся одним файлом).
+    Та же картинка может быть только что сохранена в другой, ещё не закоммиченной
+    транзакции: сохранение обновляет время изменения файла под file_lock, а здесь
+    файлы моложе ADS_IMAGE_RELEASE_GRACE не удаляются. Их удалит
+    cleanup_unreferenced_images (команда cleanup_images).
+    :param name: имя оригинала в хранилище
+    :param renditions: имена уменьшенных копий этого оригинала
+    """
+    if not name:
+        return
+    renditions = [rendition for rendition in renditions if rendition]
+
+    def release() -> None:
+        if _delete_unused(Ad._meta.get_field("image").storage, name):
+            delete_renditions(renditions)
+
+    transaction.on_commit(release)
+
+
+def _stale_files(storage: FileSystemStorage, directory: str) -> Iterator[str]:
+    # Файлы каталога старше ADS_IMAGE_RELEASE_GRACE, имена относительно хранилища
+    deadline = time.time() - settings.ADS_IMAGE_RELEASE_GRACE
+    for dirpath, _, filenames in os.walk(storage.path(directory)):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                if os.path.getmtime(path) > deadline:
+                    continue
+            except FileNotFoundError:
+                continue
+            yield os.path.relpath(path, storage.location).replace(os.sep, "/")
+
+
+def _used_renditions() -> Set[str]:
+    used = set()
+    rows = Ad.objects.exclude(image_renditions={}).values_list("image_renditions", flat=True)
+    for renditions in rows.iterator():
+        used.update((renditions or {}).values())
+    return used
+
+
+def cleanup_unreferenced_images() -> Tuple[int, int]:
+    """
+    Удаляет оригиналы и уменьшенные копии старше ADS_IMAGE_RELEASE_GRACE, на которые
+    не ссылается ни одно объявление: их оставило release_image (файл был свежим
+    или блокировка занята) или прерванная генерация копий.
+    :return: (удалено оригиналов, удалено копий)
+    """
+    image_field = Ad._meta.get_field("image")
+    storage = image_field.storage
+    used = _used_renditions()
+    # Копии, созданные до переноса в каталог копий, лежат среди оригиналов
+    candidates = [name for name in _stale_files(storage, image_field.upload_to) if name not in used]
+    removed_images = 0
+    for start in range(0, len(candidates), LOOKUP_BATCH_SIZE):
+        batch = candidates[start:start + LOOKUP_BATCH_SIZE]
+        referenced = set(Ad.objects.filter(image__in=batch).values_list("image", flat=True))
+        for name in batch:
+            if name not in referenced and _delete_unused(storage, name):
+                removed_images += 1
+    renditions = rendition_storage()
+    removed_renditions = 0
+    for name in _stale_files(renditions, RENDITIONS_DIR):
+        if name not in used:
+            renditions.delete(name)
+            removed_renditions += 1
+    return removed_images, removed_renditions
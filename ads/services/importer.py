@@ -0,0 +1,153 @@
+import csv
+import io
+import json
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.contrib.auth.models import AbstractBaseUser
+from django.db import transaction
+from ads.forms import AdForm
+from ads.models import Ad
+from ads.services import ad_events
+
+IMPORT_FORMATS = ("csv", "jsonl")
+# Поля строки импорта — те же, что в AdForm, кроме изображения
+IMPORT_FIELDS = ("title", "description", "category", "condition")
+
+RejectCallback = Callable[[int, Dict[str, List[str]]], None]
+
+
+class ImportFileError(Exception):
+    """
+    Файл импорта не читается дальше (не UTF-8, испорченный CSV).
+    created и next_offset — уже записанные строки и смещение для продолжения.
+    """
+
+    def __init__(self, message: str, created: int = 0, next_offset: int = 0):
+        super().__init__(message)
+        self.message = message
+        self.created = created
+        self.next_offset = next_offset
+
+
+def detect_format(filename: str) -> Optional[str]:
+    """
+    Формат файла импорта по расширению.
+    :param filename: имя файла
+    :return: "csv", "jsonl" или None
+    """
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return None
+
+
+def iter_rows(stream: IO[bytes], fmt: str) -> Iterator[Tuple[Any, Optional[str]]]:
+    """
+    Построчно читает файл импорта, не загружая его в память целиком.
+    :param stream: бинарный поток с данными в UTF-8
+    :param fmt: "csv" (первая строка — заголовок) или "jsonl"
+    :return: итератор (данные строки, ошибка разбора или None)
+    :raise ImportFileError: файл не в UTF-8 или CSV не разбирается
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    try:
+        if fmt == "csv":
+            for row in csv.DictReader(text):
+                yield row, None
+            return
+        for line in text:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield None, "Некорректный JSON"
+                continue
+            if not isinstance(row, dict):
+                yield None, "Строка должна быть JSON-объектом"
+                continue
+            yield row, None
+    except UnicodeDecodeError:
+        raise ImportFileError("Файл должен быть в кодировке UTF-8")
+    except csv.Error as exc:
+        raise ImportFileError(f"Некорректный CSV: {exc}")
+    finally:
+        # Поток принадлежит вызывающему коду — не закрываем его вместе с обёрткой
+        text.detach()
+
+
+def _insert_batch(batch: List[Ad]) -> None:
+    with transaction.atomic():
+        Ad.objects.bulk_create(batch)
+        # bulk_create не отправляет сигналы — производные данные явно
+        ad_events.ads_created(batch)
+
+
+def import_ads(
+    stream: IO[bytes],
+    fmt: str,
+    user: AbstractBaseUser,
+    batch_size: Optional[int] = None,
+    offset: int = 0,
+    on_reject: Optional[RejectCallback] = None,
+    on_batch: Optional[Callable[[int], None]] = None,
+) -> Dict[str, int]:
+    """
+    Потоковый импорт объявлений пользователя из CSV или JSONL.
+    Строки проверяются правилами AdForm и вставляются пачками bulk_create,
+    каждая пачка — в своей транзакции. После сбоя импорт можно продолжить
+    с offset, который сообщает on_batch после каждой записанной пачки.
+    :param stream: бинарный поток файла
+    :param fmt: "csv" или "jsonl"
+    :param user: владелец создаваемых объявлений
+    :param batch_size: размер пачки (по умолчанию ADS_IMPORT_BATCH_SIZE)
+    :param offset: сколько строк данных пропустить с начала файла
+    :param on_reject: вызывается для отклонённой строки: (номер строки, ошибки)
+    :param on_batch: вызывается после записи пачки со смещением для продолжения
+    :return: {"created": ..., "rejected": ..., "next_offset": ...}
+    :raise ImportFileError: файл не читается дальше; записанные пачки остаются
+    """
+    batch_size = batch_size or settings.ADS_IMPORT_BATCH_SIZE
+    created = rejected = 0
+    row_number = -1
+    committed_offset = offset
+    batch: List[Ad] = []
+    try:
+        for row_number, (row, parse_error) in enumerate(iter_rows(stream, fmt)):
+            if row_number < offset:
+                continue
+            if parse_error:
+                errors = {"__all__": [parse_error]}
+            else:
+                form = AdForm(data={field: row.get(field) or "" for field in IMPORT_FIELDS})
+                if form.is_valid():
+                    ad = form.save(commit=False)
+                    ad.user = user
+                    # bulk_create не вызывает Ad.save() — ключи заполняем сами
+                    ad.refresh_lookup_keys()
+                    batch.append(ad)
+                    if len(batch) >= batch_size:
+                        _insert_batch(batch)
+                        created += len(batch)
+                        batch = []
+                        committed_offset = row_number + 1
+                        if on_batch:
+                            on_batch(committed_offset)
+                    continue
+                errors = {field: list(messages) for field, messages in form.errors.items()}
+            rejected += 1
+            if on_reject:
+                on_reject(row_number, errors)
+    except ImportFileError as error:
+        # Незаписанная пачка отбрасывается: после исправления файла импорт
+        # продолжают с последнего записанного смещения
+        raise ImportFileError(error.message, created, committed_offset) from error
+    if batch:
+        _insert_batch(batch)
+        created += len(batch)
+    next_offset = max(offset, row_number + 1)
+    if on_batch and batch:
+        on_batch(next_offset)
+    return {"created": created, "rejected": rejected, "next_offset": next_offset}
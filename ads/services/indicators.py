@@ -0,0 +1,105 @@
+import asyncio
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from django.contrib.auth.models import AbstractBaseUser
+from django.db.models import QuerySet
+from ads.models import Ad
+from ads.services.exchange_cache import (
+    Partners,
+    aget_exchange_partners,
+    get_exchange_partners,
+)
+
+# Лимит параметров в одном запросе: старые сборки SQLite допускают 999 переменных
+MAX_BATCH_SIZE = 500
+
+Indicators = Tuple[Dict[int, int], Set[int], Dict[int, bool]]
+
+
+def _batches(ad_ids: List[int], size: int) -> Iterable[List[int]]:
+    for start in range(0, len(ad_ids), size):
+        yield ad_ids[start : start + size]
+
+
+def compute_exchange_indicators(
+    ad_ids: Iterable[int],
+    user: AbstractBaseUser,
+    incoming_totals: Optional[Dict[int, int]] = None,
+) -> Indicators:
+    """
+    Индикаторы обмена для набора объявлений.
+    Количество входящих читается из Ad.incoming_total (один запрос на пачку id,
+    либо ни одного, если значения уже переданы), направления обмена
+    с пользователем — из кэша партнёров обмена пользователя.
+    :param ad_ids: id объявлений (любое количество, делится на пачки)
+    :param user: текущий пользователь
+    :param incoming_totals: ad_id -> incoming_total уже загруженных объявлений
+    :return: (incoming, outgoing, exchange_map):
+             incoming — ad_id -> количество входящих (только ненулевые),
+             outgoing — id объявлений, которым пользователь уже предложил обмен,
+             exchange_map — ad_id -> есть ли предложение между объявлением
+             и любым объявлением пользователя в любую сторону
+    """
+    ad_ids = list(dict.fromkeys(ad_ids))
+    if incoming_totals is None:
+        incoming_totals = {}
+        for batch in _batches(ad_ids, MAX_BATCH_SIZE):
+            incoming_totals.update(_incoming_rows(batch))
+    partners = get_exchange_partners(user) if user.is_authenticated else None
+    return _build_indicators(ad_ids, incoming_totals, partners)
+
+
+async def acompute_exchange_indicators(
+    ad_ids: Iterable[int],
+    user: AbstractBaseUser,
+    incoming_totals: Optional[Dict[int, int]] = None,
+) -> Indicators:
+    """
+    Асинхронный вариант compute_exchange_indicators: входящие и партнёры
+    обмена запрашиваются одновременно.
+    :param ad_ids: id объявлений
+    :param user: текущий пользователь (уже загруженный, например request.auser())
+    :param incoming_totals: ad_id -> incoming_total уже загруженных объявлений
+    :return: см. compute_exchange_indicators
+    """
+    ad_ids = list(dict.fromkeys(ad_ids))
+    if incoming_totals is None:
+        incoming_totals, partners = await asyncio.gather(
+            _aincoming_totals(ad_ids), _apartners(user)
+        )
+    else:
+        partners = await _apartners(user)
+    return _build_indicators(ad_ids, incoming_totals, partners)
+
+
+def _incoming_rows(batch: List[int]) -> QuerySet:
+    return Ad.objects.filter(pk__in=batch).order_by().values_list("pk", "incoming_total")
+
+
+async def _aincoming_totals(ad_ids: List[int]) -> Dict[int, int]:
+    totals: Dict[int, int] = {}
+    for batch in _batches(ad_ids, MAX_BATCH_SIZE):
+        totals.update([row async for row in _incoming_rows(batch)])
+    return totals
+
+
+async def _apartners(user: AbstractBaseUser) -> Optional[Partners]:
+    if not user.is_authenticated:
+        return None
+    return await aget_exchange_partners(user)
+
+
+def _build_indicators(
+    ad_ids: List[int], incoming_totals: Dict[int, int], partners: Optional[Partners]
+) -> Indicators:
+    incoming = {
+        ad_id: incoming_totals[ad_id]
+        for ad_id in ad_ids
+        if incoming_totals.get(ad_id)
+    }
+    if partners is None:
+        return incoming, set(), {ad_id: False for ad_id in ad_ids}
+    outgoing = {ad_id for ad_id in ad_ids if ad_id in partners["out"]}
+    exchange_map = {
+        ad_id: ad_id in outgoing or ad_id in partners["in"] for ad_id in ad_ids
+    }
+    return incoming, outgoing, exchange_map
@@ -0,0 +1,95 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence
+from django.db import transaction
+from ads.models import Ad, ExchangeProposal, ProposalParticipant
+from ads.services.counters import ProposalState
+
+
+def participant_rows(
+    proposals: Iterable[ExchangeProposal], owners: Dict[int, int]
+) -> List[ProposalParticipant]:
+    """
+    Строки участников для предложений.
+    :param proposals: предложения с заполненными id
+    :param owners: ad_id -> id владельца объявления
+    :return: несохранённые ProposalParticipant (по одной на пользователя)
+    """
+    rows = []
+    for proposal in proposals:
+        sender_user = owners.get(proposal.ad_sender_id)
+        receiver_user = owners.get(proposal.ad_receiver_id)
+        if sender_user is None or receiver_user is None:
+            continue
+        if sender_user == receiver_user:
+            roles = [(sender_user, "both")]
+        else:
+            roles = [(sender_user, "sender"), (receiver_user, "receiver")]
+        rows.extend(
+            ProposalParticipant(
+                user_id=user_id,
+                proposal_id=proposal.pk,
+                role=role,
+                status=proposal.status,
+                created_at=proposal.created_at,
+            )
+            for user_id, role in roles
+        )
+    return rows
+
+
+def add_participants(
+    proposals: Sequence[ExchangeProposal], owners: Dict[int, int]
+) -> None:
+    """
+    Добавляет участников новых предложений одним INSERT.
+    :param proposals: созданные предложения
+    :param owners: ad_id -> id владельца объявления
+    """
+    ProposalParticipant.objects.bulk_create(participant_rows(proposals, owners))
+
+
+def update_participants(
+    old_states: Sequence[ProposalState],
+    proposals: Sequence[ExchangeProposal],
+    owners: Dict[int, int],
+) -> None:
+    """
+    Переносит изменения предложений в строки участников.
+    Смена статуса — один UPDATE на статус, смена объявлений — пересоздание строк.
+    :param old_states: состояния до изменения
+    :param proposals: изменённые предложения, в том же порядке
+    :param owners: ad_id -> id владельца объявления (для новых объявлений)
+    """
+    by_status: Dict[str, List[int]] = defaultdict(list)
+    moved = []
+    for old, proposal in zip(old_states, proposals):
+        if old[:2] != (proposal.ad_sender_id, proposal.ad_receiver_id):
+            moved.append(proposal)
+        elif old[2] != proposal.status:
+            by_status[proposal.status].append(proposal.pk)
+    for status, proposal_ids in by_status.items():
+        ProposalParticipant.objects.filter(proposal_id__in=proposal_ids).update(
+            status=status
+        )
+    if moved:
+        ProposalParticipant.objects.filter(
+            proposal_id__in=[proposal.pk for proposal in moved]
+        ).delete()
+        add_participants(moved, owners)
+
+
+def rebuild_participants() -> int:
+    """
+    Перестраивает таблицу участников с нуля по предложениям.
+    :return: количество строк участников
+    """
+    with transaction.atomic():
+        ProposalParticipant.objects.all().delete()
+        owners = dict(Ad.objects.values_list("pk", "user_id"))
+        proposals = ExchangeProposal.objects.only(
+            "ad_sender", "ad_receiver", "status", "created_at"
+        ).iterator(chunk_size=2000)
+        ProposalParticipant.objects.bulk_create(
+            participant_rows(proposals, owners), batch_size=2000
+        )
+        return ProposalParticipant.objects.count()
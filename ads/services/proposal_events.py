@@ -0,0 +1,91 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+from ads.models import Ad, ExchangeProposal
+from ads.services import counters, exchange_cache, generations, participants, search_index
+from ads.services.counters import ProposalState
+from ads.services.exchange_cache import ProposalLink
+
+# Единая точка для производных данных предложений. Её вызывают сигналы модели
+# и массовые операции (QuerySet.update/bulk_create), которые сигналы не отправляют.
+
+
+def _owners(states: Iterable[ProposalState]) -> Dict[int, int]:
+    # Владельцы объявлений читаются сразу: после каскадного удаления их уже нет
+    ad_ids = {ad_id for state in states for ad_id in state[:2]}
+    return dict(Ad.objects.filter(pk__in=ad_ids).values_list("pk", "user_id"))
+
+
+def _links(
+    states: Iterable[ProposalState], owners: Dict[int, int]
+) -> List[ProposalLink]:
+    return [
+        (sender_id, receiver_id, owners[sender_id], owners[receiver_id])
+        for sender_id, receiver_id, _ in states
+        if sender_id in owners and receiver_id in owners
+    ]
+
+
+def proposals_created(proposals: Sequence[ExchangeProposal]) -> None:
+    """
+    Предложения созданы.
+    :param proposals: сохранённые предложения
+    """
+    states = [proposal.counter_state() for proposal in proposals]
+    owners = _owners(states)
+    counters.apply_counter_deltas(counters.counter_deltas(states, 1))
+    participants.add_participants(proposals, owners)
+    search_index.index_proposals([proposal.pk for proposal in proposals])
+    exchange_cache.proposals_added(_links(states, owners))
+    generations.bump_generation(generations.PROPOSALS)
+
+
+def proposals_changed(
+    old_states: Sequence[ProposalState], proposals: Sequence[ExchangeProposal]
+) -> None:
+    """
+    Предложения изменены (статус или объявления).
+    :param old_states: состояния до изменения
+    :param proposals: изменённые предложения, в том же порядке
+    """
+    changed = [
+        (old, proposal)
+        for old, proposal in zip(old_states, proposals)
+        if old != proposal.counter_state()
+    ]
+    if changed:
+        old_states = [old for old, _ in changed]
+        new_states = [proposal.counter_state() for _, proposal in changed]
+        counters.apply_counter_deltas(
+            counters.merge_deltas(
+                counters.counter_deltas(old_states, -1),
+                counters.counter_deltas(new_states, 1),
+            )
+        )
+        # Смена объявлений предложения меняет партнёров обмена; смена статуса — нет
+        moved = [(old, new) for old, new in zip(old_states, new_states) if old[:2] != new[:2]]
+        owners = _owners([new for _, new in moved] + [old for old, _ in moved])
+        participants.update_participants(
+            old_states, [proposal for _, proposal in changed], owners
+        )
+        if moved:
+            exchange_cache.proposals_removed(_links([old for old, _ in moved], owners))
+            exchange_cache.proposals_added(_links([new for _, new in moved], owners))
+    generations.bump_generation(generations.PROPOSALS)
+
+
+def proposals_deleted(
+    states: Iterable[ProposalState], deleted_owners: Optional[Dict[int, int]] = None
+) -> None:
+    """
+    Предложения удалены (в том числе каскадом вместе с объявлением).
+    Строки участников удаляет каскад внешнего ключа.
+    :param states: состояния удалённых предложений
+    :param deleted_owners: ad_id -> id владельца для объявлений, удалённых
+                           тем же каскадом (их строк в БД уже нет)
+    """
+    states = list(states)
+    owners = _owners(states)
+    if deleted_owners:
+        owners = {**deleted_owners, **owners}
+    counters.apply_counter_deltas(counters.counter_deltas(states, -1))
+    exchange_cache.proposals_removed(_links(states, owners))
+    generations.bump_generation(generations.PROPOSALS)
@@ -1,64 +1,263 @@
 from functools import reduce
 import operator
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
 from django.db.models import Q, QuerySet
+from django.db.models.expressions import RawSQL
 from django.contrib.auth.models import AbstractBaseUser
-from django.db import transaction
-from ads.models import ExchangeProposal
+from django.db import IntegrityError, transaction
+from ads.models import Ad, ExchangeProposal
+from ads.services import proposal_events
+from ads.services.ads import build_fts_query, fts_enabled
+from ads.services.search_index import PROPOSAL_FTS_TABLE
 
 
 def search_proposals(user: AbstractBaseUser, status: str, query: str) -> QuerySet:
     """
     Поиск и фильтрация предложений обмена по всем основным полям.
+    Использует поисковые документы предложений FTS5, если они доступны, иначе — icontains.
     :param user: текущий пользователь
     :param status: фильтр по статусу
     :param query: поисковый запрос
     :return: QuerySet предложений обмена
     """
-    proposals = ExchangeProposal.objects.filter(
-        Q(ad_sender__user=user) | Q(ad_receiver__user=user)
-    ).order_by("-created_at")
+    # Фильтр и сортировка по таблице участников: диапазон индекса
+    # (user, [status,] created_at, proposal) вместо OR по двум JOIN
+    participant_filter = {"participants__user": user}
+    if status:
+        participant_filter["participants__status"] = status
+    proposals = ExchangeProposal.objects.filter(**participant_filter).order_by(
+        "-participants__created_at", "-participants__proposal"
+    )
     proposals = proposals.select_related(
         "ad_sender", "ad_receiver", "ad_sender__user", "ad_receiver__user"
     )
-    if status:
-        proposals = proposals.filter(status=status)
     if query:
-        q_list = [
-            Q(ad_sender__title__icontains=query),
-            Q(ad_sender__description__icontains=query),
-            Q(ad_sender__category__icontains=query),
-            Q(ad_sender__condition__icontains=query),
-            Q(ad_sender__user__username__icontains=query),
-            Q(ad_receiver__title__icontains=query),
-            Q(ad_receiver__description__icontains=query),
-            Q(ad_receiver__category__icontains=query),
-            Q(ad_receiver__condition__icontains=query),
-            Q(ad_receiver__user__username__icontains=query),
-            Q(comment__icontains=query),
-        ]
-        proposals = proposals.filter(reduce(operator.or_, q_list))
+        proposals = _filter_proposal_query(proposals, query)
     return proposals
 
 
-@transaction.atomic
-def atomic_update_proposal_status(
+def _filter_proposal_query(proposals: QuerySet, query: str) -> QuerySet:
+    # Поисковый документ предложения в FTS5 — один MATCH вместо 11 icontains
+    match = build_fts_query(query)
+    if match and fts_enabled():
+        return proposals.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {PROPOSAL_FTS_TABLE} "
+                f"WHERE {PROPOSAL_FTS_TABLE} MATCH %s",
+                [match],
+            )
+        )
+    q_list = [
+        Q(ad_sender__title__icontains=query),
+        Q(ad_sender__description__icontains=query),
+        Q(ad_sender__category__icontains=query),
+        Q(ad_sender__condition__icontains=query),
+        Q(ad_sender__user__username__icontains=query),
+        Q(ad_receiver__title__icontains=query),
+        Q(ad_receiver__description__icontains=query),
+        Q(ad_receiver__category__icontains=query),
+        Q(ad_receiver__condition__icontains=query),
+        Q(ad_receiver__user__username__icontains=query),
+        Q(comment__icontains=query),
+    ]
+    return proposals.filter(reduce(operator.or_, q_list))
+
+
+# Исходы смены статуса предложения
+STATUS_UPDATED = "updated"
+STATUS_NOT_FOUND = "not_found"
+STATUS_FORBIDDEN = "forbidden"
+STATUS_INVALID = "invalid_status"
+STATUS_CONFLICT = "conflict"
+
+# Максимум предложений в одном массовом запросе смены статуса
+MAX_BULK_STATUS_ITEMS = 100
+
+# Максимум объявлений-получателей в одном массовом создании предложений
+MAX_BULK_CREATE_RECEIVERS = 100
+
+# Конечный автомат статусов: из ожидания — только в принятое или отклонённое
+STATUS_TRANSITIONS: Dict[str, Tuple[str, ...]] = {
+    "pending": ("accepted", "rejected"),
+    "accepted": (),
+    "rejected": (),
+}
+
+
+def transition_proposal_status(
     proposal_id: int, user: AbstractBaseUser, status: str
-) -> bool:
+) -> str:
     """
-    Атомарно обновляет статус предложения обмена, если пользователь — получатель.
+    Меняет статус предложения одним условным UPDATE (compare-and-swap):
+    UPDATE ... WHERE id = ? AND status = <исходный> AND получатель — user.
+    Без блокировок на чтение: из двух одновременных ответов выигрывает первый,
+    второй получает STATUS_CONFLICT.
     :param proposal_id: id предложения
-    :param user: текущий пользователь
-    :param status: новый статус ('accepted' или 'rejected')
-    :return: True, если статус изменён, иначе False
+    :param user: текущий пользователь (должен владеть объявлением-получателем)
+    :param status: новый статус
+    :return: STATUS_UPDATED, STATUS_NOT_FOUND, STATUS_FORBIDDEN,
+             STATUS_INVALID или STATUS_CONFLICT
     """
-    try:
-        proposal = ExchangeProposal.objects.select_for_update().get(pk=proposal_id)
-        if proposal.ad_receiver.user != user:
-            return False
-        if status in dict(ExchangeProposal.STATUS_CHOICES):
-            proposal.status = status
-            proposal.save()
-            return True
-        return False
-    except Exception:
-        return False
+    sources = [
+        source for source, targets in STATUS_TRANSITIONS.items() if status in targets
+    ]
+    if not sources:
+        return STATUS_INVALID
+    with transaction.atomic():
+        for source in sources:
+            updated = ExchangeProposal.objects.filter(
+                pk=proposal_id, status=source, ad_receiver__user=user
+            ).update(status=status)
+            if updated:
+                # QuerySet.update не отправляет сигналы — производные данные явно
+                proposal = ExchangeProposal.objects.only(
+                    "ad_sender", "ad_receiver", "status"
+                ).get(pk=proposal_id)
+                proposal_events.proposals_changed(
+                    [(proposal.ad_sender_id, proposal.ad_receiver_id, source)],
+                    [proposal],
+                )
+                return STATUS_UPDATED
+    return _failure_outcomes([proposal_id], user)[proposal_id]
+
+
+def _failure_outcomes(proposal_ids: List[int], user: AbstractBaseUser) -> Dict[int, str]:
+    # Причина, по которой условный UPDATE не затронул предложения
+    receivers = dict(
+        ExchangeProposal.objects.filter(pk__in=proposal_ids).values_list(
+            "pk", "ad_receiver__user_id"
+        )
+    )
+    outcomes = {}
+    for proposal_id in proposal_ids:
+        if proposal_id not in receivers:
+            outcomes[proposal_id] = STATUS_NOT_FOUND
+        elif receivers[proposal_id] != user.pk:
+            outcomes[proposal_id] = STATUS_FORBIDDEN
+        else:
+            outcomes[proposal_id] = STATUS_CONFLICT
+    return outcomes
+
+
+class _ConcurrentUpdate(Exception):
+    pass
+
+
+def bulk_transition_proposal_status(
+    user: AbstractBaseUser, items: Sequence[Tuple[int, str]]
+) -> Dict[int, str]:
+    """
+    Меняет статусы набора предложений в одной транзакции: один SELECT
+    кандидатов и один условный UPDATE на каждую пару (исходный, новый статус).
+    Неудачи по отдельным id не откатывают успешные изменения.
+    :param user: текущий пользователь (получатель предложений)
+    :param items: пары (id предложения, новый статус); повторные id игнорируются
+    :return: id -> исход (как у transition_proposal_status), в порядке items
+    """
+    targets: Dict[int, str] = {}
+    for proposal_id, status in items:
+        targets.setdefault(proposal_id, status)
+    outcomes: Dict[int, str] = {}
+    valid = {}
+    for proposal_id, status in targets.items():
+        if any(status in allowed for allowed in STATUS_TRANSITIONS.values()):
+            valid[proposal_id] = status
+        else:
+            outcomes[proposal_id] = STATUS_INVALID
+    with transaction.atomic():
+        candidates = ExchangeProposal.objects.filter(
+            pk__in=list(valid), ad_receiver__user=user
+        ).only("ad_sender", "ad_receiver", "status")
+        groups: Dict[Tuple[str, str], List[ExchangeProposal]] = defaultdict(list)
+        for proposal in candidates:
+            new_status = valid[proposal.pk]
+            if new_status in STATUS_TRANSITIONS.get(proposal.status, ()):
+                groups[(proposal.status, new_status)].append(proposal)
+        for (source, new_status), proposals in groups.items():
+            ids = [proposal.pk for proposal in proposals]
+            try:
+                with transaction.atomic():
+                    updated = ExchangeProposal.objects.filter(
+                        pk__in=ids, status=source
+                    ).update(status=new_status)
+                    if updated != len(ids):
+                        raise _ConcurrentUpdate
+            except _ConcurrentUpdate:
+                # Часть строк изменил параллельный запрос — переходим по одной
+                for proposal_id in ids:
+                    outcomes[proposal_id] = transition_proposal_status(
+                        proposal_id, user, new_status
+                    )
+                continue
+            old_states = [proposal.counter_state() for proposal in proposals]
+            for proposal in proposals:
+                proposal.status = new_status
+            proposal_events.proposals_changed(old_states, proposals)
+            outcomes.update(dict.fromkeys(ids, STATUS_UPDATED))
+        failed = [proposal_id for proposal_id in valid if proposal_id not in outcomes]
+        if failed:
+            outcomes.update(_failure_outcomes(failed, user))
+    return {proposal_id: outcomes[proposal_id] for proposal_id in targets}
+
+
+def bulk_create_proposals(
+    user: AbstractBaseUser, ad_sender_id: int, receiver_ids: Sequence[int], comment: str
+) -> Optional[Dict[str, List[int]]]:
+    """
+    Предлагает одно объявление пользователя в обмен на несколько объявлений.
+    Владение проверяется одним запросом по всему набору, уже существующие пары
+    пропускаются (их уникальность гарантирует ограничение ads_prop_unique_pair),
+    новые предложения вставляются одним bulk_create.
+    :param user: текущий пользователь (владелец ad_sender)
+    :param ad_sender_id: id объявления пользователя
+    :param receiver_ids: id объявлений-получателей
+    :param comment: комментарий ко всем предложениям
+    :return: {"created": id новых предложений, "existing": id получателей
+             с уже существующим предложением, "invalid": id несуществующих
+             или собственных объявлений}; None, если ad_sender не принадлежит user
+    """
+    receiver_ids = list(dict.fromkeys(receiver_ids))
+    owners = dict(
+        Ad.objects.filter(pk__in=[ad_sender_id, *receiver_ids]).values_list(
+            "pk", "user_id"
+        )
+    )
+    if owners.get(ad_sender_id) != user.pk:
+        return None
+    invalid = [
+        ad_id for ad_id in receiver_ids if owners.get(ad_id, user.pk) == user.pk
+    ]
+    candidates = [ad_id for ad_id in receiver_ids if ad_id not in invalid]
+    for attempt in range(2):
+        existing = set(
+            ExchangeProposal.objects.filter(
+                ad_sender_id=ad_sender_id, ad_receiver_id__in=candidates
+            ).values_list("ad_receiver_id", flat=True)
+        )
+        proposals = [
+            ExchangeProposal(
+                ad_sender_id=ad_sender_id,
+                ad_receiver_id=ad_id,
+                comment=comment,
+                status="pending",
+            )
+            for ad_id in candidates
+            if ad_id not in existing
+        ]
+        try:
+            with transaction.atomic():
+                ExchangeProposal.objects.bulk_create(proposals)
+                # bulk_create не отправляет сигналы — производные данные явно
+                if proposals:
+                    proposal_events.proposals_created(proposals)
+            break
+        except IntegrityError:
+            # Пару успел создать параллельный запрос — перечитываем существующие
+            if attempt:
+                raise
+    return {
+        "created": [proposal.pk for proposal in proposals],
+        "existing": [ad_id for ad_id in candidates if ad_id in existing],
+        "invalid": invalid,
+    }
@@ -0,0 +1,241 @@
+import asyncio
+import hashlib
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page
+from ads.models import Ad
+from ads.pagination import CountingPaginator, get_paginator, normalize_filter_key
+from ads.services import generations
+from ads.services.ads import search_ads
+
+STATS_PREFIX = "ads:search_cache:stats:"
+STATS_NAMES = ("hits", "misses", "coalesced")
+
+
+def _stat(name: str) -> None:
+    key = STATS_PREFIX + name
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_search_cache_stats() -> Dict[str, int]:
+    """
+    Счётчики кэша результатов поиска.
+    :return: {"hits": ..., "misses": ..., "coalesced": ...}; coalesced — промахи,
+             дождавшиеся результата чужого запроса вместо собственного
+    """
+    values = cache.get_many([STATS_PREFIX + name for name in STATS_NAMES])
+    return {name: values.get(STATS_PREFIX + name, 0) for name in STATS_NAMES}
+
+
+def reset_search_cache_stats() -> None:
+    """Обнуляет счётчики кэша результатов поиска."""
+    cache.delete_many([STATS_PREFIX + name for name in STATS_NAMES])
+
+
+def single_flight(key: str, compute: Callable[[], Any], timeout: int) -> Any:
+    """
+    Возвращает значение из кэша или вычисляет его.
+    При одновременных промахах вычисляет только один запрос (владелец блокировки
+    cache.add), остальные ждут появления значения в кэше.
+    :param key: ключ кэша
+    :param compute: функция вычисления значения
+    :param timeout: время жизни значения, секунды
+    :return: значение
+    """
+    value = cache.get(key)
+    if value is not None:
+        _stat("hits")
+        return value
+    _stat("misses")
+    lock_key = key + ":lock"
+    lock_timeout = settings.ADS_SEARCH_CACHE_LOCK_TIMEOUT
+    if cache.add(lock_key, 1, lock_timeout):
+        try:
+            value = compute()
+            cache.set(key, value, timeout)
+        finally:
+            cache.delete(lock_key)
+        return value
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        time.sleep(settings.ADS_SEARCH_CACHE_POLL_INTERVAL)
+        value = cache.get(key)
+        if value is not None:
+            _stat("coalesced")
+            return value
+        if cache.get(lock_key) is None:
+            break
+    # Владелец блокировки упал или не уложился в таймаут — считаем сами
+    value = compute()
+    cache.set(key, value, timeout)
+    return value
+
+
+async def _astat(name: str) -> None:
+    key = STATS_PREFIX + name
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, None):
+            await cache.aincr(key)
+
+
+async def asingle_flight(
+    key: str, compute: Callable[[], Awaitable[Any]], timeout: int
+) -> Any:
+    """
+    Асинхронный вариант single_flight: ожидание чужого вычисления
+    не занимает поток.
+    :param key: ключ кэша
+    :param compute: корутина-функция вычисления значения
+    :param timeout: время жизни значения, секунды
+    :return: значение
+    """
+    value = await cache.aget(key)
+    if value is not None:
+        await _astat("hits")
+        return value
+    await _astat("misses")
+    lock_key = key + ":lock"
+    lock_timeout = settings.ADS_SEARCH_CACHE_LOCK_TIMEOUT
+    if await cache.aadd(lock_key, 1, lock_timeout):
+        try:
+            value = await compute()
+            await cache.aset(key, value, timeout)
+        finally:
+            await cache.adelete(lock_key)
+        return value
+    deadline = time.monotonic() + lock_timeout
+    while time.monotonic() < deadline:
+        await asyncio.sleep(settings.ADS_SEARCH_CACHE_POLL_INTERVAL)
+        value = await cache.aget(key)
+        if value is not None:
+            await _astat("coalesced")
+            return value
+        if await cache.aget(lock_key) is None:
+            break
+    value = await compute()
+    await cache.aset(key, value, timeout)
+    return value
+
+
+def _page_keys(
+    query: str,
+    category: str,
+    condition: str,
+    page_number: Optional[str],
+    per_page: int,
+    ranked: bool,
+) -> Tuple[str, str]:
+    # (ключ количества для paginator, ключ страницы без поколения)
+    count_key = normalize_filter_key(
+        "ads", q=query, category=category, condition=condition
+    )
+    page_key = normalize_filter_key(
+        "ads-page",
+        q=query,
+        category=category,
+        condition=condition,
+        page=page_number,
+        per_page=per_page,
+        ranked=int(ranked),
+    )
+    return count_key, page_key
+
+
+def _cache_key(page_key: str, generation: int) -> str:
+    return "ads:search:" + hashlib.md5(f"{page_key}:{generation}".encode()).hexdigest()
+
+
+def _page_result(paginator: CountingPaginator, number: int, ids: List[int]) -> Dict[str, Any]:
+    return {
+        "ids": ids,
+        "number": number,
+        "count": paginator.count,
+        "count_is_estimate": paginator.count_is_estimate,
+    }
+
+
+def _build_page(result: Dict[str, Any], ads_by_id: Dict[int, Ad], per_page: int) -> Page:
+    object_list = [ads_by_id[pk] for pk in result["ids"] if pk in ads_by_id]
+    paginator = CountingPaginator(object_list, per_page)
+    paginator.count = result["count"]
+    paginator.count_is_estimate = result["count_is_estimate"]
+    return Page(object_list, result["number"], paginator)
+
+
+def search_ad_page(
+    query: str,
+    category: str,
+    condition: str,
+    page_number: Optional[str],
+    per_page: int,
+    ranked: bool = False,
+) -> Page:
+    """
+    Страница поиска объявлений через кэш id результатов.
+    Кэшируются только id, номер страницы и количество; ключ включает поколение
+    объявлений, которое увеличивают сигналы post_save/post_delete модели Ad.
+    :param query: поисковый запрос
+    :param category: фильтр по категории
+    :param condition: фильтр по состоянию
+    :param page_number: номер страницы из запроса (как в Paginator.get_page)
+    :param per_page: размер страницы
+    :param ranked: сортировка по релевантности
+    :return: Page с объявлениями
+    """
+    count_key, page_key = _page_keys(
+        query, category, condition, page_number, per_page, ranked
+    )
+    (generation,) = generations.get_generations(generations.ADS)
+
+    def compute() -> Dict[str, Any]:
+        ads = search_ads(query, category, condition, ranked=ranked)
+        paginator = get_paginator(ads, per_page, count_key, (generations.ADS,))
+        page = paginator.get_page(page_number)
+        ids = page.object_list.values_list("pk", flat=True)
+        return _page_result(paginator, page.number, list(ids))
+
+    result = single_flight(
+        _cache_key(page_key, generation), compute, settings.ADS_SEARCH_CACHE_TIMEOUT
+    )
+    ads_by_id = search_ads("", "", "").filter(pk__in=result["ids"]).in_bulk()
+    return _build_page(result, ads_by_id, per_page)
+
+
+async def asearch_ad_page(
+    query: str,
+    category: str,
+    condition: str,
+    page_number: Optional[str],
+    per_page: int,
+    ranked: bool = False,
+) -> Page:
+    """
+    Асинхронный вариант search_ad_page: при промахе кэша количество и id
+    страницы запрашиваются одновременно (CountingPaginator.aget_page).
+    Параметры и результат — как у search_ad_page.
+    """
+    count_key, page_key = _page_keys(
+        query, category, condition, page_number, per_page, ranked
+    )
+    (generation,) = await generations.aget_generations(generations.ADS)
+
+    async def compute() -> Dict[str, Any]:
+        ads = search_ads(query, category, condition, ranked=ranked)
+        ids = ads.values_list("pk", flat=True)
+        paginator = get_paginator(ids, per_page, count_key, (generations.ADS,))
+        page = await paginator.aget_page(page_number)
+        return _page_result(paginator, page.number, list(page.object_list))
+
+    result = await asingle_flight(
+        _cache_key(page_key, generation), compute, settings.ADS_SEARCH_CACHE_TIMEOUT
+    )
+    ads_by_id = await search_ads("", "", "").ain_bulk(result["ids"])
+    return _build_page(result, ads_by_id, per_page)
@@ -0,0 +1,167 @@
+from typing import Iterable
+from django.contrib.auth import get_user_model
+from django.db import connection
+from ads.models import Ad, ExchangeProposal, ProposalParticipant
+
+AD_FTS_TABLE = "ads_ad_fts"
+PROPOSAL_FTS_TABLE = "ads_proposal_fts"
+# Пачка id в одном запросе (лимит переменных SQLite)
+INDEX_BATCH_SIZE = 500
+
+
+def search_index_available() -> bool:
+    """
+    Проверяет, поддерживает ли текущая база данных индекс FTS5.
+    :return: True для SQLite
+    """
+    return connection.vendor == "sqlite"
+
+
+def index_ads(ad_ids: Iterable[int]) -> None:
+    """
+    Перестраивает строки полнотекстового индекса для указанных объявлений.
+    :param ad_ids: id объявлений
+    """
+    ad_ids = list(ad_ids)
+    if not ad_ids or not search_index_available():
+        return
+    if len(ad_ids) > INDEX_BATCH_SIZE:
+        for start in range(0, len(ad_ids), INDEX_BATCH_SIZE):
+            index_ads(ad_ids[start : start + INDEX_BATCH_SIZE])
+        return
+    user_model = get_user_model()
+    user_table = user_model._meta.db_table
+    username = user_model._meta.get_field(user_model.USERNAME_FIELD).column
+    placeholders = ", ".join(["%s"] * len(ad_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {AD_FTS_TABLE} WHERE rowid IN ({placeholders})", ad_ids
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {AD_FTS_TABLE}(rowid, title, description, category, condition, username)
+            SELECT a.id, a.title, a.description, a.category, a.condition, u.{username}
+            FROM {Ad._meta.db_table} a LEFT JOIN {user_table} u ON u.id = a.user_id
+            WHERE a.id IN ({placeholders})
+            """,
+            ad_ids,
+        )
+
+
+def unindex_ads(ad_ids: Iterable[int]) -> None:
+    """
+    Удаляет объявления из полнотекстового индекса.
+    :param ad_ids: id объявлений
+    """
+    ad_ids = list(ad_ids)
+    if not ad_ids or not search_index_available():
+        return
+    if len(ad_ids) > INDEX_BATCH_SIZE:
+        for start in range(0, len(ad_ids), INDEX_BATCH_SIZE):
+            unindex_ads(ad_ids[start : start + INDEX_BATCH_SIZE])
+        return
+    placeholders = ", ".join(["%s"] * len(ad_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {AD_FTS_TABLE} WHERE rowid IN ({placeholders})", ad_ids
+        )
+
+
+def reindex_user_ads(user_id: int) -> None:
+    """
+    Обновляет индекс всех объявлений пользователя (например, после смены username).
+    :param user_id: id пользователя
+    """
+    index_ads(Ad.objects.filter(user_id=user_id).values_list("pk", flat=True))
+
+
+def index_proposals(proposal_ids: Iterable[int]) -> None:
+    """
+    Перестраивает поисковые документы предложений: комментарий, поля обоих
+    объявлений и имена их владельцев.
+    :param proposal_ids: id предложений
+    """
+    proposal_ids = list(proposal_ids)
+    if not proposal_ids or not search_index_available():
+        return
+    if len(proposal_ids) > INDEX_BATCH_SIZE:
+        for start in range(0, len(proposal_ids), INDEX_BATCH_SIZE):
+            index_proposals(proposal_ids[start : start + INDEX_BATCH_SIZE])
+        return
+    user_model = get_user_model()
+    user_table = user_model._meta.db_table
+    username = user_model._meta.get_field(user_model.USERNAME_FIELD).column
+    ad_table = Ad._meta.db_table
+    placeholders = ", ".join(["%s"] * len(proposal_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {PROPOSAL_FTS_TABLE} WHERE rowid IN ({placeholders})",
+            proposal_ids,
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {PROPOSAL_FTS_TABLE}(
+                rowid, comment,
+                sender_title, sender_description, sender_category, sender_condition, sender_username,
+                receiver_title, receiver_description, receiver_category, receiver_condition, receiver_username
+            )
+            SELECT p.id, p.comment,
+                s.title, s.description, s.category, s.condition, su.{username},
+                r.title, r.description, r.category, r.condition, ru.{username}
+            FROM {ExchangeProposal._meta.db_table} p
+            JOIN {ad_table} s ON s.id = p.ad_sender_id
+            JOIN {ad_table} r ON r.id = p.ad_receiver_id
+            LEFT JOIN {user_table} su ON su.id = s.user_id
+            LEFT JOIN {user_table} ru ON ru.id = r.user_id
+            WHERE p.id IN ({placeholders})
+            """,
+            proposal_ids,
+        )
+
+
+def unindex_proposals(proposal_ids: Iterable[int]) -> None:
+    """
+    Удаляет поисковые документы предложений.
+    :param proposal_ids: id предложений
+    """
+    proposal_ids = list(proposal_ids)
+    if not proposal_ids or not search_index_available():
+        return
+    if len(proposal_ids) > INDEX_BATCH_SIZE:
+        for start in range(0, len(proposal_ids), INDEX_BATCH_SIZE):
+            unindex_proposals(proposal_ids[start : start + INDEX_BATCH_SIZE])
+        return
+    placeholders = ", ".join(["%s"] * len(proposal_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {PROPOSAL_FTS_TABLE} WHERE rowid IN ({placeholders})",
+            proposal_ids,
+        )
+
+
+def reindex_ad_proposals(ad_id: int) -> None:
+    """
+    Обновляет документы предложений, в которых участвует объявление.
+    :param ad_id: id объявления
+    """
+    if not search_index_available():
+        return
+    sent = ExchangeProposal.objects.filter(ad_sender_id=ad_id).values_list("pk", flat=True)
+    received = ExchangeProposal.objects.filter(ad_receiver_id=ad_id).values_list(
+        "pk", flat=True
+    )
+    index_proposals(set(sent) | set(received))
+
+
+def reindex_user_proposals(user_id: int) -> None:
+    """
+    Обновляет документы всех предложений пользователя (после смены username).
+    :param user_id: id пользователя
+    """
+    if not search_index_available():
+        return
+    index_proposals(
+        ProposalParticipant.objects.filter(user_id=user_id).values_list(
+            "proposal_id", flat=True
+        )
+    )
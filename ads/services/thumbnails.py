@@ -0,0 +1,153 @@
+import logging
+import os
+import posixpath
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, Optional
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, Storage
+from django.db import connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+from ads.models import Ad
+from ads.services import generations, images
+from ads.storage import RENDITIONS_DIR, rendition_storage
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def rendition_name(name: str, rendition: str) -> str:
+    """
+    Имя копии в каталоге копий: ads/3f/3fa1...c9.png -> renditions/ads/3f/3fa1...c9_thumb.jpg.
+    :param name: имя оригинала в хранилище
+    :param rendition: имя копии
+    :return: имя файла копии
+    """
+    root, _ = os.path.splitext(name)
+    return posixpath.join(RENDITIONS_DIR, f"{root}_{rendition}.jpg")
+
+
+def _write_rendition(storage: FileSystemStorage, name: str, data: bytes) -> None:
+    # Временный файл и атомарная замена: повторная генерация перезаписывает копию,
+    # а читатель никогда не видит наполовину записанный файл
+    path = storage.path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as temp:
+            temp.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if storage.file_permissions_mode is not None:
+        os.chmod(path, storage.file_permissions_mode)
+
+
+def build_renditions(name: str, storage: Storage) -> Dict[str, str]:
+    """
+    Создаёт копии изображения размеров ADS_IMAGE_RENDITIONS (JPEG, с учётом
+    ориентации EXIF, прозрачность — на белом фоне) в хранилище копий.
+    :param name: имя оригинала в хранилище
+    :param storage: хранилище оригинала
+    :return: имя копии -> имя файла в хранилище копий
+    """
+    with storage.open(name, "rb") as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, "white")
+        background.paste(image, mask=image.getchannel("A"))
+        image = background
+    else:
+        image = image.convert("RGB")
+    target_storage = rendition_storage()
+    renditions = {}
+    for rendition, size in settings.ADS_IMAGE_RENDITIONS.items():
+        copy = image.copy()
+        copy.thumbnail(tuple(size), Image.LANCZOS)
+        buffer = BytesIO()
+        copy.save(buffer, "JPEG", quality=settings.ADS_IMAGE_RENDITION_QUALITY, optimize=True)
+        target = rendition_name(name, rendition)
+        _write_rendition(target_storage, target, buffer.getvalue())
+        renditions[rendition] = target
+    return renditions
+
+
+def generate_ad_renditions(ad_id: int) -> Dict[str, str]:
+    """
+    Создаёт копии изображения объявления и сохраняет их имена.
+    Запись условная (image не изменился), поэтому опоздавшая генерация
+    не перезапишет копии более новой загрузки; её файлы удаляются, если
+    оригинал больше ни на одно объявление не ссылается.
+    :param ad_id: id объявления
+    :return: имя копии -> имя файла (пусто без изображения или при ошибке)
+    """
+    name = Ad.objects.filter(pk=ad_id).values_list("image", flat=True).first()
+    if not name:
+        return {}
+    storage = Ad._meta.get_field("image").storage
+    try:
+        renditions = build_renditions(name, storage)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.exception("Не удалось создать копии изображения %s", name)
+        return {}
+    updated = Ad.objects.filter(pk=ad_id, image=name).update(
+        image_renditions=renditions, updated_at=timezone.now()
+    )
+    if updated:
+        # renditions есть в ответе API — ETag объявлений должен смениться
+        generations.bump_generation(generations.ADS)
+    elif not images.image_referenced(name):
+        # Изображение сменилось или объявление удалено, пока шла генерация,
+        # и оригинал больше никому не нужен — только что записанные копии тоже
+        images.delete_renditions(renditions.values())
+    return renditions
+
+
+def _run_in_background(ad_id: int) -> None:
+    try:
+        generate_ad_renditions(ad_id)
+    finally:
+        # Поток пула держит своё соединение с БД — не оставляем его открытым
+        connections.close_all()
+
+
+def schedule_renditions(ad_id: int) -> None:
+    """
+    Ставит генерацию копий в очередь после коммита транзакции.
+    ADS_THUMBNAIL_MODE: "thread" — пул потоков вне обработки запроса,
+    "sync" — сразу (тесты, команды), "off" — только команда generate_thumbnails.
+    :param ad_id: id объявления
+    """
+    mode = settings.ADS_THUMBNAIL_MODE
+    if mode == "off":
+        return
+    if mode == "sync":
+        transaction.on_commit(lambda: generate_ad_renditions(ad_id))
+        return
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ADS_THUMBNAIL_WORKERS,
+            thread_name_prefix="ad-thumbnails",
+        )
+    transaction.on_commit(lambda: _executor.submit(_run_in_background, ad_id))
+
+
+def image_changed(ad: Ad) -> None:
+    """
+    Изображение объявления загружено, заменено или удалено: старые копии
+    больше не действительны, для нового изображения ставится генерация.
+    :param ad: сохранённое объявление
+    """
+    if ad.image_renditions:
+        Ad.objects.filter(pk=ad.pk).update(image_renditions={}, updated_at=timezone.now())
+        ad.image_renditions = {}
+    if ad.image:
+        schedule_renditions(ad.pk)
@@ -0,0 +1,181 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from typing import IO, Optional
+from django.conf import settings
+from django.contrib.auth.models import AbstractBaseUser
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, UnidentifiedImageError
+from ads.models import Ad, ImageUpload
+
+# Сигнатуры начала файла для разрешённых типов изображений
+IMAGE_SIGNATURES = {
+    "image/jpeg": (b"\xff\xd8\xff",),
+    "image/png": (b"\x89PNG\r\n\x1a\n",),
+    "image/gif": (b"GIF87a", b"GIF89a"),
+    "image/webp": (b"RIFF",),
+}
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Нарушены ограничения загрузки; code — машиночитаемая причина."""
+
+    def __init__(self, code: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def temp_path(upload: ImageUpload) -> str:
+    """
+    Путь временного файла загрузки.
+    :param upload: сессия загрузки
+    :return: абсолютный путь
+    """
+    return os.path.join(settings.ADS_UPLOAD_TEMP_DIR, f"{upload.pk}.part")
+
+
+def start_upload(
+    user: AbstractBaseUser, filename: str, size: int, content_type: str
+) -> ImageUpload:
+    """
+    Начинает загрузку по частям: проверяет заявленные размер и тип.
+    :param user: владелец загрузки
+    :param filename: исходное имя файла
+    :param size: полный размер файла, байт
+    :param content_type: MIME-тип из IMAGE_SIGNATURES
+    :return: сессия загрузки
+    """
+    if content_type not in IMAGE_SIGNATURES:
+        raise UploadError("invalid_type", "Допустимы только изображения JPEG, PNG, GIF и WebP")
+    if size <= 0 or size > settings.ADS_UPLOAD_MAX_SIZE:
+        raise UploadError(
+            "invalid_size",
+            f"Размер файла должен быть от 1 до {settings.ADS_UPLOAD_MAX_SIZE} байт",
+        )
+    upload = ImageUpload.objects.create(
+        user=user,
+        filename=os.path.basename(filename)[:255] or "image",
+        content_type=content_type,
+        size=size,
+    )
+    os.makedirs(settings.ADS_UPLOAD_TEMP_DIR, exist_ok=True)
+    open(temp_path(upload), "wb").close()
+    return upload
+
+
+def append_chunk(
+    upload: ImageUpload, offset: int, stream: IO[bytes], length: Optional[int]
+) -> int:
+    """
+    Дописывает часть файла. Тело запроса читается блоками в отдельный файл части,
+    затем смещение занимается условным обновлением received и только после этого
+    часть копируется во временный файл загрузки (в той же транзакции): параллельный
+    запрос с тем же смещением, проигравший обновление, файл загрузки не трогает.
+    Часть принимается только с текущего смещения (received) — после обрыва
+    клиент узнаёт received и продолжает с него.
+    :param upload: сессия загрузки
+    :param offset: смещение части в файле
+    :param stream: поток тела запроса
+    :param length: длина части (Content-Length)
+    :return: новое значение received
+    """
+    if offset != upload.received:
+        raise UploadError(
+            "offset_mismatch", f"Ожидалась часть со смещения {upload.received}"
+        )
+    if length is None or length <= 0:
+        raise UploadError("empty_chunk", "Пустая часть или не указан Content-Length")
+    if length > settings.ADS_UPLOAD_CHUNK_MAX_SIZE:
+        raise UploadError(
+            "chunk_too_large",
+            f"Часть больше {settings.ADS_UPLOAD_CHUNK_MAX_SIZE} байт",
+        )
+    if offset + length > upload.size:
+        raise UploadError("size_exceeded", "Данных больше заявленного размера файла")
+    fd, part_path = tempfile.mkstemp(
+        dir=settings.ADS_UPLOAD_TEMP_DIR, prefix=f"{upload.pk}.", suffix=".chunk"
+    )
+    try:
+        written = 0
+        with os.fdopen(fd, "w+b") as part:
+            while written < length:
+                block = stream.read(min(READ_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                if offset == 0 and written == 0:
+                    signatures = IMAGE_SIGNATURES[upload.content_type]
+                    if not block.startswith(signatures):
+                        raise UploadError("invalid_type", "Содержимое не соответствует типу файла")
+                part.write(block)
+                written += len(block)
+            part.seek(0)
+            with transaction.atomic():
+                # Условное обновление: параллельная часть с тем же смещением не засчитается
+                # дважды; ошибка записи откатывает received
+                updated = ImageUpload.objects.filter(pk=upload.pk, received=offset).update(
+                    received=offset + written
+                )
+                if not updated:
+                    raise UploadError("offset_mismatch", "Часть с этим смещением уже принята")
+                with open(temp_path(upload), "r+b") as target:
+                    target.seek(offset)
+                    shutil.copyfileobj(part, target, READ_BLOCK_SIZE)
+                    target.truncate(offset + written)
+    finally:
+        os.remove(part_path)
+    upload.received = offset + written
+    return upload.received
+
+
+def complete_upload(upload: ImageUpload, ad: Ad) -> Ad:
+    """
+    Завершает загрузку: проверяет изображение и прикрепляет его к объявлению.
+    Файл переносится в хранилище потоком, временный файл и сессия удаляются.
+    :param upload: сессия загрузки (получены все байты)
+    :param ad: объявление владельца загрузки
+    :return: объявление с новым изображением
+    """
+    if upload.received != upload.size:
+        raise UploadError(
+            "incomplete", f"Получено {upload.received} из {upload.size} байт"
+        )
+    path = temp_path(upload)
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        raise UploadError("invalid_image", "Файл не является корректным изображением")
+    with open(path, "rb") as source:
+        ad.image.save(upload.filename, File(source), save=False)
+    ad.save(update_fields=["image"])
+    discard_upload(upload)
+    return ad
+
+
+def discard_upload(upload: ImageUpload) -> None:
+    """
+    Удаляет сессию загрузки и её временный файл.
+    :param upload: сессия загрузки
+    """
+    try:
+        os.remove(temp_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def cleanup_expired_uploads() -> int:
+    """
+    Удаляет незавершённые загрузки старше ADS_UPLOAD_EXPIRE_HOURS.
+    :return: количество удалённых загрузок
+    """
+    deadline = timezone.now() - timedelta(hours=settings.ADS_UPLOAD_EXPIRE_HOURS)
+    expired = list(ImageUpload.objects.filter(created_at__lt=deadline))
+    for upload in expired:
+        discard_upload(upload)
+    return len(expired)
@@ -0,0 +1,136 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from ads.models import Ad, ExchangeProposal
+from ads.services import (
+    ad_events,
+    facets,
+    generations,
+    images,
+    proposal_events,
+    search_index,
+    thumbnails,
+)
+
+
+@receiver(post_save, sender=Ad)
+def ad_saved(sender, instance, created, **kwargs):
+    # Новое изображение (AdForm, AdSerializer, админка) — копии генерируются в фоне
+    image = instance.image.name or ""
+    loaded_image = getattr(instance, "_loaded_image", "")
+    if image != loaded_image:
+        # Старый файл удаляется, только если на него не ссылаются другие объявления
+        images.release_image(loaded_image, (instance.image_renditions or {}).values())
+        thumbnails.image_changed(instance)
+    instance._loaded_image = image
+    current = (instance.category, instance.condition)
+    if created:
+        ad_events.ads_created([instance])
+        instance._loaded_facets = current
+        return
+    # Синхронизирует полнотекстовый индекс при изменении объявления
+    search_index.index_ads([instance.pk])
+    # Поля объявления входят в поисковые документы его предложений
+    search_index.reindex_ad_proposals(instance.pk)
+    # Инкрементально обновляет счётчики фасетов (категория, состояние)
+    loaded = getattr(instance, "_loaded_facets", None)
+    if loaded and None not in loaded and loaded != current:
+        facets.apply_facet_delta([loaded], -1)
+        facets.apply_facet_delta([current], 1)
+    instance._loaded_facets = current
+    # Поиск предложений тоже опирается на поля объявлений
+    generations.bump_generation(generations.ADS, generations.PROPOSALS)
+
+
+# Предложения, удалённые каскадом (вместе с объявлением или пользователем),
+# копятся на объекте-источнике удаления и обрабатываются одной пачкой в ad_deleted:
+# Collector удаляет предложения раньше объявлений, на которые они ссылаются
+CASCADED_PROPOSALS = "_cascaded_proposals"
+# Владельцы удаляемых объявлений: после удаления строк их уже не прочитать из БД
+DELETED_AD_OWNERS = "_deleted_ad_owners"
+
+
+def _cascade_origin(origin):
+    if origin is None or isinstance(origin, ExchangeProposal):
+        return None
+    if getattr(origin, "model", None) is ExchangeProposal:
+        return None
+    return origin
+
+
+@receiver(pre_delete, sender=Ad)
+def ad_deleting(sender, instance, origin=None, **kwargs):
+    if origin is not None:
+        owners = getattr(origin, DELETED_AD_OWNERS, None)
+        if owners is None:
+            owners = {}
+            setattr(origin, DELETED_AD_OWNERS, owners)
+        owners[instance.pk] = instance.user_id
+
+
+@receiver(post_delete, sender=Ad)
+def ad_deleted(sender, instance, origin=None, **kwargs):
+    cascaded = getattr(origin, CASCADED_PROPOSALS, None)
+    if cascaded:
+        setattr(origin, CASCADED_PROPOSALS, [])
+        search_index.unindex_proposals([pk for pk, _ in cascaded])
+        proposal_events.proposals_deleted(
+            [state for _, state in cascaded], getattr(origin, DELETED_AD_OWNERS, None)
+        )
+    images.release_image(
+        getattr(instance, "_loaded_image", None) or instance.image.name or "",
+        (instance.image_renditions or {}).values(),
+    )
+    # Удаляет объявление из полнотекстового индекса
+    search_index.unindex_ads([instance.pk])
+    loaded = getattr(instance, "_loaded_facets", None)
+    if not loaded or None in loaded:
+        loaded = (instance.category, instance.condition)
+    facets.apply_facet_delta([loaded], -1)
+    generations.bump_generation(generations.ADS, generations.PROPOSALS)
+
+
+@receiver(post_save, sender=ExchangeProposal)
+def proposal_saved(sender, instance, created, **kwargs):
+    # ExchangeProposal.save() открывает транзакцию, поэтому счётчики
+    # обновляются атомарно вместе со строкой предложения
+    current = instance.counter_state()
+    loaded = getattr(instance, "_loaded_state", None)
+    if created:
+        proposal_events.proposals_created([instance])
+    else:
+        # Комментарий и объявления входят в поисковый документ предложения
+        search_index.index_proposals([instance.pk])
+        if loaded and None not in loaded:
+            proposal_events.proposals_changed([loaded], [instance])
+        else:
+            generations.bump_generation(generations.PROPOSALS)
+    instance._loaded_state = current
+
+
+@receiver(post_delete, sender=ExchangeProposal)
+def proposal_deleted(sender, instance, origin=None, **kwargs):
+    loaded = getattr(instance, "_loaded_state", None)
+    if not loaded or None in loaded:
+        loaded = instance.counter_state()
+    cascade = _cascade_origin(origin)
+    if cascade is not None:
+        # Каскад: обработка пачкой в ad_deleted вместо запросов на каждое предложение
+        cascaded = getattr(cascade, CASCADED_PROPOSALS, None)
+        if cascaded is None:
+            cascaded = []
+            setattr(cascade, CASCADED_PROPOSALS, cascaded)
+        cascaded.append((instance.pk, loaded))
+        return
+    search_index.unindex_proposals([instance.pk])
+    proposal_events.proposals_deleted([loaded])
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # username участвует в поиске объявлений (вход в систему меняет только last_login)
+    if created or (update_fields and sender.USERNAME_FIELD not in update_fields):
+        return
+    search_index.reindex_user_ads(instance.pk)
+    search_index.reindex_user_proposals(instance.pk)
+    generations.bump_generation(generations.ADS, generations.PROPOSALS)
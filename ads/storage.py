@@ -0,0 +1,111 @@
+import hashlib
+import os
+import posixpath
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+# Блокировка одного имени файла: сохранение того же содержимого и удаление
+# освобождённого файла (ads.services.images) не выполняются одновременно
+FILE_LOCK_TIMEOUT = 10
+FILE_LOCK_POLL_INTERVAL = 0.05
+
+
+@contextmanager
+def file_lock(name: str) -> Iterator[bool]:
+    """
+    Блокировка имени файла в кэше (cache.add); ждёт не дольше FILE_LOCK_TIMEOUT.
+    :param name: имя файла в хранилище
+    :return: True, если блокировка получена (иначе владелец завис или кэш недоступен)
+    """
+    lock_key = f"ads:file_lock:{name}"
+    deadline = time.monotonic() + FILE_LOCK_TIMEOUT
+    acquired = cache.add(lock_key, 1, FILE_LOCK_TIMEOUT)
+    while not acquired and time.monotonic() < deadline:
+        time.sleep(FILE_LOCK_POLL_INTERVAL)
+        acquired = cache.add(lock_key, 1, FILE_LOCK_TIMEOUT)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(lock_key)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище файлов по хешу содержимого: ads/photo.jpg -> ads/3f/3fa1...c9.jpg.
+    Файл пишется потоком во временный файл с одновременным подсчётом SHA-256
+    и атомарно переносится на место; одинаковое содержимое хранится один раз.
+    Удалять файл можно, только когда на него не ссылается ни одна запись
+    (см. ads.services.images.release_image). Повторное сохранение уже
+    существующего содержимого обновляет время изменения файла под file_lock:
+    ссылка на него может быть ещё не закоммичена, и освобождение не трогает
+    файлы моложе ADS_IMAGE_RELEASE_GRACE.
+    """
+
+    hash_chunk_size = 64 * 1024
+
+    def _write_temp(self, content):
+        temp_dir = os.path.join(self.location, ".incoming")
+        os.makedirs(temp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, temp_path = tempfile.mkstemp(dir=temp_dir)
+        try:
+            with os.fdopen(fd, "wb") as temp:
+                if hasattr(content, "seek"):
+                    content.seek(0)
+                for chunk in content.chunks(self.hash_chunk_size):
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    digest.update(chunk)
+                    temp.write(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        return digest.hexdigest(), temp_path
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        directory = posixpath.dirname(str(name).replace("\\", "/"))
+        extension = os.path.splitext(str(name))[1].lower()
+        digest, temp_path = self._write_temp(content)
+        final_name = posixpath.join(directory, digest[:2], digest + extension)
+        full_path = self.path(final_name)
+        with file_lock(final_name):
+            if os.path.exists(full_path):
+                # Такое содержимое уже есть — второй копии не будет; свежее
+                # время изменения защищает файл от удаления до коммита ссылки
+                os.utime(full_path)
+                os.remove(temp_path)
+                return final_name
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            os.replace(temp_path, full_path)
+        if self.file_permissions_mode is not None:
+            os.chmod(full_path, self.file_permissions_mode)
+        return final_name
+
+
+def ad_image_storage():
+    # Хранилище Ad.image; вызывается при загрузке модели (storage=callable)
+    return ContentAddressedStorage()
+
+
+# Уменьшенные копии (ads.services.thumbnails) лежат отдельно от оригиналов:
+# их имена выводятся из имени оригинала, а не из хеша содержимого, поэтому
+# копия никогда не совпадёт с файлом, на который ссылается Ad.image
+RENDITIONS_DIR = "renditions"
+
+
+def rendition_storage():
+    # Обычное файловое хранилище в MEDIA_ROOT (те же URL, что у оригиналов)
+    return FileSystemStorage()
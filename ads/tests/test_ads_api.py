@@ -1,14 +1,30 @@
+import json
+import os
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from ads.models import Ad
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from ads.models import Ad, AdFacetCount, ExchangeProposal, ImageUpload
+from ads.serializers import AdSerializer
+from ads.services import thumbnails, uploads
 
 User = get_user_model()
 
 
 class AdApiTests(APITestCase):
     def setUp(self):
+        # id пользователей и объявлений повторяются между тестами, кэш — нет
+        cache.clear()
         self.user = User.objects.create_user(username="testuser", password="pass")
         self.client = APIClient()
         url_token = reverse("token_obtain_pair")
@@ -61,3 +77,469 @@ class AdApiTests(APITestCase):
         self.assertEqual(response2.status_code, status.HTTP_200_OK)
         self.assertIn('results', response2.data)
         self.assertEqual(len(response2.data['results']), 7)
+
+    def test_cursor_pagination(self):
+        for i in range(15):
+            Ad.objects.create(user=self.user, title=f'CurAd{i}', description='desc', category='cat', condition='new')
+        # Одинаковое время создания: порядок внутри группы задаёт id
+        Ad.objects.update(created_at=self.ad1.created_at)
+        url = reverse('ad-list')
+        response = self.client.get(url + '?cursor=', format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('count', response.data)
+        self.assertIsNone(response.data['previous'])
+        first_ids = [ad['id'] for ad in response.data['results']]
+        self.assertEqual(len(first_ids), 10)
+        response2 = self.client.get(response.data['next'], format='json')
+        second_ids = [ad['id'] for ad in response2.data['results']]
+        self.assertEqual(len(second_ids), 7)
+        self.assertIsNone(response2.data['next'])
+        all_ids = list(Ad.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(first_ids + second_ids, all_ids)
+        response3 = self.client.get(response2.data['previous'], format='json')
+        self.assertEqual([ad['id'] for ad in response3.data['results']], first_ids)
+        self.assertIsNone(response3.data['previous'])
+
+    def test_cursor_pagination_invalid_cursor(self):
+        response = self.client.get(reverse('ad-list') + '?cursor=garbage', format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_count_cached_until_write(self):
+        url = reverse('ad-list') + '?category=CAT'
+        self.client.get(url, format='json')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url + '&page=1', format='json')
+        self.assertEqual(response.data['count'], 2)
+        self.assertFalse(any('COUNT(' in q['sql'] for q in ctx.captured_queries))
+        Ad.objects.create(user=self.user, title='Ad3', description='desc', category='cat', condition='new')
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.data['count'], 3)
+
+    @override_settings(
+        ADS_PAGINATOR_CLASS='ads.pagination.EstimatedCountPaginator',
+        ADS_COUNT_ESTIMATE_THRESHOLD=1,
+    )
+    def test_estimated_count(self):
+        response = self.client.get(reverse('ad-list'), format='json')
+        self.assertEqual(response.data['count'], 1)
+        self.assertTrue(response.data['count_is_estimate'])
+
+    def test_facets(self):
+        Ad.objects.create(user=self.user, title='Ad3', description='desc', category=' Cat ', condition='NEW')
+        phone = Ad.objects.create(user=self.user, title='Phone', description='desc', category='Phones', condition='new')
+        url = reverse('ad-facets')
+        response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        categories = {f['key']: f['count'] for f in response.data['category']}
+        conditions = {f['key']: f['count'] for f in response.data['condition']}
+        self.assertEqual(categories, {'cat': 3, 'phones': 1})
+        self.assertEqual(conditions, {'new': 3, 'used': 1})
+        # Фасет категории учитывает фильтр по состоянию и наоборот
+        response = self.client.get(url, {'condition': 'used'}, format='json')
+        self.assertEqual([(f['key'], f['count']) for f in response.data['category']], [('cat', 1)])
+        # Изменение и удаление объявлений обновляют счётчики инкрементально
+        phone.category = 'cat'
+        phone.save()
+        self.ad1.delete()
+        response = self.client.get(url, format='json')
+        self.assertEqual([(f['key'], f['count']) for f in response.data['category']], [('cat', 3)])
+        # С поисковым запросом — группировка по результатам поиска
+        response = self.client.get(url, {'q': 'phone'}, format='json')
+        self.assertEqual([(f['key'], f['count']) for f in response.data['category']], [('cat', 1)])
+        before = sorted(AdFacetCount.objects.values_list('category_key', 'condition_key', 'count'))
+        call_command('rebuild_ad_facets', stdout=StringIO())
+        after = sorted(AdFacetCount.objects.values_list('category_key', 'condition_key', 'count'))
+        self.assertEqual(before, after)
+
+    def test_exchange_indicators_values_and_large_batches(self):
+        other = User.objects.create_user(username="other", password="pass")
+        foreign = Ad.objects.create(user=other, title='Foreign', description='desc', category='cat', condition='new')
+        incoming_ad = Ad.objects.create(user=other, title='Incoming', description='desc', category='cat', condition='new')
+        ExchangeProposal.objects.create(ad_sender=self.ad1, ad_receiver=foreign, comment='')
+        ExchangeProposal.objects.create(ad_sender=incoming_ad, ad_receiver=self.ad2, comment='')
+        url = reverse("ad-exchange-indicators")
+        ad_ids = [self.ad1.id, self.ad2.id, foreign.id, incoming_ad.id]
+        # Несуществующие id дополняют пачку до нескольких запросов
+        ad_ids += list(range(100000, 101200))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, {"ad_ids": ad_ids}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        ad_queries = [q for q in ctx.captured_queries if 'FROM "ads_ad"' in q['sql']]
+        self.assertEqual(len(ad_queries), 3)
+        self.assertEqual(response.data["incoming"], {foreign.id: 1, self.ad2.id: 1})
+        self.assertEqual(response.data["outgoing"], [foreign.id])
+        self.assertTrue(response.data["exchange_map"][foreign.id])
+        self.assertTrue(response.data["exchange_map"][incoming_ad.id])
+        self.assertFalse(response.data["exchange_map"][100000])
+
+    def test_exchange_partner_cache_updated_incrementally(self):
+        other = User.objects.create_user(username="other", password="pass")
+        foreign = Ad.objects.create(user=other, title='Foreign', description='desc', category='cat', condition='new')
+        url = reverse("ad-exchange-indicators")
+        ad_ids = [foreign.id]
+        response = self.client.post(url, {"ad_ids": ad_ids}, format="json")
+        self.assertFalse(response.data["exchange_map"][foreign.id])
+        proposal = ExchangeProposal.objects.create(ad_sender=self.ad1, ad_receiver=foreign, comment='')
+        # Кэш уже построен: чтение не обращается к таблице предложений
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, {"ad_ids": ad_ids}, format="json")
+        self.assertFalse(any('"ads_exchangeproposal"' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(response.data["outgoing"], [foreign.id])
+        self.assertTrue(response.data["exchange_map"][foreign.id])
+        # Второе предложение к тому же объявлению: удаление одного связь не снимает
+        second = ExchangeProposal.objects.create(ad_sender=self.ad2, ad_receiver=foreign, comment='')
+        proposal.delete()
+        response = self.client.post(url, {"ad_ids": ad_ids}, format="json")
+        self.assertTrue(response.data["exchange_map"][foreign.id])
+        second.delete()
+        response = self.client.post(url, {"ad_ids": ad_ids}, format="json")
+        self.assertEqual(response.data["outgoing"], [])
+        self.assertFalse(response.data["exchange_map"][foreign.id])
+
+    def test_exchange_partner_cache_cascade_and_contention(self):
+        url = reverse("ad-exchange-indicators")
+        others = [User.objects.create_user(username=f"other{i}", password="pass") for i in range(4)]
+        foreign = [
+            Ad.objects.create(user=other, title="F", description="d", category="cat", condition="new")
+            for other in others
+        ]
+        for ad in foreign:
+            ExchangeProposal.objects.create(ad_sender=ad, ad_receiver=self.ad1)
+        ExchangeProposal.objects.create(ad_sender=self.ad2, ad_receiver=foreign[0])
+        ad_ids = [ad.id for ad in foreign]
+        response = self.client.post(url, {"ad_ids": ad_ids}, format="json")
+        self.assertTrue(all(response.data["exchange_map"].values()))
+        # Каскадное удаление: проверка оставшихся связей — пачкой, а не по предложению
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            self.ad1.delete()
+        lookups = [
+            q for q in ctx.captured_queries
+            if q["sql"].startswith("SELECT DISTINCT") and '"ads_exchangeproposal"' in q["sql"]
+        ]
+        self.assertEqual(len(lookups), 4)  # две стороны, сразу и после коммита
+        response = self.client.post(url, {"ad_ids": ad_ids}, format="json")
+        self.assertEqual(response.data["exchange_map"], {ad_ids[0]: True, **{i: False for i in ad_ids[1:]}})
+        # Кэш пользователя правит другой запрос: правка не теряется, кэш сбрасывается
+        cache.add(f"ads:exchange_partners:lock:{self.user.pk}", 1)
+        ExchangeProposal.objects.create(ad_sender=self.ad2, ad_receiver=foreign[1])
+        response = self.client.post(url, {"ad_ids": ad_ids}, format="json")
+        self.assertTrue(response.data["exchange_map"][ad_ids[1]])
+
+    def test_import_ads_endpoint_jsonl(self):
+        lines = [
+            '{"title": "Импорт 1", "description": "d", "category": "Книги", "condition": "new"}',
+            '{"title": "", "description": "d", "category": "Книги", "condition": "new"}',
+            "not json",
+            '{"title": "Импорт 2", "description": "d", "category": "Книги", "condition": "new"}',
+        ]
+        upload = SimpleUploadedFile("ads.jsonl", "\n".join(lines).encode())
+        url = reverse("ad-import-ads")
+        response = self.client.post(url, {"file": upload, "batch_size": 1}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["created"], 2)
+        self.assertEqual(response.data["rejected"], 2)
+        self.assertEqual(response.data["next_offset"], 4)
+        self.assertEqual([row["row"] for row in response.data["rejected_rows"]], [1, 2])
+        self.assertIn("title", response.data["rejected_rows"][0]["errors"])
+        imported = Ad.objects.get(title="Импорт 2")
+        self.assertEqual((imported.user, imported.category_key), (self.user, "книги"))
+        # Фасеты и полнотекстовый индекс обновлены без сигналов
+        self.assertEqual(AdFacetCount.objects.get(category_key="книги").count, 2)
+        response = self.client.get(reverse("ad-list"), {"q": "импорт"})
+        self.assertEqual(response.data["count"], 2)
+
+    def test_import_ads_unreadable_file_returns_400(self):
+        url = reverse("ad-import-ads")
+        content = "title,description,category,condition\nКнига,описание,Книги,new\n".encode("cp1251")
+        upload = SimpleUploadedFile("ads.csv", content)
+        response = self.client.post(url, {"file": upload}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("UTF-8", response.data["error"])
+        self.assertEqual((response.data["created"], response.data["next_offset"]), (0, 0))
+        # Поле длиннее csv.field_size_limit(): записанная пачка остаётся, смещение — для продолжения
+        content = "title,description,category,condition\nCSV 0,d,cat,new\nCSV 1,\"" + "x" * 200000 + "\",cat,new\n"
+        upload = SimpleUploadedFile("ads.csv", content.encode())
+        response = self.client.post(url, {"file": upload, "batch_size": 1}, format="multipart")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("CSV", response.data["error"])
+        self.assertEqual((response.data["created"], response.data["next_offset"]), (1, 1))
+        self.assertTrue(Ad.objects.filter(title="CSV 0").exists())
+
+    def test_import_ads_command_csv_with_offset(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "ads.csv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("title,description,category,condition\n")
+                for i in range(5):
+                    f.write(f"CSV {i},desc,cat,new\n")
+            report = os.path.join(tmp, "rejected.jsonl")
+            out = StringIO()
+            call_command(
+                "import_ads", path, user="testuser", offset=2, batch_size=2,
+                report=report, stdout=out,
+            )
+            self.assertIn("--offset 4", out.getvalue())
+        self.assertEqual(
+            sorted(Ad.objects.filter(title__startswith="CSV").values_list("title", flat=True)),
+            ["CSV 2", "CSV 3", "CSV 4"],
+        )
+
+    def test_export_ads_streams_ndjson_and_csv(self):
+        url = reverse("ad-export")
+        response = self.client.get(url, {"condition": "new"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row["title"] for row in rows], ["Ad1"])
+        self.assertEqual(rows[0]["username"], "testuser")
+        response = self.client.get(url, {"export_format": "csv"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith("id,user,username,title"))
+        self.assertEqual(len(lines), 3)
+        self.client.credentials()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_image_renditions_generated_after_upload(self):
+        buffer = BytesIO()
+        Image.new("RGBA", (1200, 800), (200, 30, 30, 128)).save(buffer, "PNG")
+        upload = SimpleUploadedFile("photo.png", buffer.getvalue(), content_type="image/png")
+        data = {"title": "Фото", "description": "d", "category": "cat", "condition": "new", "image": upload}
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media, ADS_THUMBNAIL_MODE="sync", ADS_IMAGE_RELEASE_GRACE=0
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse("ad-list"), data, format="multipart")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            ad = Ad.objects.get(pk=response.data["id"])
+            self.assertEqual(set(ad.image_renditions), {"thumb", "medium"})
+            thumb_name = ad.image_renditions["thumb"]
+            self.assertTrue(thumb_name.startswith("renditions/" + os.path.splitext(ad.image.name)[0]))
+            with Image.open(os.path.join(media, thumb_name)) as thumb:
+                self.assertEqual(thumb.size, (160, 107))
+            response = self.client.get(reverse("ad-detail", args=[ad.pk]))
+            self.assertTrue(response.data["renditions"]["thumb"].endswith("/media/" + thumb_name))
+            # Правка без нового изображения не сбрасывает копии
+            ad.title = "Фото 2"
+            ad.save()
+            ad.refresh_from_db()
+            self.assertEqual(len(ad.image_renditions), 2)
+            Ad.objects.filter(pk=ad.pk).update(image_renditions={})
+            call_command("generate_thumbnails", stdout=StringIO())
+            ad.refresh_from_db()
+            self.assertTrue(ad.image_renditions["medium"].endswith(".jpg"))
+            # Файл, на который ссылается другое объявление, не удаляется вместе с копиями
+            Ad.objects.filter(pk=self.ad2.pk).update(image=thumb_name)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.delete(reverse("ad-detail", args=[ad.pk]))
+            self.assertFalse(os.path.exists(os.path.join(media, ad.image.name)))
+            self.assertFalse(os.path.exists(os.path.join(media, ad.image_renditions["medium"])))
+            self.assertTrue(os.path.exists(os.path.join(media, thumb_name)))
+
+    def test_released_image_kept_during_grace_and_swept_later(self):
+        buffer = BytesIO()
+        Image.new("RGB", (40, 40), "green").save(buffer, "PNG")
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media, ADS_THUMBNAIL_MODE="off", ADS_IMAGE_RELEASE_GRACE=600
+        ):
+            self.ad1.image = SimpleUploadedFile("a.png", buffer.getvalue())
+            self.ad1.save()
+            name = self.ad1.image.name
+            path = os.path.join(media, name)
+            old = os.path.getmtime(path) - 3600
+            os.utime(path, (old, old))
+            # То же содержимое сохраняется в другой транзакции, пока первое объявление удаляется
+            storage = Ad._meta.get_field("image").storage
+            self.assertEqual(storage.save("ads/b.png", SimpleUploadedFile("b.png", buffer.getvalue())), name)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.ad1.delete()
+            self.assertTrue(os.path.exists(path))
+            out = StringIO()
+            call_command("cleanup_images", stdout=out)
+            self.assertIn("Удалено изображений: 0", out.getvalue())
+            self.assertTrue(os.path.exists(path))
+            os.utime(path, (old, old))
+            call_command("cleanup_images", stdout=out)
+            self.assertIn("Удалено изображений: 1", out.getvalue())
+            self.assertFalse(os.path.exists(path))
+
+    def test_late_renditions_removed_when_image_replaced(self):
+        buffer = BytesIO()
+        Image.new("RGB", (400, 300), "red").save(buffer, "PNG")
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media, ADS_THUMBNAIL_MODE="off"
+        ):
+            self.ad1.image = SimpleUploadedFile("photo.png", buffer.getvalue())
+            self.ad1.save()
+            build_renditions = thumbnails.build_renditions
+
+            def build_and_replace(name, storage):
+                # Пока генерировались копии, объявлению загрузили другое изображение
+                renditions = build_renditions(name, storage)
+                Ad.objects.filter(pk=self.ad1.pk).update(image="ads/other.png")
+                return renditions
+
+            with mock.patch("ads.services.thumbnails.build_renditions", side_effect=build_and_replace):
+                renditions = thumbnails.generate_ad_renditions(self.ad1.pk)
+            self.assertEqual(set(renditions), {"thumb", "medium"})
+            for name in renditions.values():
+                self.assertFalse(os.path.exists(os.path.join(media, name)))
+            self.assertEqual(Ad.objects.get(pk=self.ad1.pk).image_renditions, {})
+
+    def test_identical_images_stored_once_and_released_with_last_ad(self):
+        buffer = BytesIO()
+        Image.new("RGB", (40, 40), "blue").save(buffer, "JPEG")
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media, ADS_THUMBNAIL_MODE="off", ADS_IMAGE_RELEASE_GRACE=0
+        ):
+            created = []
+            for name in ("a.JPG", "b.jpg"):
+                upload = SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+                data = {"title": name, "description": "d", "category": "cat", "condition": "new", "image": upload}
+                response = self.client.post(reverse("ad-list"), data, format="multipart")
+                created.append(Ad.objects.get(pk=response.data["id"]))
+            first, second = created
+            self.assertEqual(first.image.name, second.image.name)
+            self.assertRegex(first.image.name, r"^ads/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+            path = os.path.join(media, first.image.name)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.delete(reverse("ad-detail", args=[first.pk]))
+            self.assertTrue(os.path.exists(path))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.delete(reverse("ad-detail", args=[second.pk]))
+            self.assertFalse(os.path.exists(path))
+
+    def test_chunked_upload_resumes_and_attaches_image(self):
+        buffer = BytesIO()
+        Image.new("RGB", (300, 200), "green").save(buffer, "PNG")
+        content = buffer.getvalue()
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media,
+            ADS_UPLOAD_TEMP_DIR=os.path.join(media, ".uploads"),
+            ADS_UPLOAD_CHUNK_MAX_SIZE=512,
+            ADS_THUMBNAIL_MODE="off",
+        ):
+            response = self.client.post(
+                reverse("imageupload-list"),
+                {"filename": "photo.png", "size": len(content), "content_type": "image/png"},
+                format="json",
+            )
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            upload_id = response.data["id"]
+            # Строка объявления в кэше фрагментов списка — до загрузки изображения
+            self.assertEqual(APIClient().get(reverse("ad_list")).status_code, status.HTTP_200_OK)
+            chunk_url = reverse("imageupload-chunk", args=[upload_id])
+
+            def put_chunk(offset, data):
+                return self.client.put(
+                    f"{chunk_url}?offset={offset}", data, content_type="application/octet-stream"
+                )
+
+            self.assertEqual(put_chunk(0, b"GIF89a" + content[6:400]).data["code"], "invalid_type")
+            self.assertEqual(put_chunk(0, content[:1024]).data["code"], "chunk_too_large")
+            self.assertEqual(put_chunk(0, content[:400]).data["received"], 400)
+            # Повтор уже принятой части — конфликт с текущим смещением для продолжения
+            response = put_chunk(0, content[:400])
+            self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+            self.assertEqual(response.data["received"], 400)
+            complete_url = reverse("imageupload-complete", args=[upload_id])
+            response = self.client.post(complete_url, {"ad": self.ad1.pk}, format="json")
+            self.assertEqual(response.data["code"], "incomplete")
+            offset = self.client.get(reverse("imageupload-detail", args=[upload_id])).data["received"]
+            while offset < len(content):
+                offset = put_chunk(offset, content[offset:offset + 512]).data["received"]
+            response = self.client.post(complete_url, {"ad": self.ad1.pk}, format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.ad1.refresh_from_db()
+            self.assertRegex(self.ad1.image.name, r"^ads/[0-9a-f]{2}/[0-9a-f]{64}\.png$")
+            # Частичное сохранение (update_fields=["image"]) меняет версию строки
+            self.assertContains(APIClient().get(reverse("ad_list")), self.ad1.image.url)
+            with open(os.path.join(media, self.ad1.image.name), "rb") as stored:
+                self.assertEqual(stored.read(), content)
+            self.assertFalse(ImageUpload.objects.exists())
+            self.assertEqual(os.listdir(os.path.join(media, ".uploads")), [])
+
+    def test_chunk_losing_offset_race_leaves_upload_file_intact(self):
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            ADS_UPLOAD_TEMP_DIR=os.path.join(media, ".uploads")
+        ):
+            upload = uploads.start_upload(self.user, "a.png", 16, "image/png")
+            first = b"\x89PNG\r\n\x1a\n" + b"A" * 4
+            uploads.append_chunk(upload, 0, BytesIO(first), len(first))
+            # Параллельный запрос прочитал сессию до того, как смещение 0 было занято
+            stale = ImageUpload.objects.get(pk=upload.pk)
+            stale.received = 0
+            second = b"\x89PNG\r\n\x1a\n" + b"B" * 4
+            with self.assertRaises(uploads.UploadError) as error:
+                uploads.append_chunk(stale, 0, BytesIO(second), len(second))
+            self.assertEqual(error.exception.code, "offset_mismatch")
+            with open(uploads.temp_path(upload), "rb") as target:
+                self.assertEqual(target.read(), first)
+            self.assertEqual(os.listdir(os.path.join(media, ".uploads")), [f"{upload.pk}.part"])
+    def test_conditional_get_returns_304_without_queries(self):
+        anonymous = APIClient()
+        list_url = reverse("ad-list")
+        detail_url = reverse("ad-detail", args=[self.ad1.pk])
+        for url in (list_url, detail_url):
+            response = anonymous.get(url)
+            etag = response["ETag"]
+            with self.assertNumQueries(0):
+                response = anonymous.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response["ETag"], etag)
+            # Другой фильтр — другой ETag
+            self.assertEqual(anonymous.get(url, {"q": "Ad1"}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        etag = anonymous.get(detail_url)["ETag"]
+        # Предложение меняет счётчики объявления — ETag тоже
+        other = User.objects.create_user(username="other", password="pass")
+        ad3 = Ad.objects.create(user=other, title="Ad3", description="d", category="cat", condition="new")
+        with self.captureOnCommitCallbacks(execute=True):
+            ExchangeProposal.objects.create(ad_sender=ad3, ad_receiver=self.ad1)
+        response = anonymous.get(detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["incoming_total"], 1)
+
+    def test_fast_read_path_matches_serializer_bytes(self):
+        Ad.objects.filter(pk=self.ad1.pk).update(
+            image="ads/photo.png", image_renditions={"thumb": "ads/photo_thumb.jpg"}
+        )
+        for url, sort in ((reverse("ad-list"), ""), (reverse("ad-list"), "relevance")):
+            response = self.client.get(url, {"q": "Ad", "sort": sort, "cursor": ""})
+            # Порядок строк задаёт ответ; сравниваются байты сериализации
+            ads = Ad.objects.in_bulk([row["id"] for row in response.data["results"]])
+            ads = [ads[row["id"]] for row in response.data["results"]]
+            self.assertEqual(len(ads), 2)
+            results = AdSerializer(ads, many=True, context={"request": response.wsgi_request}).data
+            expected = response.accepted_renderer.render(
+                dict(response.data, results=results),
+                response.accepted_media_type,
+                response.renderer_context,
+            )
+            self.assertEqual(response.content, expected)
+        response = self.client.get(reverse("ad-detail", args=[self.ad1.pk]))
+        self.ad1.refresh_from_db()
+        serialized = AdSerializer(self.ad1, context={"request": response.wsgi_request}).data
+        self.assertEqual(
+            response.content,
+            response.accepted_renderer.render(
+                serialized, response.accepted_media_type, response.renderer_context
+            ),
+        )
+        self.assertTrue(response.data["image"].endswith("/media/ads/photo.png"))
+        self.assertEqual(self.client.get(reverse("ad-detail", args=[0])).status_code, 404)
+
+    def test_sparse_fields_and_expand_user(self):
+        url = reverse("ad-list")
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"fields": "id,title", "cursor": ""})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(response.data["results"][0]), {"id", "title"})
+        self.assertNotIn('"description"', queries[-1]["sql"])
+        response = self.client.get(url, {"fields": "id,user", "expand": "user"})
+        self.assertEqual(
+            response.data["results"][0]["user"], {"id": self.user.id, "username": "testuser"}
+        )
+        response = self.client.get(reverse("ad-detail", args=[self.ad1.pk]), {"expand": "user"})
+        self.assertEqual(response.data["user"]["username"], "testuser")
+        self.assertEqual(response.data["title"], "Ad1")
+        self.assertEqual(self.client.get(url, {"fields": "id,secret"}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"expand": "category"}).status_code, 400)
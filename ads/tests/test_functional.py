@@ -1,8 +1,19 @@
-from django.test import TestCase, Client
+from unittest import mock
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.checks import run_checks
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from ads.models import Ad, ExchangeProposal
 from django.core.files.uploadedfile import SimpleUploadedFile
+from ads.pagination import KeysetPaginator, encode_cursor
+from ads.services.ads import search_ads
+from ads.services.proposals import search_proposals
+from ads.services.search_index import reindex_user_ads
+from ads.views import ad_list_async, proposal_list_async
 
 User = get_user_model()
 
@@ -27,6 +38,20 @@ class BarterPlatformTests(TestCase):
             condition="Новый",
         )
 
+    def test_deploy_check_requires_shared_cache(self):
+        errors = [error.id for error in run_checks(include_deployment_checks=True)]
+        self.assertIn("ads.E001", errors)
+        redis = {
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": "redis://cache:6379/0",
+            }
+        }
+        with override_settings(CACHES=redis):
+            errors = [error.id for error in run_checks(include_deployment_checks=True)]
+        self.assertNotIn("ads.E001", errors)
+        self.assertNotIn("ads.E001", [error.id for error in run_checks()])
+
     def test_registration(self):
         response = self.client.post(
             reverse("register"),
@@ -181,3 +206,159 @@ class BarterPlatformTests(TestCase):
         self.assertRedirects(response, reverse("proposal_list"))
         proposal.refresh_from_db()
         self.assertEqual(proposal.status, "pending")
+
+    def test_ad_list_search_by_prefix_and_username(self):
+        response = self.client.get(reverse("ad_list"), {"q": "велосип"})
+        self.assertContains(response, "Велосипед")
+        self.assertNotContains(response, "Ноутбук")
+        response = self.client.get(reverse("ad_list"), {"q": "user2"})
+        self.assertContains(response, "Ноутбук")
+        self.assertNotContains(response, "Велосипед")
+
+    def test_ad_search_index_follows_updates(self):
+        self.ad1.title = "Самокат"
+        self.ad1.save()
+        self.assertEqual(list(search_ads("самокат", "", "")), [self.ad1])
+        self.ad1.delete()
+        self.assertEqual(list(search_ads("самокат", "", "")), [])
+
+    def test_reindex_user_ads_in_batches(self):
+        Ad.objects.create(
+            user=self.user1, title="Самокат", description="d", category="Транспорт", condition="Новый"
+        )
+        User.objects.filter(pk=self.user1.pk).update(username="велолюб")
+        with mock.patch("ads.services.search_index.INDEX_BATCH_SIZE", 1), CaptureQueriesContext(
+            connection
+        ) as queries:
+            reindex_user_ads(self.user1.pk)
+        inserts = [q for q in queries if q["sql"].lstrip().startswith("INSERT INTO ads_ad_fts")]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(search_ads("велолюб", "", "").count(), 2)
+
+    def test_ad_search_ranked_and_like_fallback(self):
+        ads = search_ads("ноутбук", "", "", ranked=True)
+        self.assertEqual(list(ads), [self.ad2])
+        with override_settings(ADS_SEARCH_BACKEND="like"):
+            self.assertEqual(list(search_ads("утбу", "", "")), [self.ad2])
+
+    def test_ad_list_cursor_mode(self):
+        for i in range(12):
+            Ad.objects.create(
+                user=self.user1,
+                title=f"Товар {i}",
+                description="desc",
+                category="Разное",
+                condition="Новый",
+            )
+        response = self.client.get(reverse("ad_list"), {"category": "Разное", "cursor": ""})
+        self.assertTrue(response.context["cursor_mode"])
+        page_obj = response.context["page_obj"]
+        self.assertEqual(len(page_obj), 10)
+        self.assertContains(response, "category=%D0%A0%D0%B0%D0%B7%D0%BD%D0%BE%D0%B5&amp;cursor=")
+        response = self.client.get(
+            reverse("ad_list"), {"category": "Разное", "cursor": page_obj.next_cursor}
+        )
+        self.assertEqual(len(response.context["page_obj"]), 2)
+        self.assertFalse(response.context["page_obj"].has_next())
+
+    def test_keyset_page_searches_index_from_cursor(self):
+        # Граница по первому ключу: план — SEARCH по индексу (created_at<?), а не SCAN с начала
+        ad = Ad.objects.order_by("created_at").first()
+        cursor = encode_cursor("n", [ad.created_at, ad.pk])
+        for queryset in (Ad.objects.order_by("-created_at", "-id"), search_proposals(self.user1, "", "")):
+            page_queryset, _, _ = KeysetPaginator(queryset, 10)._page_queryset(cursor)
+            plan = page_queryset.explain()
+            self.assertIn("created_at<?", plan)
+            self.assertNotIn("SCAN", plan)
+
+    def test_ad_list_filter_case_insensitive_keys(self):
+        self.assertEqual(self.ad2.category_key, "электроника")
+        response = self.client.get(
+            reverse("ad_list"), {"category": " электроника ", "condition": "НОВЫЙ"}
+        )
+        self.assertContains(response, "Ноутбук")
+        self.assertNotContains(response, "Велосипед")
+        self.ad2.category = "Техника"
+        self.ad2.save(update_fields=["category"])
+        self.assertEqual(Ad.objects.get(pk=self.ad2.pk).category_key, "техника")
+
+    def test_proposal_search_document_follows_updates(self):
+        proposal = ExchangeProposal.objects.create(
+            ad_sender=self.ad1, ad_receiver=self.ad2, comment="Срочно"
+        )
+        for query in ("срочн", "ноутб", "горный", "user2"):
+            self.assertEqual(list(search_proposals(self.user1, "", query)), [proposal])
+        self.ad2.title = "Планшет"
+        self.ad2.save()
+        self.assertEqual(list(search_proposals(self.user1, "", "планш")), [proposal])
+        self.user2.username = "seller"
+        self.user2.save()
+        self.assertEqual(list(search_proposals(self.user1, "", "seller")), [proposal])
+        with override_settings(ADS_SEARCH_BACKEND="like"):
+            self.assertEqual(list(search_proposals(self.user1, "", "рочн")), [proposal])
+        proposal.delete()
+        self.assertEqual(list(search_proposals(self.user1, "", "срочн")), [])
+
+    def test_cascaded_proposals_unindexed_in_batches(self):
+        for i in range(3):
+            sender = Ad.objects.create(
+                user=self.user2, title=f"Обмен {i}", description="d", category="Разное", condition="Новый"
+            )
+            ExchangeProposal.objects.create(ad_sender=sender, ad_receiver=self.ad1, comment="Срочно")
+        with mock.patch("ads.services.search_index.INDEX_BATCH_SIZE", 2), CaptureQueriesContext(
+            connection
+        ) as queries:
+            self.ad1.delete()
+        deletes = [q for q in queries if q["sql"].lstrip().startswith("DELETE FROM ads_proposal_fts")]
+        self.assertEqual(len(deletes), 2)
+        self.assertEqual(list(search_proposals(self.user2, "", "срочн")), [])
+
+    async def test_async_list_views(self):
+        await ExchangeProposal.objects.acreate(
+            ad_sender=self.ad1, ad_receiver=self.ad2, comment="Тест", status="pending"
+        )
+        factory = AsyncRequestFactory()
+
+        def request_as(user, path, data=None):
+            request = factory.get(path, data or {})
+
+            async def auser():
+                return user
+
+            request.auser = auser
+            return request
+
+        response = await ad_list_async(request_as(self.user2, reverse("ad_list"), {"q": "велосипед"}))
+        self.assertContains(response, "Велосипед")
+        self.assertNotContains(response, "Ноутбук")
+        self.assertContains(response, "Обмен уже предложен")
+        # Номер за последней страницей — последняя страница, как в Paginator.get_page
+        response = await ad_list_async(request_as(self.user2, reverse("ad_list"), {"page": "99"}))
+        self.assertContains(response, "Ноутбук")
+        response = await ad_list_async(request_as(self.user2, reverse("ad_list"), {"cursor": ""}))
+        self.assertContains(response, "Велосипед")
+        response = await proposal_list_async(
+            request_as(self.user1, reverse("proposal_list"), {"status": "pending"})
+        )
+        self.assertContains(response, "Тест")
+        response = await proposal_list_async(request_as(AnonymousUser(), reverse("proposal_list")))
+        self.assertEqual(response.status_code, 302)
+
+    def test_ad_list_rows_cached_by_version_and_relationship(self):
+        cache.clear()
+        self.client.login(username="user2", password="pass2")
+        self.assertContains(self.client.get(reverse("ad_list")), "Велосипед")
+        # UPDATE без смены updated_at — строка берётся из кэша
+        Ad.objects.filter(pk=self.ad1.pk).update(title="Самокат")
+        response = self.client.get(reverse("ad_list"))
+        self.assertContains(response, "Велосипед")
+        self.assertContains(response, reverse("proposal_create", args=[self.ad1.pk]))
+        self.ad1.refresh_from_db()
+        self.ad1.save()
+        self.assertContains(self.client.get(reverse("ad_list")), "Самокат")
+        # Счётчики и отношение зрителя меняют ключ строки
+        with self.captureOnCommitCallbacks(execute=True):
+            ExchangeProposal.objects.create(ad_sender=self.ad2, ad_receiver=self.ad1)
+        self.assertContains(self.client.get(reverse("ad_list")), "Обмен уже предложен")
+        self.client.login(username="user1", password="pass1")
+        self.assertContains(self.client.get(reverse("ad_list")), "1 предлож.")
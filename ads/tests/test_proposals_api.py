@@ -1,8 +1,11 @@
+from io import StringIO
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth import get_user_model
-from ads.models import Ad, ExchangeProposal
+from ads.models import Ad, ExchangeProposal, ProposalParticipant
+from ads.serializers import AdSerializer, ExchangeProposalSerializer
 
 User = get_user_model()
 
@@ -53,3 +56,231 @@ class ProposalApiTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.proposal.refresh_from_db()
         self.assertEqual(self.proposal.status, "accepted")
+
+    def assertCounters(self, ad, incoming_total, incoming_pending, outgoing_total):
+        ad.refresh_from_db()
+        self.assertEqual(
+            (ad.incoming_total, ad.incoming_pending, ad.outgoing_total),
+            (incoming_total, incoming_pending, outgoing_total),
+        )
+
+    def test_counters_follow_proposal_lifecycle(self):
+        self.assertCounters(self.ad2, 1, 1, 0)
+        self.assertCounters(self.ad1, 0, 0, 1)
+        url = reverse("exchangeproposal-list")
+        response = self.client.post(
+            url, {"ad_sender": self.ad2.id, "ad_receiver": self.ad1.id, "comment": "x"}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertCounters(self.ad1, 1, 1, 1)
+        # Смена статуса уменьшает только ожидающие
+        self.proposal.status = "rejected"
+        self.proposal.save()
+        self.assertCounters(self.ad2, 1, 0, 1)
+        # Удаление объявления каскадом удаляет его предложения
+        self.ad2.delete()
+        self.assertCounters(self.ad1, 0, 0, 0)
+
+    def test_repair_counters_command(self):
+        Ad.objects.update(incoming_total=7, incoming_pending=7, outgoing_total=7)
+        url = reverse("ad-detail", args=[self.ad2.pk])
+        etag = self.client.get(url)["ETag"]
+        call_command("repair_ad_counters", stdout=StringIO())
+        # Кэшированные ответы и ETag со старыми счётчиками больше не действуют
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["incoming_total"], 1)
+        self.assertCounters(self.ad2, 1, 1, 0)
+        self.assertCounters(self.ad1, 0, 0, 1)
+
+    def test_ad_save_keeps_counters(self):
+        stale = Ad.objects.get(pk=self.ad2.pk)
+        ad3 = Ad.objects.create(user=self.user1, title="Ad3", description="desc", category="cat", condition="new")
+        ExchangeProposal.objects.create(ad_sender=ad3, ad_receiver=self.ad2, comment="")
+        stale.title = "Ad2 (изменено)"
+        stale.save()
+        self.assertCounters(self.ad2, 2, 2, 0)
+
+    def test_participants_follow_proposal_lifecycle(self):
+        def participants():
+            return set(
+                ProposalParticipant.objects.values_list("user__username", "role", "status")
+            )
+
+        self.assertEqual(
+            participants(), {("user1", "sender", "pending"), ("user2", "receiver", "pending")}
+        )
+        self.proposal.status = "accepted"
+        self.proposal.save()
+        self.assertEqual(
+            participants(), {("user1", "sender", "accepted"), ("user2", "receiver", "accepted")}
+        )
+        url = reverse("exchangeproposal-list")
+        self.assertEqual(self.client.get(url + "?status=accepted").data["count"], 1)
+        self.assertEqual(self.client.get(url + "?status=pending").data["count"], 0)
+        ProposalParticipant.objects.all().delete()
+        call_command("rebuild_proposal_participants", stdout=StringIO())
+        self.assertEqual(len(participants()), 2)
+        self.proposal.delete()
+        self.assertEqual(participants(), set())
+
+    def test_set_status_outcomes(self):
+        url = reverse("exchangeproposal-set-status", args=[self.proposal.id])
+        # Отправитель не может менять статус
+        response = self.client.post(url, {"status": "accepted"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(response.data["code"], "forbidden")
+        data = {"username": self.user2.username, "password": "pass"}
+        access2 = self.client.post(reverse("token_obtain_pair"), data, format="json").data["access"]
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + access2)
+        response = self.client.post(url, {"status": "pending"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, {"status": "rejected"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertCounters(self.ad2, 1, 0, 0)
+        self.assertEqual(
+            set(ProposalParticipant.objects.values_list("status", flat=True)), {"rejected"}
+        )
+        # Повторный ответ проигрывает: статус уже не pending
+        response = self.client.post(url, {"status": "accepted"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        missing = reverse("exchangeproposal-set-status", args=[self.proposal.id + 100])
+        response = self.client.post(missing, {"status": "accepted"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_bulk_set_status(self):
+        ad3 = Ad.objects.create(user=self.user1, title="Ad3", description="desc", category="cat", condition="new")
+        second = ExchangeProposal.objects.create(ad_sender=ad3, ad_receiver=self.ad2, comment="")
+        own = ExchangeProposal.objects.create(ad_sender=self.ad2, ad_receiver=self.ad1, comment="")
+        data = {"username": self.user2.username, "password": "pass"}
+        access2 = self.client.post(reverse("token_obtain_pair"), data, format="json").data["access"]
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + access2)
+        url = reverse("exchangeproposal-bulk-set-status")
+        items = [
+            {"id": self.proposal.id, "status": "accepted"},
+            {"id": second.id, "status": "rejected"},
+            {"id": own.id, "status": "accepted"},
+            {"id": own.id + 100, "status": "accepted"},
+            {"id": second.id, "status": "unknown"},
+        ]
+        response = self.client.post(url, {"items": items}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(
+            [item["result"] for item in response.data["results"]],
+            ["updated", "updated", "forbidden", "not_found"],
+        )
+        self.assertCounters(self.ad2, 2, 0, 1)
+        response = self.client.post(url, {"items": items[:1]}, format="json")
+        self.assertEqual(response.data["results"], [{"id": self.proposal.id, "result": "conflict"}])
+        response = self.client.post(url, {"items": [{"id": "x"}]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_create_skips_existing_and_invalid(self):
+        ad3 = Ad.objects.create(user=self.user2, title="Ad3", description="desc", category="cat", condition="new")
+        ad4 = Ad.objects.create(user=self.user2, title="Ad4", description="desc", category="cat", condition="new")
+        own = Ad.objects.create(user=self.user1, title="Own", description="desc", category="cat", condition="new")
+        url = reverse("exchangeproposal-bulk-create")
+        data = {
+            "ad_sender": self.ad1.id,
+            "ad_receivers": [self.ad2.id, ad3.id, ad4.id, ad4.id, own.id, ad4.id + 100],
+            "comment": "Меняю",
+        }
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["created"]), 2)
+        self.assertEqual(response.data["existing"], [self.ad2.id])
+        self.assertEqual(response.data["invalid"], [own.id, ad4.id + 100])
+        self.assertCounters(self.ad1, 0, 0, 3)
+        self.assertCounters(ad4, 1, 1, 0)
+        self.assertEqual(ProposalParticipant.objects.filter(user=self.user2).count(), 3)
+        # Повторная отправка ничего не создаёт
+        response = self.client.post(url, data, format="json")
+        self.assertEqual(response.data["created"], [])
+        self.assertEqual(ExchangeProposal.objects.count(), 3)
+        # Чужое объявление-отправитель
+        response = self.client.post(url, dict(data, ad_sender=ad3.id), format="json")
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        # Строка вместо списка не разбирается посимвольно
+        joined = f"{self.ad2.id}{ad3.id}"
+        response = self.client.post(url, dict(data, ad_receivers=joined), format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        # В форме одно значение ad_receivers — один получатель
+        response = self.client.post(
+            url, {"ad_sender": self.ad1.id, "ad_receivers": joined}, format="multipart"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["existing"], [])
+        self.assertEqual(response.data["invalid"], [int(joined)])
+        # Обычное создание дубликата отклоняется валидацией
+        response = self.client.post(
+            reverse("exchangeproposal-list"),
+            {"ad_sender": self.ad1.id, "ad_receiver": self.ad2.id, "comment": "x"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_export_proposals(self):
+        response = self.client.get(reverse("exchangeproposal-export"), {"export_format": "csv"})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "id,ad_sender,ad_receiver,comment,status,created_at")
+        self.assertTrue(lines[1].startswith(f"{self.proposal.id},{self.ad1.id},{self.ad2.id},"))
+        out = StringIO()
+        call_command("export_data", "proposals", user="user2", status="accepted", stdout=out)
+        self.assertEqual(out.getvalue(), "")
+        call_command("export_data", "proposals", user="user2", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 1)
+
+    def test_conditional_get_is_per_user(self):
+        url = reverse("exchangeproposal-list")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        client2 = APIClient()
+        client2.force_authenticate(self.user2)
+        self.assertEqual(client2.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+        with self.captureOnCommitCallbacks(execute=True):
+            client2.post(
+                reverse("exchangeproposal-set-status", args=[self.proposal.id]),
+                {"status": "accepted"},
+                format="json",
+            )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["results"][0]["status"], "accepted")
+
+    def test_fast_read_path_matches_serializer_bytes(self):
+        self.proposal.comment = "Меняю на «книгу»"
+        self.proposal.save()
+        for url in (
+            reverse("exchangeproposal-list"),
+            reverse("exchangeproposal-detail", args=[self.proposal.id]),
+        ):
+            response = self.client.get(url)
+            serialized = ExchangeProposalSerializer(self.proposal).data
+            data = dict(response.data, results=[serialized]) if "results" in response.data else serialized
+            self.assertEqual(
+                response.content,
+                response.accepted_renderer.render(
+                    data, response.accepted_media_type, response.renderer_context
+                ),
+            )
+
+    def test_expand_ads_in_one_query(self):
+        url = reverse("exchangeproposal-list")
+        self.client.get(url)  # количество — в кэше
+        # Пользователь по JWT и один запрос строк с JOIN объявлений
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                url, {"expand": "ad_sender,ad_receiver", "fields": "id,ad_sender,ad_receiver"}
+            )
+        item = response.data["results"][0]
+        self.assertEqual(list(item), ["id", "ad_sender", "ad_receiver"])
+        context = {"request": response.wsgi_request}
+        self.ad1.refresh_from_db()
+        self.ad2.refresh_from_db()
+        self.assertEqual(item["ad_sender"], AdSerializer(self.ad1, context=context).data)
+        self.assertEqual(item["ad_receiver"], AdSerializer(self.ad2, context=context).data)
+        response = self.client.get(
+            reverse("exchangeproposal-detail", args=[self.proposal.id]), {"fields": "status"}
+        )
+        self.assertEqual(response.data, {"status": "pending"})
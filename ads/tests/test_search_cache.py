@@ -0,0 +1,74 @@
+import threading
+import time
+from django.core.cache import cache
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from ads.models import Ad
+from ads.services import search_cache
+
+User = get_user_model()
+
+
+class SearchCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="user1", password="pass1")
+        self.ad = Ad.objects.create(
+            user=self.user,
+            title="Велосипед",
+            description="Горный велосипед",
+            category="Транспорт",
+            condition="Б/У",
+        )
+
+    def test_hit_after_miss(self):
+        page = search_cache.search_ad_page("", "Транспорт", "", None, 10)
+        self.assertEqual(list(page), [self.ad])
+        with self.assertNumQueries(1):
+            # Только загрузка объявлений по id
+            page = search_cache.search_ad_page("", " Транспорт", "", None, 10)
+        self.assertEqual(list(page), [self.ad])
+        self.assertEqual(page.paginator.count, 1)
+        stats = search_cache.get_search_cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_invalidated_on_ad_write(self):
+        search_cache.search_ad_page("", "", "", None, 10)
+        other = Ad.objects.create(
+            user=self.user,
+            title="Самокат",
+            description="Детский",
+            category="Транспорт",
+            condition="Новый",
+        )
+        page = search_cache.search_ad_page("", "", "", None, 10)
+        self.assertEqual(list(page), [other, self.ad])
+        other.delete()
+        page = search_cache.search_ad_page("", "", "", None, 10)
+        self.assertEqual(list(page), [self.ad])
+        self.assertEqual(search_cache.get_search_cache_stats()["hits"], 0)
+
+    def test_single_flight(self):
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return [42]
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    search_cache.single_flight("ads:test:sf", compute, 60)
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [[42]] * 5)
+        self.assertEqual(search_cache.get_search_cache_stats()["coalesced"], 4)
@@ -1,8 +1,15 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Под ASGI (ADS_ASYNC_VIEWS) списки обслуживаются async-вариантами представлений
+if settings.ADS_ASYNC_VIEWS:
+    ad_list_view, proposal_list_view = views.ad_list_async, views.proposal_list_async
+else:
+    ad_list_view, proposal_list_view = views.ad_list, views.proposal_list
+
 urlpatterns = [
-    path("", views.ad_list, name="ad_list"),
+    path("", ad_list_view, name="ad_list"),
     path("ad/create/", views.ad_create, name="ad_create"),
     path("ad/<int:pk>/edit/", views.ad_edit, name="ad_edit"),
     path("ad/<int:pk>/delete/", views.ad_delete, name="ad_delete"),
@@ -11,7 +18,7 @@ urlpatterns = [
         views.proposal_create,
         name="proposal_create",
     ),
-    path("proposals/", views.proposal_list, name="proposal_list"),
+    path("proposals/", proposal_list_view, name="proposal_list"),
     path(
         "proposal/<int:pk>/status/",
         views.proposal_update_status,
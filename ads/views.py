@@ -1,38 +1,141 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.contrib import messages
 from .models import Ad
 from .forms import AdForm, ExchangeProposalForm, RegisterForm
-from django.core.paginator import Paginator
+from django.conf import settings
 from django.contrib.auth import login
 from django.views.decorators.http import require_POST
-from ads.services.ads import search_ads, get_ads_indicators, get_user_exchange_map
-from ads.services.proposals import search_proposals, atomic_update_proposal_status
+from ads.services.ads import search_ads
+from ads.services.indicators import (
+    acompute_exchange_indicators,
+    compute_exchange_indicators,
+)
+from ads.services import proposals as proposal_services
+from ads.services.proposals import search_proposals
+from ads.pagination import (
+    apaginate_keyset,
+    filter_querystring,
+    get_paginator,
+    normalize_filter_key,
+    paginate_keyset,
+)
+from ads.services import generations
+from ads.services.search_cache import asearch_ad_page, search_ad_page
+
+PER_PAGE = 10
+
+
+def is_cursor_mode(request) -> bool:
+    # Keyset-режим: ?cursor= в запросе или ADS_LIST_PAGINATION="cursor"
+    return "cursor" in request.GET or settings.ADS_LIST_PAGINATION == "cursor"
+
+
+def paginate_list(request, queryset, count_key, count_generations):
+    """
+    Пагинация HTML-списков: keyset по курсору либо постраничная по номеру
+    страницы с количеством от стратегии ADS_PAGINATOR_CLASS.
+    :return: (страница, cursor_mode)
+    """
+    if is_cursor_mode(request):
+        return paginate_keyset(request, queryset, PER_PAGE), True
+    paginator = get_paginator(queryset, PER_PAGE, count_key, count_generations)
+    return paginator.get_page(request.GET.get("page")), False
+
+
+def ad_list_filters(request):
+    # (q, category, condition, ranked) из GET-параметров списка объявлений
+    return (
+        request.GET.get("q", ""),
+        request.GET.get("category", ""),
+        request.GET.get("condition", ""),
+        request.GET.get("sort") == "relevance",
+    )
+
+
+def viewer_relationships(page_obj, user, exchange_map):
+    """
+    Отношение зрителя к каждому объявлению — всё, чем строка списка
+    отличается для разных пользователей (часть ключа кэша строки).
+    :return: ad_id -> "owner" | "exchanged" | "other"
+    """
+    relationships = {}
+    for ad in page_obj:
+        if user.is_authenticated and ad.user_id == user.pk:
+            relationships[ad.pk] = "owner"
+        elif exchange_map.get(ad.pk):
+            relationships[ad.pk] = "exchanged"
+        else:
+            relationships[ad.pk] = "other"
+    return relationships
+
+
+def ad_list_context(request, page_obj, cursor_mode, indicators):
+    query, category, condition, _ = ad_list_filters(request)
+    incoming, outgoing, exchange_map = indicators
+    return {
+        "relationships": viewer_relationships(page_obj, request.user, exchange_map),
+        "row_cache_timeout": settings.ADS_ROW_CACHE_TIMEOUT,
+        "page_obj": page_obj,
+        "query": query,
+        "category": category,
+        "condition": condition,
+        "incoming": incoming,
+        "outgoing": outgoing,
+        "exchange_map": exchange_map,
+        "cursor_mode": cursor_mode,
+        "querystring": filter_querystring(request),
+    }
 
 
 # Список объявлений с поиском и фильтрацией
 def ad_list(request):
-    query = request.GET.get("q", "")
-    category = request.GET.get("category", "")
-    condition = request.GET.get("condition", "")
-    ads = search_ads(query, category, condition)
-    paginator = Paginator(ads, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-    incoming, outgoing = get_ads_indicators(page_obj, request.user)
-    exchange_map = get_user_exchange_map(page_obj, request.user)
+    query, category, condition, ranked = ad_list_filters(request)
+    cursor_mode = is_cursor_mode(request)
+    if cursor_mode:
+        ads = search_ads(query, category, condition, ranked=ranked)
+        page_obj = paginate_keyset(request, ads, PER_PAGE)
+    else:
+        page_obj = search_ad_page(
+            query, category, condition, request.GET.get("page"), PER_PAGE, ranked
+        )
+    indicators = compute_exchange_indicators(
+        [ad.pk for ad in page_obj],
+        request.user,
+        incoming_totals={ad.pk: ad.incoming_total for ad in page_obj},
+    )
     return render(
         request,
         "ads/ad_list.html",
-        {
-            "page_obj": page_obj,
-            "query": query,
-            "category": category,
-            "condition": condition,
-            "incoming": incoming,
-            "outgoing": outgoing,
-            "exchange_map": exchange_map,
-        },
+        ad_list_context(request, page_obj, cursor_mode, indicators),
+    )
+
+
+# Асинхронный вариант ad_list для ASGI (ADS_ASYNC_VIEWS): запросы к БД не держат поток воркера
+async def ad_list_async(request):
+    # Пользователь загружается асинхронно и подменяет ленивый request.user для шаблона
+    request.user = await request.auser()
+    query, category, condition, ranked = ad_list_filters(request)
+    cursor_mode = is_cursor_mode(request)
+    if cursor_mode:
+        ads = search_ads(query, category, condition, ranked=ranked)
+        page_obj = await apaginate_keyset(request, ads, PER_PAGE)
+    else:
+        page_obj = await asearch_ad_page(
+            query, category, condition, request.GET.get("page"), PER_PAGE, ranked
+        )
+    indicators = await acompute_exchange_indicators(
+        [ad.pk for ad in page_obj],
+        request.user,
+        incoming_totals={ad.pk: ad.incoming_total for ad in page_obj},
+    )
+    # Шаблон и контекст-процессоры синхронные (request.user, csrf) — рендер в потоке
+    return await sync_to_async(render)(
+        request,
+        "ads/ad_list.html",
+        ad_list_context(request, page_obj, cursor_mode, indicators),
     )
 
 
@@ -114,17 +217,59 @@ def proposal_create(request, ad_receiver_id):
     )
 
 
-# Список предложений (фильтрация по пользователю и статусу)
-@login_required
-def proposal_list(request):
+def proposal_list_query(request):
+    # (QuerySet, ключ количества) для списка предложений пользователя
     status = request.GET.get("status", "")
     query = request.GET.get("q", "")
     proposals = search_proposals(request.user, status, query)
-    paginator = Paginator(proposals, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    count_key = normalize_filter_key(
+        "proposals", user=request.user.pk, status=status, q=query
+    )
+    return proposals, count_key
+
+
+def proposal_list_context(request, page_obj, cursor_mode):
+    return {
+        "page_obj": page_obj,
+        "status": request.GET.get("status", ""),
+        "cursor_mode": cursor_mode,
+        "querystring": filter_querystring(request),
+    }
+
+
+# Список предложений (фильтрация по пользователю и статусу)
+@login_required
+def proposal_list(request):
+    proposals, count_key = proposal_list_query(request)
+    page_obj, cursor_mode = paginate_list(
+        request, proposals, count_key, (generations.ADS, generations.PROPOSALS)
+    )
     return render(
-        request, "ads/proposal_list.html", {"page_obj": page_obj, "status": status}
+        request,
+        "ads/proposal_list.html",
+        proposal_list_context(request, page_obj, cursor_mode),
+    )
+
+
+# Асинхронный вариант proposal_list для ASGI (ADS_ASYNC_VIEWS)
+async def proposal_list_async(request):
+    # login_required в Django 5.0 не поддерживает async-представления
+    user = await request.auser()
+    if not user.is_authenticated:
+        return redirect_to_login(request.get_full_path())
+    request.user = user
+    proposals, count_key = proposal_list_query(request)
+    if is_cursor_mode(request):
+        page_obj, cursor_mode = await apaginate_keyset(request, proposals, PER_PAGE), True
+    else:
+        paginator = get_paginator(
+            proposals, PER_PAGE, count_key, (generations.ADS, generations.PROPOSALS)
+        )
+        page_obj, cursor_mode = await paginator.aget_page(request.GET.get("page")), False
+    return await sync_to_async(render)(
+        request,
+        "ads/proposal_list.html",
+        proposal_list_context(request, page_obj, cursor_mode),
     )
 
 
@@ -132,13 +277,17 @@ def proposal_list(request):
 @require_POST
 def proposal_update_status(request, pk):
     new_status = request.POST.get("status")
-    ok = atomic_update_proposal_status(pk, request.user, new_status)
-    if ok:
+    outcome = proposal_services.transition_proposal_status(
+        pk, request.user, str(new_status or "")
+    )
+    if outcome == proposal_services.STATUS_UPDATED:
         messages.success(request, "Статус предложения изменён!")
+    elif outcome == proposal_services.STATUS_CONFLICT:
+        messages.error(request, "Ошибка: статус предложения уже изменён!")
+    elif outcome == proposal_services.STATUS_INVALID:
+        messages.error(request, "Ошибка: недопустимый статус!")
     else:
-        messages.error(
-            request, "Ошибка: вы не можете менять статус или недопустимый статус!"
-        )
+        messages.error(request, "Ошибка: вы не можете менять статус этого предложения!")
     return redirect("proposal_list")
 
 
@@ -133,6 +133,28 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Поколения данных (ETag, кэш количества и поиска, кэш строк), кэш партнёров
+# обмена и блокировки файлов изображений хранятся в кэше и должны быть общими
+# для всех процессов. REDIS_URL (redis://host:6379/0) включает общий Redis;
+# без него — LocMemCache, у каждого процесса свой, что годится только для
+# одного процесса (разработка, тесты). manage.py check --deploy сообщает
+# об ошибке ads.E001, если кэш не общий
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "barter-platform",
+        }
+    }
+
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
@@ -140,6 +162,66 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "ads.pagination.AdsPagination",
     "PAGE_SIZE": 10,
 }
+
+# Поиск объявлений: "fts" — полнотекстовый индекс SQLite FTS5, "like" — icontains
+ADS_SEARCH_BACKEND = "fts"
+
+# Пагинация HTML-списков по умолчанию: "page" — номера страниц, "cursor" — keyset
+# (курсорный режим также включается параметром ?cursor=)
+ADS_LIST_PAGINATION = "page"
+
+# Асинхронные HTML-списки (ad_list, proposal_list): включаются переменной окружения
+# ADS_ASYNC_VIEWS=1 и работают только под ASGI. По умолчанию выключены: при задержке
+# БД от ~5–10 мс на запрос выигрывает сам ASGI, а async-представления не быстрее
+# синхронных под ним же (см. benchmarks/bench_async_views.py и README)
+ADS_ASYNC_VIEWS = os.environ.get("ADS_ASYNC_VIEWS", "0") == "1"
+
+# Стратегия подсчёта количества для постраничных списков:
+# CountingPaginator — точный COUNT(*), CachedCountPaginator — кэш точного количества
+# по ключу фильтра, EstimatedCountPaginator — кэш + «10 000+» выше порога
+ADS_PAGINATOR_CLASS = "ads.pagination.CachedCountPaginator"
+ADS_COUNT_CACHE_TIMEOUT = 300
+ADS_COUNT_ESTIMATE_THRESHOLD = 10000
+
+# Кэш id результатов поиска объявлений (ads.services.search_cache)
+ADS_SEARCH_CACHE_TIMEOUT = 60
+ADS_SEARCH_CACHE_LOCK_TIMEOUT = 10
+ADS_SEARCH_CACHE_POLL_INTERVAL = 0.05
+
+# Кэш отрисованных строк списка объявлений ({% cache %} в ads/ad_list.html), секунды;
+# ключ — (id, updated_at, отношение зрителя к объявлению), 0 — без кэша
+ADS_ROW_CACHE_TIMEOUT = 600
+
+# Время жизни кэша партнёров обмена пользователя (секунды); кэш обновляется
+# инкрементально, таймаут ограничивает расхождение при гонках записи
+ADS_EXCHANGE_CACHE_TIMEOUT = 3600
+
+# Импорт объявлений (ads.services.importer): строк в одном bulk_create и
+# максимум отклонённых строк в ответе API
+ADS_IMPORT_BATCH_SIZE = 500
+ADS_IMPORT_REJECTED_LIMIT = 100
+
+# Выгрузка (ads.services.exporter): строк в одной порции QuerySet.iterator()
+ADS_EXPORT_CHUNK_SIZE = 2000
+
+# Уменьшенные копии Ad.image (ads.services.thumbnails): имя -> (ширина, высота)
+ADS_IMAGE_RENDITIONS = {"thumb": (160, 160), "medium": (640, 640)}
+ADS_IMAGE_RENDITION_QUALITY = 85
+# "thread" — генерация в пуле потоков после коммита, "sync" — сразу после коммита,
+# "off" — только командой generate_thumbnails
+ADS_THUMBNAIL_MODE = "thread"
+ADS_THUMBNAIL_WORKERS = 2
+# Освобождённое изображение моложе этого срока (секунды) не удаляется сразу:
+# то же содержимое может быть сохранено в ещё не закоммиченной транзакции.
+# Срок должен быть больше самой долгой транзакции; остаток удаляет cleanup_images
+ADS_IMAGE_RELEASE_GRACE = 600
+
+# Загрузка изображений по частям (ads.services.uploads): максимальный размер
+# файла и одной части (байт), каталог временных файлов и срок жизни сессии (часы)
+ADS_UPLOAD_MAX_SIZE = 20 * 1024 * 1024
+ADS_UPLOAD_CHUNK_MAX_SIZE = 2 * 1024 * 1024
+ADS_UPLOAD_TEMP_DIR = os.path.join(MEDIA_ROOT, ".uploads")
+ADS_UPLOAD_EXPIRE_HOURS = 24
@@ -0,0 +1,134 @@
+"""
+Бенчмарк отрисовки страницы списка объявлений с кэшем строк и без него.
+
+Создаёт временную SQLite-базу и измеряет полную отрисовку ads/ad_list.html
+(представление ad_list целиком и отдельно шаблон с готовым контекстом):
+  - без кэша строк (ADS_ROW_CACHE_TIMEOUT = 0);
+  - с тёплым кэшем строк;
+  - с кэшем, когда перед каждой отрисовкой меняется одно объявление страницы.
+
+Запуск:
+    python benchmarks/bench_ad_list_render.py [--ads 2000] [--per-page 10] [--repeat 300]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "barter_platform.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+CATEGORIES = ["Электроника", "Книги", "Транспорт", "Одежда", "Мебель", "Спорт"]
+CONDITIONS = ["Новый", "Б/У", "На запчасти"]
+
+
+def seed(n_ads, n_users=50):
+    from django.contrib.auth import get_user_model
+    from ads.models import Ad
+
+    User = get_user_model()
+    rnd = random.Random(42)
+    User.objects.bulk_create(
+        [User(username=f"bench{i}", password="!") for i in range(n_users)]
+    )
+    user_ids = list(User.objects.values_list("pk", flat=True))
+    ads = []
+    for i in range(n_ads):
+        ad = Ad(
+            user_id=rnd.choice(user_ids),
+            title=f"Объявление {i}",
+            description="Описание",
+            category=rnd.choice(CATEGORIES),
+            condition=rnd.choice(CONDITIONS),
+        )
+        ad.refresh_lookup_keys()
+        ads.append(ad)
+    Ad.objects.bulk_create(ads, batch_size=2000)
+    return User.objects.get(pk=user_ids[0])
+
+
+def timed(render, repeat, before=None):
+    # Среднее время одной отрисовки, мс (before — подготовка вне замера)
+    total = 0.0
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        render()
+        total += time.perf_counter() - started
+    return total / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ads", type=int, default=2000)
+    parser.add_argument("--per-page", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATABASES["default"]["NAME"] = os.path.join(tmp, "bench.sqlite3")
+        settings.DEBUG = False
+        from django.core.cache import cache
+        from django.core.management import call_command
+        from django.db import connection
+        from django.template.loader import render_to_string
+        from django.test import RequestFactory
+        from ads import views
+        from ads.models import Ad
+        from ads.services.indicators import compute_exchange_indicators
+
+        call_command("migrate", verbosity=0)
+        user = seed(args.ads)
+        views.PER_PAGE = args.per_page
+        request = RequestFactory().get("/")
+        request.user = user
+        page_ads = list(
+            Ad.objects.select_related("user").order_by("-created_at", "-id")[: args.per_page]
+        )
+        indicators = compute_exchange_indicators([ad.pk for ad in page_ads], user)
+        counter = iter(range(10**9))
+
+        def touch_one_ad():
+            ad = page_ads[next(counter) % len(page_ads)]
+            ad.title = f"Объявление {next(counter)}"
+            ad.save(update_fields=["title", "updated_at"])
+
+        def render_view():
+            views.ad_list(request)
+
+        def render_template():
+            context = views.ad_list_context(request, page_ads, False, indicators)
+            render_to_string("ads/ad_list.html", context, request)
+
+        results = {}
+        for name, render in (("представление", render_view), ("шаблон", render_template)):
+            settings.ADS_ROW_CACHE_TIMEOUT = 0
+            cache.clear()
+            cold = timed(render, args.repeat)
+            settings.ADS_ROW_CACHE_TIMEOUT = 600
+            cache.clear()
+            render()
+            warm = timed(render, args.repeat)
+            changed = timed(render, args.repeat, before=touch_one_ad)
+            results[name] = (cold, warm, changed)
+
+        print(f"{args.ads} объявлений, {args.per_page} на странице, {args.repeat} отрисовок\n")
+        print(f"{'':16}{'без кэша':>12}{'тёплый кэш':>14}{'1 строка изм.':>16}")
+        for name, (cold, warm, changed) in results.items():
+            print(f"{name:16}{cold:10.2f} мс{warm:11.2f} мс{changed:13.2f} мс")
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Бенчмарк синхронных и асинхронных HTML-списков (ADS_ASYNC_VIEWS).
+
+Создаёт временную SQLite-базу, заполняет её и в отдельных процессах гоняет
+одинаковую конкурентную нагрузку на / и /proposals/ через настоящие
+WSGIHandler (пул из --threads потоков, как gthread-воркер) и ASGIHandler
+(один event loop, --concurrency одновременных запросов) — с синхронными
+(ADS_ASYNC_VIEWS=0, значение по умолчанию) и с async-представлениями.
+Печатает запросы в секунду на процесс.
+
+--latency-ms добавляет задержку к каждому SQL-запросу, имитируя сетевую БД:
+SQLite в том же процессе отвечает за микросекунды, и ожидание БД, ради
+которого нужны async-представления, без задержки почти не видно.
+
+Запуск:
+    python benchmarks/bench_async_views.py [--ads 20000] [--requests 400] [--concurrency 32] [--threads 4] [--latency-ms 2]
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlencode
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "barter_platform.settings")
+
+CATEGORIES = ["Электроника", "Книги", "Транспорт", "Одежда", "Мебель", "Спорт"]
+CONDITIONS = ["Новый", "Б/У", "На запчасти"]
+HOST = "testserver"
+
+
+def setup_django(db_path):
+    import django
+    from django.conf import settings
+
+    settings.DATABASES["default"]["NAME"] = db_path
+    settings.DEBUG = False
+    settings.ALLOWED_HOSTS = [HOST]
+    django.setup()
+
+
+def seed(n_ads, n_proposals, n_users=200):
+    from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+    from django.contrib.auth import get_user_model
+    from django.contrib.sessions.backends.db import SessionStore
+    from ads.models import Ad, ExchangeProposal
+    from ads.services.participants import rebuild_participants
+
+    User = get_user_model()
+    rnd = random.Random(42)
+    User.objects.bulk_create(
+        [User(username=f"bench{i}", password="!") for i in range(n_users)],
+        batch_size=1000,
+    )
+    user_ids = list(User.objects.values_list("pk", flat=True))
+    ads = []
+    for i in range(n_ads):
+        ad = Ad(
+            user_id=rnd.choice(user_ids),
+            title=f"Объявление {i}",
+            description="Описание",
+            category=rnd.choice(CATEGORIES),
+            condition=rnd.choice(CONDITIONS),
+        )
+        ad.refresh_lookup_keys()
+        ads.append(ad)
+    Ad.objects.bulk_create(ads, batch_size=2000)
+    ad_ids = list(Ad.objects.values_list("pk", flat=True))
+    # Пары уникальны (ads_prop_unique_pair) — повторы отбрасываются
+    ExchangeProposal.objects.bulk_create(
+        [
+            ExchangeProposal(
+                ad_sender_id=rnd.choice(ad_ids),
+                ad_receiver_id=rnd.choice(ad_ids),
+                comment="",
+                status=rnd.choice(["pending", "accepted", "rejected"]),
+            )
+            for _ in range(n_proposals)
+        ],
+        batch_size=2000,
+        ignore_conflicts=True,
+    )
+    rebuild_participants()
+    user = User.objects.get(pk=user_ids[0])
+    session = SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.create()
+    return session.session_key
+
+
+def request_plan(n_requests):
+    # Одинаковая для обоих режимов смесь запросов: страницы, фильтры, предложения
+    rnd = random.Random(7)
+    plan = []
+    for _ in range(n_requests):
+        kind = rnd.random()
+        if kind < 0.4:
+            plan.append(("/", urlencode({"page": rnd.randint(1, 50)})))
+        elif kind < 0.7:
+            category = CATEGORIES[rnd.randrange(len(CATEGORIES))]
+            plan.append(("/", urlencode({"category": category, "page": rnd.randint(1, 10)})))
+        else:
+            plan.append(("/proposals/", urlencode({"page": rnd.randint(1, 3)})))
+    return plan
+
+
+def install_latency(latency):
+    from django.db.backends.signals import connection_created
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(latency)
+        return execute(sql, params, many, context)
+
+    def on_connect(sender, connection, **kwargs):
+        # Объект соединения потока переживает переподключение — обёртка одна
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    connection_created.connect(on_connect, weak=False)
+
+
+def run_wsgi(plan, session_key, threads):
+    from django.core.wsgi import get_wsgi_application
+
+    app = get_wsgi_application()
+    cookie = f"sessionid={session_key}"
+
+    def get(item):
+        path, query = item
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "SCRIPT_NAME": "",
+            "PATH_INFO": path,
+            "QUERY_STRING": query,
+            "SERVER_NAME": HOST,
+            "SERVER_PORT": "80",
+            "HTTP_HOST": HOST,
+            "HTTP_COOKIE": cookie,
+            "wsgi.input": io.BytesIO(b""),
+            "wsgi.url_scheme": "http",
+        }
+        statuses = []
+        body = app(environ, lambda status, headers, exc_info=None: statuses.append(status))
+        b"".join(body)
+        body.close()
+        return int(statuses[0].split()[0])
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(get, plan))
+    return time.perf_counter() - started, statuses
+
+
+def run_asgi(plan, session_key, concurrency):
+    from django.core.asgi import get_asgi_application
+
+    app = get_asgi_application()
+    headers = [(b"host", HOST.encode()), (b"cookie", f"sessionid={session_key}".encode())]
+
+    async def get(item, semaphore):
+        path, query = item
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": headers,
+            "client": ("127.0.0.1", 0),
+            "server": (HOST, 80),
+        }
+        state = {"sent": False, "status": None}
+
+        async def receive():
+            if not state["sent"]:
+                state["sent"] = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # Клиент не отключается — ASGIHandler отменит ожидание сам
+            await asyncio.get_running_loop().create_future()
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                state["status"] = message["status"]
+
+        async with semaphore:
+            await app(scope, receive, send)
+        return state["status"]
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(get(item, semaphore) for item in plan))
+
+    started = time.perf_counter()
+    statuses = asyncio.run(main())
+    return time.perf_counter() - started, statuses
+
+
+def child(args):
+    setup_django(args.db)
+    if args.latency_ms:
+        install_latency(args.latency_ms / 1000)
+    plan = request_plan(args.requests)
+    if args.mode == "wsgi":
+        elapsed, statuses = run_wsgi(plan, args.session, args.threads)
+    else:
+        # asgi-sync и asgi различаются только ADS_ASYNC_VIEWS в окружении процесса
+        elapsed, statuses = run_asgi(plan, args.session, args.concurrency)
+    errors = sum(status != 200 for status in statuses)
+    print(json.dumps({"elapsed": elapsed, "errors": errors}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ads", type=int, default=20000)
+    parser.add_argument("--proposals", type=int, default=40000)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--mode", choices=["wsgi", "asgi-sync", "asgi"], help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--session", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        child(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.sqlite3")
+        setup_django(db_path)
+        from django.core.management import call_command
+        from django.db import connection
+
+        call_command("migrate", verbosity=0)
+        started = time.perf_counter()
+        session_key = seed(args.ads, args.proposals)
+        connection.close()
+        print(
+            f"Заполнено: {args.ads} объявлений, до {args.proposals} предложений "
+            f"за {time.perf_counter() - started:.1f} с; задержка SQL {args.latency_ms} мс"
+        )
+        results = {}
+        for mode in ("wsgi", "asgi-sync", "asgi"):
+            command = [
+                sys.executable, __file__, "--mode", mode, "--db", db_path,
+                "--session", session_key, "--requests", str(args.requests),
+                "--concurrency", str(args.concurrency), "--threads", str(args.threads),
+                "--latency-ms", str(args.latency_ms),
+            ]
+            env = dict(os.environ, ADS_ASYNC_VIEWS="1" if mode == "asgi" else "0")
+            output = subprocess.run(command, env=env, capture_output=True, text=True)
+            if output.returncode:
+                sys.exit(output.stderr)
+            results[mode] = json.loads(output.stdout.strip().splitlines()[-1])
+        print("\n=== итог ===")
+        labels = {
+            "wsgi": f"WSGI, {args.threads} потока",
+            "asgi-sync": f"ASGI, sync, {args.concurrency} одновр.",
+            "asgi": f"ASGI, async, {args.concurrency} одновр.",
+        }
+        for mode, result in results.items():
+            rps = args.requests / result["elapsed"]
+            print(
+                f"{labels[mode]:30} {rps:8.1f} запр/с  "
+                f"({result['elapsed']:.2f} с, ошибок: {result['errors']})"
+            )
+
+
+if __name__ == "__main__":
+    main()
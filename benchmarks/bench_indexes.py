@@ -0,0 +1,169 @@
+"""
+Бенчмарк индексов из миграции 0006_index_pack.
+
+Создаёт временную SQLite-базу, заполняет её объявлениями и предложениями,
+и для горячих запросов из ads/services печатает EXPLAIN QUERY PLAN и время
+выполнения до и после применения индексов.
+
+Запуск:
+    python benchmarks/bench_indexes.py [--ads 50000] [--proposals 100000] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "barter_platform.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+BEFORE = "0005_ad_lookup_keys"
+AFTER = "0006_index_pack"
+CATEGORIES = ["Электроника", "Книги", "Транспорт", "Одежда", "Мебель", "Спорт"]
+CONDITIONS = ["Новый", "Б/У", "На запчасти"]
+
+
+def seed(n_ads, n_proposals, n_users=500):
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+    from ads.models import Ad, ExchangeProposal
+
+    User = get_user_model()
+    rnd = random.Random(42)
+    User.objects.bulk_create(
+        [User(username=f"bench{i}", password="!") for i in range(n_users)],
+        batch_size=1000,
+    )
+    user_ids = list(User.objects.values_list("pk", flat=True))
+    ads = []
+    for i in range(n_ads):
+        ad = Ad(
+            user_id=rnd.choice(user_ids),
+            title=f"Объявление {i}",
+            description="Описание",
+            category=rnd.choice(CATEGORIES),
+            condition=rnd.choice(CONDITIONS),
+        )
+        ad.refresh_lookup_keys()
+        ads.append(ad)
+    Ad.objects.bulk_create(ads, batch_size=2000)
+    ad_ids = list(Ad.objects.values_list("pk", flat=True))
+    statuses = ["pending", "pending", "accepted", "rejected"]
+    ExchangeProposal.objects.bulk_create(
+        [
+            ExchangeProposal(
+                ad_sender_id=rnd.choice(ad_ids),
+                ad_receiver_id=rnd.choice(ad_ids),
+                comment="",
+                status=rnd.choice(statuses),
+            )
+            for _ in range(n_proposals)
+        ],
+        batch_size=2000,
+    )
+    # auto_now_add ставит всем одно время — разносим даты создания
+    with connection.cursor() as cursor:
+        for table in ("ads_ad", "ads_exchangeproposal"):
+            cursor.execute(
+                f"UPDATE {table} SET created_at = "
+                f"datetime('now', '-' || ((id * 7919) % 500000) || ' minutes')"
+            )
+    return user_ids, ad_ids
+
+
+def hot_queries(user_id, ad_ids):
+    from django.contrib.auth import get_user_model
+    from ads.models import Ad, ExchangeProposal
+    from ads.services.ads import get_ads_indicators, search_ads
+    from ads.services.proposals import search_proposals
+
+    user = get_user_model().objects.get(pk=user_id)
+    page_ids = ad_ids[:10]
+    page = list(Ad.objects.filter(pk__in=page_ids))
+    return {
+        "лента объявлений": lambda: search_ads("", "", "")[:10],
+        "лента по категории": lambda: search_ads("", "книги", "")[:10],
+        "входящие pending": lambda: ExchangeProposal.objects.filter(
+            ad_receiver_id__in=page_ids, status="pending"
+        ).order_by("-created_at"),
+        "исходящие к странице": lambda: ExchangeProposal.objects.filter(
+            ad_sender__user=user, ad_receiver_id__in=page_ids
+        ).values_list("ad_receiver_id", flat=True),
+        "предложения пользователя": lambda: search_proposals(user, "pending", "")[:10],
+        "индикаторы страницы": lambda: get_ads_indicators(page, user),
+    }
+
+
+def explain(queryset):
+    from django.db import connection
+
+    if not hasattr(queryset, "query"):
+        return "(несколько запросов)"
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return "\n".join(f"    {row[-1]}" for row in cursor.fetchall())
+
+
+def measure(label, queries, repeat):
+    print(f"\n=== {label} ===")
+    results = {}
+    for name, build in queries.items():
+        queryset = build()
+        plan = explain(queryset)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = build()
+            list(result) if hasattr(result, "query") else result
+        elapsed = (time.perf_counter() - started) / repeat * 1000
+        results[name] = elapsed
+        print(f"\n{name}: {elapsed:.2f} ms\n{plan}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ads", type=int, default=50000)
+    parser.add_argument("--proposals", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATABASES["default"]["NAME"] = os.path.join(tmp, "bench.sqlite3")
+        from django.core.management import call_command
+        from django.db import connection
+
+        call_command("migrate", verbosity=0)
+        call_command("migrate", "ads", BEFORE, verbosity=0)
+        started = time.perf_counter()
+        user_ids, ad_ids = seed(args.ads, args.proposals)
+        print(
+            f"Заполнено: {args.ads} объявлений, {args.proposals} предложений "
+            f"за {time.perf_counter() - started:.1f} с"
+        )
+        ad_ids = ad_ids[len(ad_ids) // 2 :]
+        queries = hot_queries(user_ids[0], ad_ids)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        before = measure(f"до индексов ({BEFORE})", queries, args.repeat)
+        call_command("migrate", "ads", AFTER, verbosity=0)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        after = measure(f"после индексов ({AFTER})", queries, args.repeat)
+        print("\n=== итог ===")
+        for name in queries:
+            print(f"{name:28} {before[name]:9.2f} ms -> {after[name]:9.2f} ms")
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
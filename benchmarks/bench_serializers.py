@@ -0,0 +1,149 @@
+"""
+Бенчмарк сериализации списков API: ModelSerializer DRF и ValuesSerializer.
+
+Создаёт временную SQLite-базу с --rows объявлениями (у части — изображение
+с копиями) и столько же предложениями обмена, затем для каждого набора
+измеряет:
+  - только сериализацию уже загруженных строк (модели / словари values());
+  - полный путь: запрос к БД + сериализация + JSONRenderer.
+Перед замером проверяет, что JSON обоих путей совпадает байт в байт.
+
+Запуск:
+    python benchmarks/bench_serializers.py [--rows 10000] [--repeat 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "barter_platform.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+
+CATEGORIES = ["Электроника", "Книги", "Транспорт", "Одежда", "Мебель", "Спорт"]
+CONDITIONS = ["Новый", "Б/У", "На запчасти"]
+
+
+def seed(n_rows, n_users=100):
+    from django.contrib.auth import get_user_model
+    from ads.models import Ad, ExchangeProposal
+
+    User = get_user_model()
+    rnd = random.Random(42)
+    User.objects.bulk_create([User(username=f"bench{i}", password="!") for i in range(n_users)])
+    user_ids = list(User.objects.values_list("pk", flat=True))
+    ads = []
+    for i in range(n_rows):
+        ad = Ad(
+            user_id=rnd.choice(user_ids),
+            title=f"Объявление {i}",
+            description="Описание " * 5,
+            category=rnd.choice(CATEGORIES),
+            condition=rnd.choice(CONDITIONS),
+        )
+        if i % 2:
+            ad.image = f"ads/{i:064x}.png"
+            ad.image_renditions = {"thumb": f"renditions/ads/{i:064x}_thumb.jpg"}
+        ad.refresh_lookup_keys()
+        ads.append(ad)
+    Ad.objects.bulk_create(ads, batch_size=2000)
+    ad_ids = list(Ad.objects.values_list("pk", flat=True))
+    ExchangeProposal.objects.bulk_create(
+        [
+            ExchangeProposal(
+                ad_sender_id=rnd.choice(ad_ids),
+                ad_receiver_id=rnd.choice(ad_ids),
+                comment="Предлагаю обмен",
+                status=rnd.choice(["pending", "accepted", "rejected"]),
+            )
+            for _ in range(n_rows)
+        ],
+        batch_size=2000,
+        ignore_conflicts=True,
+    )
+
+
+def best_of(func, repeat):
+    # Лучшее время из repeat запусков, мс
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATABASES["default"]["NAME"] = os.path.join(tmp, "bench.sqlite3")
+        settings.DEBUG = False
+        settings.ALLOWED_HOSTS = ["testserver"]
+        from django.core.management import call_command
+        from django.db import connection
+        from rest_framework.renderers import JSONRenderer
+        from rest_framework.test import APIRequestFactory
+        from ads.fast_serializers import AdValuesSerializer, ExchangeProposalValuesSerializer
+        from ads.models import Ad, ExchangeProposal
+        from ads.serializers import AdSerializer, ExchangeProposalSerializer
+
+        call_command("migrate", verbosity=0)
+        seed(args.rows)
+        context = {"request": APIRequestFactory().get("/api/ads/")}
+        renderer = JSONRenderer()
+        cases = [
+            ("объявления", Ad.objects.order_by("-created_at", "-id"), AdSerializer, AdValuesSerializer),
+            (
+                "предложения",
+                ExchangeProposal.objects.order_by("-created_at", "-id"),
+                ExchangeProposalSerializer,
+                ExchangeProposalValuesSerializer,
+            ),
+        ]
+        print(f"{args.rows} строк, лучшее из {args.repeat}\n")
+        print(f"{'':14}{'':26}{'DRF':>10}{'values()':>12}{'ускорение':>11}")
+        for name, queryset, serializer_class, values_class in cases:
+            reader = values_class(context=context)
+            objects = list(queryset)
+            rows = list(queryset.values(*reader.columns))
+            drf_json = renderer.render(serializer_class(objects, many=True, context=context).data)
+            fast_json = renderer.render(reader.many(rows))
+            if drf_json != fast_json:
+                sys.exit(f"{name}: JSON путей различается")
+
+            def drf_full():
+                data = serializer_class(queryset.all(), many=True, context=context).data
+                renderer.render(data)
+
+            def fast_full():
+                reader = values_class(context=context)
+                renderer.render(reader.many(queryset.values(*reader.columns)))
+
+            timings = [
+                (
+                    "сериализация",
+                    best_of(lambda: serializer_class(objects, many=True, context=context).data, args.repeat),
+                    best_of(lambda: values_class(context=context).many(rows), args.repeat),
+                ),
+                ("БД + сериализация + JSON", best_of(drf_full, args.repeat), best_of(fast_full, args.repeat)),
+            ]
+            for label, drf, fast in timings:
+                print(f"{name:14}{label:26}{drf:8.1f} мс{fast:9.1f} мс{drf / fast:10.1f}x")
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()